@@ -0,0 +1,52 @@
+"""
+比较每个阶段各自解码音频（旧版）与解码一次后读取内存映射 .npy 缓存的耗时
+
+生成一段 48 kHz 立体声合成 WAV（或使用 --input 指定的文件），测量 faster-whisper 解码为
+16 kHz 单声道 float32 的耗时、首次写入缓存的耗时，以及命中缓存后映射并完整读取一遍采样的耗时。
+
+用法（在 api/ 目录下）：
+    python -m benchmarks.bench_audio_cache --seconds 1800
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.bench_denoise_pipeline import write_noisy_wav
+from src.utils.audio_cache import decode_cached_audio
+
+
+def timed(function):
+    started = time.perf_counter()
+    value = function()
+    return time.perf_counter() - started, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", help="使用已有的音频文件代替合成音频")
+    parser.add_argument("--seconds", type=float, default=1800)
+    args = parser.parse_args()
+
+    from faster_whisper.audio import decode_audio
+
+    with tempfile.TemporaryDirectory() as workdir:
+        input_path = args.input
+        if input_path is None:
+            input_path = os.path.join(workdir, "input.wav")
+            write_noisy_wav(input_path, args.seconds)
+        cache_dir = os.path.join(workdir, "decoded")
+
+        decode_seconds, audio = timed(lambda: decode_audio(input_path, sampling_rate=16000))
+        miss_seconds, _ = timed(lambda: decode_cached_audio(input_path, "bench", cache_dir))
+        # 命中：映射文件并完整读取一遍（相当于 VAD 扫描全部采样）
+        hit_seconds, peak = timed(lambda: float(abs(decode_cached_audio(input_path, "bench", cache_dir).samples).max()))
+
+    print(f"audio: {len(audio) / 16000:.0f}s, {audio.nbytes / 2**20:.1f} MiB of float32 samples")
+    print(f"decode per stage : {decode_seconds:7.3f}s")
+    print(f"cache miss       : {miss_seconds:7.3f}s (decode + write .npy)")
+    print(f"cache hit        : {hit_seconds:7.3f}s (mmap + full read, peak {peak:.2f})")
+
+
+if __name__ == "__main__":
+    main()
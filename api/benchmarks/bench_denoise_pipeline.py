@@ -0,0 +1,84 @@
+"""
+比较降噪的两种方式：临时 WAV（旧版，faster-whisper 再解码并重采样）vs ffmpeg 一次降噪+重采样经管道读入内存
+
+生成一段 48 kHz 立体声的带噪合成音频（或使用 --input 指定的文件），分别测量两种方式得到
+16 kHz 单声道 float32 采样所需的时间，以及旧方式写出的临时文件大小。需要安装 ffmpeg。
+
+用法（在 api/ 目录下）：
+    python -m benchmarks.bench_denoise_pipeline --seconds 600
+    python -m benchmarks.bench_denoise_pipeline --input /path/to/audio.mp3
+"""
+import argparse
+import os
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+from src.utils.audio_processing import SAMPLE_RATE, denoise_audio, denoise_audio_to_array
+
+
+def write_noisy_wav(path, seconds, sample_rate=48000):
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    tone = 0.3 * np.sin(2 * np.pi * 220 * t) * (np.sin(2 * np.pi * 0.5 * t) > 0)
+    stereo = np.stack([tone, tone], axis=1) + 0.05 * rng.standard_normal((len(t), 2))
+    with wave.open(path, "wb") as output:
+        output.setnchannels(2)
+        output.setsampwidth(2)
+        output.setframerate(sample_rate)
+        output.writeframes((np.clip(stereo, -1, 1) * 32767).astype("<i2").tobytes())
+
+
+def run_temp_file(input_path):
+    from faster_whisper.audio import decode_audio
+
+    started = time.perf_counter()
+    success, denoised_path, message = denoise_audio(input_path)
+    if not success:
+        raise SystemExit(message)
+    try:
+        temp_bytes = os.path.getsize(denoised_path)
+        audio = decode_audio(denoised_path, sampling_rate=SAMPLE_RATE)
+    finally:
+        os.remove(denoised_path)
+    return time.perf_counter() - started, temp_bytes, audio
+
+
+def run_in_memory(input_path):
+    started = time.perf_counter()
+    audio, message = denoise_audio_to_array(input_path)
+    if audio is None:
+        raise SystemExit(message)
+    return time.perf_counter() - started, 0, audio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", help="使用已有的音频文件代替合成音频")
+    parser.add_argument("--seconds", type=float, default=600)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        input_path = args.input
+        if input_path is None:
+            input_path = os.path.join(workdir, "noisy.wav")
+            write_noisy_wav(input_path, args.seconds)
+
+        results = {}
+        for mode, runner in (("temp-wav", run_temp_file), ("in-memory", run_in_memory)):
+            elapsed, temp_bytes, audio = runner(input_path)
+            results[mode] = audio
+            print(
+                f"{mode:<9}: {elapsed:6.2f}s, temp file {temp_bytes / 2**20:7.1f} MiB, "
+                f"{len(audio) / SAMPLE_RATE:.0f}s of 16 kHz samples"
+            )
+
+    length = min(len(audio) for audio in results.values())
+    difference = np.abs(results["temp-wav"][:length] - results["in-memory"][:length]).max()
+    print(f"max sample difference: {difference:.2e} (s16 WAV quantization and resampler differences)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+比较繁体转换在一小时字幕上的耗时：OpenCC 整体转换 vs 逐行转换 + 短句缓存（冷 / 热）
+
+两种 OpenCC 实现都以 opencc 包名安装，无法同时存在；分别在安装了原生绑定（pip install opencc）
+和纯 Python 实现（opencc-python-reimplemented）的环境中运行本脚本即可比较后端。
+
+用法（在 api/ 目录下）：
+    python -m benchmarks.bench_opencc_backends --profiles s2t s2tw s2hk
+"""
+import argparse
+import random
+import time
+
+from src.utils import text_conversion
+
+PHRASES = [
+    "我们今天讨论一下", "这个项目的进展情况", "计算机软件", "后台服务", "数据库迁移", "头发", "里面",
+    "发现了一个问题", "需要重新设计", "用户反馈", "鼠标和键盘", "网络连接", "下个星期", "开会的时候",
+]
+FILLERS = ["好的", "对对对", "嗯", "谢谢大家", "没问题"]
+
+
+def hour_long_srt(seed: int, cue_seconds: float = 3.0) -> str:
+    """约一小时的中文 SRT，其中约两成是重复的口头语"""
+    rng = random.Random(seed)
+    parts = []
+    for index in range(int(3600 / cue_seconds)):
+        start = int(index * cue_seconds * 1000)
+        end = int((index + 1) * cue_seconds * 1000)
+        if rng.random() < 0.2:
+            text = rng.choice(FILLERS)
+        else:
+            text = "".join(rng.choice(PHRASES) for _ in range(rng.randint(2, 4)))
+        parts.append(
+            f"{index + 1}\n{start // 3600000:02}:{start // 60000 % 60:02}:{start // 1000 % 60:02},{start % 1000:03} --> "
+            f"{end // 3600000:02}:{end // 60000 % 60:02}:{end // 1000 % 60:02},{end % 1000:03}\n{text}\n\n"
+        )
+    return "".join(parts)
+
+
+def best_of(rounds, fn):
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=["s2t", "s2tw", "s2hk"])
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    srt = hour_long_srt(args.seed)
+    print(f"backend={text_conversion.conversion_backend()}, transcript {len(srt)} chars")
+
+    for profile in args.profiles:
+        converter = text_conversion._get_converter(profile)
+        whole = best_of(args.rounds, lambda: converter.convert(srt))
+
+        def cold():
+            text_conversion._convert_phrase.cache_clear()
+            text_conversion.convert_to_traditional_chinese(srt, profile)
+
+        cold_seconds = best_of(args.rounds, cold)
+        warm_seconds = best_of(args.rounds, lambda: text_conversion.convert_to_traditional_chinese(srt, profile))
+        assert text_conversion.convert_to_traditional_chinese(srt, profile) == converter.convert(srt)
+        print(
+            f"{profile:<5} whole {whole * 1000:8.1f} ms | lines+cache cold {cold_seconds * 1000:8.1f} ms "
+            f"({whole / cold_seconds:.1f}x) | warm {warm_seconds * 1000:8.1f} ms ({whole / warm_seconds:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
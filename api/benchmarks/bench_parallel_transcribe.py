@@ -0,0 +1,66 @@
+"""
+比较顺序转录与静音切分并行转录的耗时和输出差异
+
+切分进程只为一个任务启动，任务结束即退出，因此并行耗时包含各子进程加载模型的时间。
+
+用法（在 api/ 目录下）：
+    python -m benchmarks.bench_parallel_transcribe path/to/long_audio.mp3 --workers 4
+"""
+import argparse
+import difflib
+import time
+
+from src.workers.parallel_transcribe import transcribe_parallel
+from src.workers.transcribe_worker import load_whisper_model
+
+TRANSCRIBE_OPTIONS = {
+    "word_timestamps": True,
+    "vad_filter": True,
+    "vad_parameters": dict(min_silence_duration_ms=500),
+}
+
+
+def run_sequential(model, audio_path, language):
+    started = time.perf_counter()
+    segments, info = model.transcribe(audio_path, language=language, **TRANSCRIBE_OPTIONS)
+    segments = list(segments)
+    return time.perf_counter() - started, segments, info.duration
+
+
+def run_parallel(model, audio_path, language, workers):
+    started = time.perf_counter()
+    result = transcribe_parallel(model, audio_path, language, TRANSCRIBE_OPTIONS, num_workers=workers, min_duration=0)
+    if result is None:
+        raise SystemExit("Audio has no usable silence to split at")
+    segments, info = result
+    segments = list(segments)
+    return time.perf_counter() - started, segments, info.chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("audio_path")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--language", default=None)
+    parser.add_argument("--model", default="large-v3")
+    args = parser.parse_args()
+
+    model = load_whisper_model(args.model)
+
+    sequential_seconds, sequential_segments, duration = run_sequential(model, args.audio_path, args.language)
+    print(f"audio duration      : {duration:.1f}s")
+    print(f"sequential          : {sequential_seconds:.1f}s (RTF {sequential_seconds / duration:.3f}), {len(sequential_segments)} segments")
+
+    parallel_seconds, parallel_segments, chunks = run_parallel(model, args.audio_path, args.language, args.workers)
+
+    print(f"parallel            : {parallel_seconds:.1f}s (RTF {parallel_seconds / duration:.3f}), {chunks} chunks, {len(parallel_segments)} segments")
+    print(f"speedup             : {sequential_seconds / parallel_seconds:.2f}x")
+
+    sequential_text = "".join(segment.text.strip() for segment in sequential_segments)
+    parallel_text = "".join(segment.text.strip() for segment in parallel_segments)
+    similarity = difflib.SequenceMatcher(None, sequential_text, parallel_text, autojunk=False).ratio()
+    print(f"text similarity     : {similarity:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+比较新的标点对齐模块与旧版逐字符实作在 500 字段落上的耗时
+
+分两组报告：只插入标点的段落（走按偏移切片的快速路径）与含 [UNK] 的段落（走逐字对齐路径，
+与旧版逐步一致，耗时相近）。
+
+用法（在 api/ 目录下，必须以 -m 模块方式运行：脚本要导入 src 与 tests 包，
+直接 python benchmarks/bench_punctuation_alignment.py 会报 No module named 'src'）：
+    python -m benchmarks.bench_punctuation_alignment --paragraphs 200
+"""
+import argparse
+import random
+import time
+
+from src.utils.punctuation_alignment import distribute_punctuation_to_segments
+from tests.test_punctuation_alignment import _legacy_distribute
+
+ALPHABET = "我你他們的是了在有不這個好說天來去要會就也和對能下過時"
+PUNCTUATION = "，。！？、；"
+
+
+def make_paragraph(rng, chars, unk_rate):
+    segments, remaining = [], chars
+    while remaining > 0:
+        length = min(remaining, rng.randint(20, 60))
+        segments.append("".join(rng.choice(ALPHABET) for _ in range(length)))
+        remaining -= length
+    punctuated = []
+    for char in "".join(segments):
+        punctuated.append("[UNK]" if rng.random() < unk_rate else char)
+        if rng.random() < 0.08:
+            punctuated.append(rng.choice(PUNCTUATION))
+    return segments, "".join(punctuated)
+
+
+def time_function(function, cases, rounds):
+    # 取多轮中最快的一轮，减少机器噪声的影响
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for segments, punctuated in cases:
+            function(segments, "".join(segments), punctuated)
+        best = min(best, time.perf_counter() - started)
+    return best / len(cases)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, default=200)
+    parser.add_argument("--chars", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    for label, unk_rate in (("punctuation only", 0.0), ("with [UNK] tokens", 0.01)):
+        cases = [make_paragraph(rng, args.chars, unk_rate) for _ in range(args.paragraphs)]
+        for segments, punctuated in cases:
+            assert distribute_punctuation_to_segments(segments, "".join(segments), punctuated) == \
+                _legacy_distribute(segments, "".join(segments), punctuated)
+        legacy = time_function(_legacy_distribute, cases, args.rounds)
+        current = time_function(distribute_punctuation_to_segments, cases, args.rounds)
+        print(f"{label:<18}: legacy {legacy * 1e6:.0f}us, current {current * 1e6:.0f}us per paragraph, "
+              f"speedup {legacy / current:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+比较规则标点引擎与旧版逐条 re.sub 实作在 500 字段落上的耗时
+
+用法（在 api/ 目录下）：
+    python -m benchmarks.bench_punctuation_rules --paragraphs 200 --chars 500
+"""
+import argparse
+import random
+import time
+
+from src.utils.punctuation_rules import CONJUNCTIONS, QUESTION_WORDS, TRANSITIONS, add_chinese_punctuation
+from tests.test_punctuation_rules import _legacy_add_chinese_punctuation
+
+FILLER = ["我们", "今天", "讨论", "这个", "项目", "的", "进展", "情况", "大家", "觉得", "可以", "一下"]
+
+
+def make_paragraph(rng, chars, keyword_rate):
+    """无标点的转录段落，按比例夹杂疑问词、连接词和转折词"""
+    keywords = QUESTION_WORDS + CONJUNCTIONS + TRANSITIONS
+    words, length = [], 0
+    while length < chars:
+        word = rng.choice(keywords) if rng.random() < keyword_rate else rng.choice(FILLER)
+        words.append(word)
+        length += len(word)
+    return "".join(words)[:chars]
+
+
+def best_of(rounds, fn, paragraphs):
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for paragraph in paragraphs:
+            fn(paragraph, "zh")
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, default=200)
+    parser.add_argument("--chars", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for keyword_rate in (0.0, 0.05, 0.2):
+        paragraphs = [make_paragraph(rng, args.chars, keyword_rate) for _ in range(args.paragraphs)]
+        assert [add_chinese_punctuation(p, "zh") for p in paragraphs] == \
+            [_legacy_add_chinese_punctuation(p, "zh") for p in paragraphs]
+
+        legacy = best_of(args.rounds, _legacy_add_chinese_punctuation, paragraphs)
+        engine = best_of(args.rounds, add_chinese_punctuation, paragraphs)
+        print(
+            f"keyword rate {keyword_rate:.2f}: legacy {legacy / args.paragraphs * 1e6:8.1f} us/paragraph, "
+            f"engine {engine / args.paragraphs * 1e6:8.1f} us/paragraph ({legacy / engine:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
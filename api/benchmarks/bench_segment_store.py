@@ -0,0 +1,99 @@
+"""
+比较 SubtitleCue 列表（旧版）与列式 SegmentStore 在合成长转录上的内存占用
+
+每种方式在独立的子进程中运行：逐个生成 faster-whisper Segment（含 tokens 与可选的词列表），
+保存处理后的文本并渲染 srt / txt / json。报告相对导入完成时的 RSS 增量：渲染前（保存全部
+segment 后）的常驻内存与整个过程的峰值（峰值包含两种方式相同的渲染结果）。
+
+用法（在 api/ 目录下）：
+    python -m benchmarks.bench_segment_store --segments 10000 --words
+"""
+import argparse
+import multiprocessing
+import resource
+import time
+
+SAMPLE_TEXT = "我们今天讨论一下这个项目的进展情况"
+
+
+def current_rss_kb() -> int:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * resource.getpagesize() // 1024
+
+
+def synthetic_segments(count, with_words):
+    from faster_whisper.transcribe import Segment, Word
+
+    for index in range(count):
+        start = index * 3.0
+        text = f" {SAMPLE_TEXT}{index}"
+        words = None
+        if with_words:
+            words = [Word(start + n * 0.15, start + n * 0.15 + 0.12, char, 0.9) for n, char in enumerate(text.strip())]
+        yield Segment(
+            id=index, seek=0, start=start, end=start + 2.5, text=text, tokens=list(range(50000, 50030)),
+            avg_logprob=-0.2, compression_ratio=1.3, no_speech_prob=0.01, words=words, temperature=0.0,
+        )
+
+
+def run_cues(segments, with_words, formats):
+    from src.utils.subtitle_renderer import SubtitleCue, compact_words, render_subtitles
+
+    cues = []
+    for segment in segments:
+        text = segment.text.strip()
+        words = compact_words(segment.words) if with_words else None
+        cues.append(SubtitleCue(segment.start, segment.end, text, text + "。", words))
+    ingested = current_rss_kb()
+    return ingested, render_subtitles(cues, "zh", formats)
+
+
+def run_store(segments, with_words, formats):
+    from src.utils.segment_store import SegmentStore
+    from src.utils.subtitle_renderer import render_subtitles
+
+    store = SegmentStore(word_timestamps=with_words)
+    for segment in segments:
+        text = segment.text.strip()
+        index = store.append(segment.start, segment.end, text, segment.words)
+        store.set_outputs(index, [text], [text + "。"])
+    ingested = current_rss_kb()
+    return ingested, render_subtitles(store.cues(), "zh", formats)
+
+
+def measure(mode, count, with_words, results):
+    # 预先导入，使基线包含模块本身占用的内存
+    import faster_whisper.transcribe  # noqa: F401
+    import src.utils.segment_store  # noqa: F401
+
+    formats = ("srt", "txt", "json") if with_words else ("srt", "txt")
+    baseline = current_rss_kb()
+    started = time.perf_counter()
+    runner = run_store if mode == "store" else run_cues
+    ingested, rendered = runner(synthetic_segments(count, with_words), with_words, formats)
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((mode, ingested - baseline, peak - baseline, elapsed, len(rendered["srt"])))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segments", type=int, default=10000)
+    parser.add_argument("--words", action="store_true", help="同时保存词级时间戳并输出 json")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    for mode in ("cues", "store"):
+        process = context.Process(target=measure, args=(mode, args.segments, args.words, results))
+        process.start()
+        mode, ingested_kb, peak_kb, elapsed, srt_chars = results.get()
+        process.join()
+        print(
+            f"{mode:<5}: before render +{ingested_kb / 1024:6.1f} MiB, peak +{peak_kb / 1024:6.1f} MiB, "
+            f"{elapsed:.2f}s ({srt_chars} srt chars)"
+        )
+
+
+if __name__ == "__main__":
+    main()
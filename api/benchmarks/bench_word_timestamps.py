@@ -0,0 +1,46 @@
+"""
+比较开启与关闭词级时间戳（word_timestamps）时的转录耗时
+
+用法（在 api/ 目录下）：
+    python -m benchmarks.bench_word_timestamps path/to/audio.mp3 --model small
+"""
+import argparse
+import time
+
+from src.workers.transcribe_worker import load_whisper_model
+
+TRANSCRIBE_OPTIONS = {
+    "vad_filter": True,
+    "vad_parameters": dict(min_silence_duration_ms=500),
+}
+
+
+def run(model, audio_path, language, word_timestamps):
+    started = time.perf_counter()
+    segments, info = model.transcribe(
+        audio_path, language=language, word_timestamps=word_timestamps, **TRANSCRIBE_OPTIONS
+    )
+    segments = list(segments)
+    return time.perf_counter() - started, len(segments), info.duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("audio_path")
+    parser.add_argument("--language", default=None)
+    parser.add_argument("--model", default="large-v3")
+    parser.add_argument("--rounds", type=int, default=2)
+    args = parser.parse_args()
+
+    model = load_whisper_model(args.model)
+    run(model, args.audio_path, args.language, False)  # 预热
+
+    for word_timestamps in (False, True):
+        runs = [run(model, args.audio_path, args.language, word_timestamps) for _ in range(args.rounds)]
+        best = min(seconds for seconds, _, _ in runs)
+        _, segment_count, duration = runs[0]
+        print(f"word_timestamps={str(word_timestamps):<5}: {best:.1f}s (RTF {best / duration:.3f}), {segment_count} segments")
+
+
+if __name__ == "__main__":
+    main()
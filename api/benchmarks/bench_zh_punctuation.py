@@ -0,0 +1,68 @@
+"""
+比较 zhpr 标点模型在不同 CPU 推理后端（fp32 / int8 / torchscript）下的耗时和输出差异
+
+用法（在 api/ 目录下）：
+    python -m benchmarks.bench_zh_punctuation path/to/transcript.txt --threads 4
+不指定文本文件时使用内置的示例段落重复生成的长文本。
+"""
+import argparse
+import difflib
+import time
+
+import torch
+
+from src.workers.transcribe_worker import ZHPR_BACKENDS, _ZhPunctuationRestorer
+
+SAMPLE_PARAGRAPH = (
+    "今天我们来讨论一下这个项目的进度大家都知道上个月我们遇到了一些问题"
+    "主要是数据处理的速度太慢所以这周我们重新设计了整个流程你们觉得这样可以吗"
+)
+
+
+def load_paragraphs(path, repeat):
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()]
+    return [SAMPLE_PARAGRAPH * 4] * repeat
+
+
+def run_backend(backend, paragraphs, rounds):
+    restorer = _ZhPunctuationRestorer(device="cpu", backend=backend)
+    restorer.punctuate_many(paragraphs[:2])  # 预热（torchscript 首次调用会做图优化）
+    started = time.perf_counter()
+    for _ in range(rounds):
+        output = restorer.punctuate_many(paragraphs)
+    return (time.perf_counter() - started) / rounds, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("text_path", nargs="?", default=None)
+    parser.add_argument("--repeat", type=int, default=50, help="未指定文本时生成的段落数")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--backends", nargs="+", default=list(ZHPR_BACKENDS), choices=ZHPR_BACKENDS)
+    args = parser.parse_args()
+
+    if args.threads > 0:
+        torch.set_num_threads(args.threads)
+    paragraphs = load_paragraphs(args.text_path, args.repeat)
+    total_chars = sum(len(paragraph) for paragraph in paragraphs)
+    print(f"paragraphs          : {len(paragraphs)} ({total_chars} chars), {torch.get_num_threads()} threads")
+
+    baseline_seconds, baseline_output = None, None
+    for backend in args.backends:
+        seconds, output = run_backend(backend, paragraphs, args.rounds)
+        if baseline_output is None:
+            baseline_seconds, baseline_output = seconds, output
+        similarity = difflib.SequenceMatcher(
+            None, "".join(baseline_output), "".join(output), autojunk=False
+        ).ratio()
+        print(
+            f"{backend:<20}: {seconds:.2f}s ({total_chars / seconds:.0f} chars/s), "
+            f"speedup {baseline_seconds / seconds:.2f}x, similarity to {args.backends[0]} {similarity:.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,8 @@ import tempfile
 import pathlib
 from apscheduler.schedulers.blocking import BlockingScheduler
 
+from .utils.audio_cache import DECODED_AUDIO_DIR, enforce_size_limit, remove_expired_audio
+
 TEMP_DIR = pathlib.Path(tempfile.gettempdir()) / "converted_audios"
 EXPIRATION_SECONDS = 60 * 60  # 1 小時
 
@@ -29,16 +31,25 @@ def clean_audio_files():
         logging.info(f"Cleanup job removed {removed} files from {TEMP_DIR}")
 
 
+def clean_decoded_audio():
+    """Remove decoded-audio cache entries past their TTL, then trim the cache to its byte budget."""
+    removed = remove_expired_audio() + enforce_size_limit()
+    if removed:
+        logging.info(f"Cleanup job removed {removed} decoded audio files from {DECODED_AUDIO_DIR}")
+
+
 def main():
     logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
     logging.info("Audio cleanup service started. Scanning directory: %s", TEMP_DIR)
 
     # 初次啟動時先清一次
     clean_audio_files()
+    clean_decoded_audio()
 
     scheduler = BlockingScheduler()
     # 每 10 分鐘執行一次
     scheduler.add_job(clean_audio_files, "interval", minutes=10, id="audio_cleanup")
+    scheduler.add_job(clean_decoded_audio, "interval", minutes=10, id="decoded_audio_cleanup")
     try:
         scheduler.start()
     except (KeyboardInterrupt, SystemExit):
@@ -7,10 +7,13 @@ import os
 import logging
 import uuid
 import threading
-from threading import Semaphore
 import time
-from ..workers.convert_worker import convert_worker
+from datetime import datetime, timezone
+from ..workers.convert_worker import ENCODE_STATS_FIELDS, convert_worker, stats_key
 from ..utils.ffmpeg_utils import get_supported_formats
+from ..utils.admission_queue import AdmissionQueue, QueueFullError
+from ..utils.upload_utils import spool_upload, UploadTooLargeError, MAX_UPLOAD_BYTES
+from starlette.concurrency import run_in_threadpool
 from urllib.parse import quote
 import re
 import shutil
@@ -19,9 +22,10 @@ import pathlib
 # 设置日志配置
 logger = logging.getLogger(__name__)
 
-# 并发控制配置 — 使用信号量限制同时进行的转换任务数量
+# 并发控制配置 — 同时运行的转换任务数量上限，超出的任务进入有界 FIFO 队列等待
 MAX_CONCURRENT_CONVERT_TASKS = int(os.getenv("MAX_CONCURRENT_CONVERT_TASKS", "2"))
-convert_semaphore = Semaphore(MAX_CONCURRENT_CONVERT_TASKS)
+MAX_QUEUED_CONVERT_TASKS = int(os.getenv("MAX_QUEUED_CONVERT_TASKS", "10"))
+convert_queue = AdmissionQueue(MAX_CONCURRENT_CONVERT_TASKS, MAX_QUEUED_CONVERT_TASKS, name="conversion")
 
 # 任务管理
 active_convert_tasks: Dict[str, Dict] = {}  # 存储活跃的转换任务
@@ -40,6 +44,18 @@ chunk_upload_tasks: Dict[str, Dict] = {}
 
 router = APIRouter(prefix="/convert", tags=["convert"])
 
+
+def _queue_info(task_id: str) -> Dict:
+    """排队中任务的队列位置与预计开始时间"""
+    estimated_start = convert_queue.estimated_start(task_id)
+    return {
+        "queue_position": convert_queue.position(task_id),
+        "estimated_start_time": (
+            datetime.fromtimestamp(estimated_start, timezone.utc).isoformat()
+            if estimated_start is not None else None
+        ),
+    }
+
 class ConversionTask:
     def __init__(self, task_id: str):
         self.task_id = task_id
@@ -79,11 +95,11 @@ class ConversionTask:
             }
         },
         429: {
-            "description": "同时转换任务数量超过限制",
+            "description": "转换排队队列已满",
             "content": {
                 "application/json": {
                     "example": {
-                        "detail": "Too many concurrent conversion requests. Please try again later."
+                        "detail": "Conversion queue is full. Please try again later."
                     }
                 }
             }
@@ -95,7 +111,7 @@ async def start_video_to_audio_conversion(
     format: str = Form("mp3"),
     quality: str = Form("medium")
 ):
-    """启动视频转音频任务，返回任务ID"""
+    """启动视频转音频任务，返回任务ID；运行槽位已满时任务进入队列等待"""
     # 验证格式参数
     supported_formats = get_supported_formats()
     if format not in supported_formats:
@@ -111,11 +127,11 @@ async def start_video_to_audio_conversion(
             detail="Quality must be one of: high, medium, low"
         )
     
-    # 并发控制：若已达到上限则立即拒绝请求
-    if not convert_semaphore.acquire(blocking=False):
+    # 并发控制：仅当排队队列也已满时才拒绝请求
+    if convert_queue.is_full():
         raise HTTPException(
             status_code=429,
-            detail="Too many concurrent conversion requests. Please try again later."
+            detail="Conversion queue is full. Please try again later."
         )
 
     task_id = str(uuid.uuid4())
@@ -124,49 +140,42 @@ async def start_video_to_audio_conversion(
 
     # 验证文件类型
     if not file.content_type or not file.content_type.startswith("video/"):
-        convert_semaphore.release()
         raise HTTPException(
             status_code=400,
             detail="Please upload a video file"
         )
 
-    # 暂存文件
+    # 暂存文件：分块流式写入磁盘，避免整个视频读入内存
     file_extension = os.path.splitext(file.filename or "video")[1] or ".mp4"
     with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_video:
-        temp_video.write(await file.read())
         temp_video_path = temp_video.name
-        logger.info(f"Temporary video file created at: {temp_video_path}")
+        try:
+            upload_info = await spool_upload(file, temp_video)
+        except UploadTooLargeError as e:
+            temp_video.close()
+            os.remove(temp_video_path)
+            raise HTTPException(status_code=413, detail=str(e))
+    logger.info(f"Temporary video file created at: {temp_video_path} ({upload_info.size} bytes)")
 
     # 创建任务
     task = ConversionTask(task_id)
-    
-    # 创建进程间通信对象
-    result_queue = Queue()
-    manager = Manager()
-    progress_dict = manager.dict()
-    progress_dict[task_id] = 0
-    
-    # 创建并启动转换进程
-    process = Process(
-        target=convert_worker,
-        args=(temp_video_path, format, quality, result_queue, progress_dict, task_id)
-    )
-    process.start()
-    task.process = process
+    task.status = "queued"
     
     active_convert_tasks[task_id] = {
         "task": task,
         "temp_file": temp_video_path,
         "filename": file.filename,
+        "file_size": upload_info.size,
+        "sha256": upload_info.sha256,
         "format": format,
         "quality": quality,
-        "process": process,
-        "result_queue": result_queue,
-        "progress_dict": progress_dict
+        "process": None,
+        "result_queue": None,
+        "progress_dict": {task_id: 0}
     }
     
     # 在后台线程中监控进程
-    def monitor_process():
+    def monitor_process(process, result_queue):
         import time
         logger.info(f"MONITOR: Entering monitor_process function for task {task_id}")
         try:
@@ -279,22 +288,45 @@ async def start_video_to_audio_conversion(
             except Exception:
                 pass
 
-            # 釋放信號量
-            convert_semaphore.release()
+            # 釋放運行槽位並啟動下一個排隊任務
+            convert_queue.release(task_id)
             # 清理暂存文件
             if os.path.exists(temp_video_path):
                 os.remove(temp_video_path)
                 logger.info(f"Temporary video file deleted: {temp_video_path}")
     
-    monitor_thread = threading.Thread(target=monitor_process)
-    monitor_thread.daemon = True  # 設置為守護線程
-    monitor_thread.start()
-    logger.info(f"Monitor thread started with ID: {monitor_thread.ident} for task {task_id}")
-    
+    def start_conversion():
+        process, result_queue = _spawn_conversion_process(task_id, temp_video_path, format, quality)
+        monitor_thread = threading.Thread(target=monitor_process, args=(process, result_queue))
+        monitor_thread.daemon = True  # 設置為守護線程
+        monitor_thread.start()
+        logger.info(f"Monitor thread started with ID: {monitor_thread.ident} for task {task_id}")
+
+    # 有空闲槽位时立即启动，否则进入队列
+    try:
+        queue_position = convert_queue.submit(task_id, start_conversion)
+    except QueueFullError:
+        active_convert_tasks.pop(task_id, None)
+        if os.path.exists(temp_video_path):
+            os.remove(temp_video_path)
+        raise HTTPException(
+            status_code=429,
+            detail="Conversion queue is full. Please try again later."
+        )
+
+    if queue_position:
+        return {
+            "task_id": task_id,
+            "status": "queued",
+            "message": "视频转音频任务已进入队列",
+            "queue_position": queue_position
+        }
+
     return {
         "task_id": task_id,
         "status": "started",
-        "message": "视频转音频任务已启动"
+        "message": "视频转音频任务已启动",
+        "queue_position": 0
     }
 
 @router.post("/{task_id}/cancel",
@@ -331,8 +363,15 @@ async def cancel_conversion_task(task_id: str):
     task_info = active_convert_tasks[task_id]
     task = task_info["task"]
     
-    # 取消任务
-    task.cancel()
+    # 取消任务：仍在排队的任务直接移出队列并清理暂存文件
+    if convert_queue.cancel(task_id):
+        task.cancel()
+        temp_file = task_info.get("temp_file")
+        if temp_file and os.path.exists(temp_file):
+            os.remove(temp_file)
+        active_convert_tasks.pop(task_id, None)
+    else:
+        task.cancel()
     logger.info(f"Conversion task {task_id} has been cancelled")
     
     return {
@@ -380,7 +419,7 @@ async def get_conversion_status(task_id: str):
         
         current_progress = progress_dict.get(task_id, 0)
         
-        return {
+        response = {
             "task_id": task_id,
             "status": task.status,
             "progress": current_progress,
@@ -388,17 +427,25 @@ async def get_conversion_status(task_id: str):
             "format": task_info["format"],
             "quality": task_info["quality"]
         }
+        # ffmpeg -progress 报告的编码统计：已编码时长（秒）、编码速度（实时倍数）、已输出字节数
+        response.update(dict.fromkeys(ENCODE_STATS_FIELDS))
+        response.update(progress_dict.get(stats_key(task_id)) or {})
+        if task.status == "queued":
+            response.update(_queue_info(task_id))
+        return response
     
     # 检查已完成任务
     if task_id in convert_results:
         result = convert_results[task_id]
+        encode_stats = result.get("encode_stats") or {}
         return {
             "task_id": task_id,
             "status": result.get("status", "completed"),
             "progress": 100,
             "format": result.get("format"),
             "quality": result.get("quality"),
-            "file_size": result.get("file_size")
+            "file_size": result.get("file_size"),
+            **{field: encode_stats.get(field) for field in ENCODE_STATS_FIELDS},
         }
     
     raise HTTPException(status_code=404, detail="任务不存在")
@@ -503,16 +550,19 @@ async def list_active_conversion_tasks():
         task = task_info["task"]
         progress_dict = task_info["progress_dict"]
         
-        tasks.append({
+        entry = {
             "task_id": task_id,
             "status": task.status,
             "progress": progress_dict.get(task_id, 0),
             "filename": task_info["filename"],
             "format": task_info["format"],
             "quality": task_info["quality"]
-        })
+        }
+        if task.status == "queued":
+            entry.update(_queue_info(task_id))
+        tasks.append(entry)
     
-    return {"active_tasks": tasks, "count": len(tasks)}
+    return {"active_tasks": tasks, "count": len(tasks), "queue": convert_queue.stats()}
 
 @router.get("/formats")
 async def get_supported_audio_formats():
@@ -566,6 +616,31 @@ async def download_converted_audio(task_id: str):
         }
     )
 
+def _spawn_conversion_process(task_id: str, input_path: str, format: str, quality: str):
+    """為已登記的任務建立進程間通信對象並啟動轉換進程。"""
+    task_info = active_convert_tasks[task_id]
+    task: ConversionTask = task_info["task"]
+
+    # 创建进程间通信对象
+    result_queue = Queue()
+    manager = Manager()
+    progress_dict = manager.dict()
+    progress_dict[task_id] = 0
+
+    # 创建并启动转换进程
+    process = Process(
+        target=convert_worker,
+        args=(input_path, format, quality, result_queue, progress_dict, task_id)
+    )
+    process.start()
+    task.process = process
+    task.status = "running"
+
+    task_info["process"] = process
+    task_info["result_queue"] = result_queue
+    task_info["progress_dict"] = progress_dict
+    return process, result_queue
+
 def _monitor_conversion_process(task_id: str):
     """複用原先的 monitor 邏輯，抽出供分片上傳流程使用。"""
     try:
@@ -643,8 +718,8 @@ def _monitor_conversion_process(task_id: str):
         except Exception:
             pass
 
-        # 釋放信號量
-        convert_semaphore.release()
+        # 釋放運行槽位並啟動下一個排隊任務
+        convert_queue.release(task_id)
 
 @router.post("/upload_chunk")
 async def upload_video_chunk(
@@ -659,6 +734,9 @@ async def upload_video_chunk(
     """接收分片並在最後一片整合後啟動轉檔流程。"""
     # 初始化任務
     if task_id is None:
+        # 排隊隊列已滿時在第一片就拒絕，避免客戶端白白上傳整個檔案
+        if convert_queue.is_full():
+            raise HTTPException(status_code=429, detail="Conversion queue is full. Please try again later.")
         task_id = str(uuid.uuid4())
         task_dir = chunk_upload_base_dir / task_id
         task_dir.mkdir(parents=True, exist_ok=True)
@@ -666,6 +744,7 @@ async def upload_video_chunk(
             "dir": str(task_dir),
             "total_chunks": total_chunks,
             "received": set(),  # type: Set[int]
+            "chunk_sizes": {},  # type: Dict[int, int]
             "format": format,
             "quality": quality,
             "filename": filename,
@@ -675,11 +754,21 @@ async def upload_video_chunk(
             raise HTTPException(status_code=400, detail="Invalid task_id")
         task_dir = pathlib.Path(chunk_upload_tasks[task_id]["dir"])
 
-    # 儲存分片到臨時檔
+    # 儲存分片到臨時檔（分塊寫入，總大小不得超過上限）
+    chunk_sizes = chunk_upload_tasks[task_id]["chunk_sizes"]
+    remaining_bytes = MAX_UPLOAD_BYTES - sum(size for index, size in chunk_sizes.items() if index != chunk_index)
     chunk_path = task_dir / f"{chunk_index}.part"
     with open(chunk_path, "wb") as f:
-        f.write(await chunk.read())
-
+        try:
+            chunk_info = await spool_upload(chunk, f, max_bytes=max(remaining_bytes, 1))
+        except UploadTooLargeError:
+            chunk_info = None
+    if chunk_info is None:
+        shutil.rmtree(task_dir, ignore_errors=True)
+        chunk_upload_tasks.pop(task_id, None)
+        raise HTTPException(status_code=413, detail=f"Upload exceeds maximum size of {MAX_UPLOAD_BYTES} bytes")
+
+    chunk_sizes[chunk_index] = chunk_info.size
     chunk_upload_tasks[task_id]["received"].add(chunk_index)
 
     # 若尚未收到全部分片
@@ -694,31 +783,21 @@ async def upload_video_chunk(
     # 確保只有在最後一片時才往下
     logger.info(f"[CHUNK] All chunks received for task {task_id}, assembling …")
 
-    # 將分片合併
+    # 將分片合併（在執行緒池中進行，避免阻塞事件循環）
     combined_path = task_dir / f"combined_{task_id}{pathlib.Path(filename).suffix or '.mp4'}"
-    with open(combined_path, "wb") as outfile:
-        for i in range(total_chunks):
-            part_path = task_dir / f"{i}.part"
-            with open(part_path, "rb") as infile:
-                shutil.copyfileobj(infile, outfile)
 
-    # 取得執行資格
-    if not convert_semaphore.acquire(blocking=False):
-        raise HTTPException(status_code=429, detail="Too many concurrent conversion requests. Please try again later.")
+    def _assemble_chunks():
+        with open(combined_path, "wb") as outfile:
+            for i in range(total_chunks):
+                part_path = task_dir / f"{i}.part"
+                with open(part_path, "rb") as infile:
+                    shutil.copyfileobj(infile, outfile)
+
+    await run_in_threadpool(_assemble_chunks)
 
     # 建立轉檔任務
     conv_task = ConversionTask(task_id)
-    result_queue = Queue()
-    manager = Manager()
-    progress_dict = manager.dict()
-    progress_dict[task_id] = 0
-
-    process = Process(
-        target=convert_worker,
-        args=(str(combined_path), format, quality, result_queue, progress_dict, task_id),
-    )
-    process.start()
-    conv_task.process = process
+    conv_task.status = "queued"
 
     active_convert_tasks[task_id] = {
         "task": conv_task,
@@ -726,17 +805,38 @@ async def upload_video_chunk(
         "filename": filename,
         "format": format,
         "quality": quality,
-        "process": process,
-        "result_queue": result_queue,
-        "progress_dict": progress_dict,
+        "process": None,
+        "result_queue": None,
+        "progress_dict": {task_id: 0},
     }
 
-    # 啟動監控執行緒
-    threading.Thread(target=_monitor_conversion_process, args=(task_id,), daemon=True).start()
+    def start_conversion():
+        _spawn_conversion_process(task_id, str(combined_path), format, quality)
+        # 啟動監控執行緒
+        threading.Thread(target=_monitor_conversion_process, args=(task_id,), daemon=True).start()
+
+    # 取得執行資格：有空閒槽位時立即啟動，否則進入隊列
+    try:
+        queue_position = convert_queue.submit(task_id, start_conversion)
+    except QueueFullError:
+        # 已合併的分片目錄和上傳記錄不會再被使用，拒絕前一併清理
+        active_convert_tasks.pop(task_id, None)
+        chunk_upload_tasks.pop(task_id, None)
+        shutil.rmtree(task_dir, ignore_errors=True)
+        raise HTTPException(status_code=429, detail="Conversion queue is full. Please try again later.")
+
+    if queue_position:
+        return {
+            "task_id": task_id,
+            "status": "queued",
+            "message": "File uploaded & conversion queued",
+            "queue_position": queue_position
+        }
 
     return {
         "task_id": task_id,
         "status": "started",
-        "message": "File uploaded & conversion started"
+        "message": "File uploaded & conversion started",
+        "queue_position": 0
     }
 
@@ -0,0 +1,81 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from typing import List
+import logging
+import os
+
+from ..utils.punctuation_rules import add_chinese_punctuation
+
+# 设置日志配置
+logger = logging.getLogger(__name__)
+
+# 单次请求允许的文本数量与总字符数上限
+MAX_PUNCTUATE_TEXTS = int(os.getenv("MAX_PUNCTUATE_TEXTS", "256"))
+MAX_PUNCTUATE_CHARS = int(os.getenv("MAX_PUNCTUATE_CHARS", "200000"))
+
+# 共享 zhpr 标点服务，由 lifespan 在启用且安装了 zhpr 时注入；为 None 时使用规则标点
+punctuation_service = None
+
+router = APIRouter(prefix="/punctuate", tags=["punctuate"])
+
+
+class PunctuateRequest(BaseModel):
+    texts: List[str]
+
+
+class PunctuateResponse(BaseModel):
+    texts: List[str]
+    engine: str  # zhpr（共享标点服务）或 rules（规则标点）
+
+
+def _punctuate_with_rules(texts: List[str]) -> List[str]:
+    return [add_chinese_punctuation(text, "zh") for text in texts]
+
+
+@router.post(
+    "/",
+    response_model=PunctuateResponse,
+    responses={
+        200: {
+            "description": "按请求顺序返回加上标点的文本",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "texts": ["今天天气很好，我们去公园散步吧。"],
+                        "engine": "zhpr"
+                    }
+                }
+            }
+        },
+        400: {
+            "description": "文本数量或总字符数超过上限",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "detail": "At most 256 texts can be punctuated per request"
+                    }
+                }
+            }
+        }
+    }
+)
+async def punctuate_texts(payload: PunctuateRequest):
+    """为中文文本添加标点：与转录任务共用 zhpr 标点服务的微批次，服务不可用时使用规则标点"""
+    if len(payload.texts) > MAX_PUNCTUATE_TEXTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_PUNCTUATE_TEXTS} texts can be punctuated per request")
+    if sum(map(len, payload.texts)) > MAX_PUNCTUATE_CHARS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_PUNCTUATE_CHARS} characters can be punctuated per request")
+    if not payload.texts:
+        return PunctuateResponse(texts=[], engine="rules")
+
+    service = punctuation_service
+    if service is not None and service.running:
+        try:
+            texts = await service.punctuate_many(payload.texts)
+            return PunctuateResponse(texts=texts, engine="zhpr")
+        except Exception as e:
+            logger.warning(f"Punctuation service failed, falling back to rules: {e}")
+
+    texts = await run_in_threadpool(_punctuate_with_rules, payload.texts)
+    return PunctuateResponse(texts=texts, engine="rules")
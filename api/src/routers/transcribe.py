@@ -1,31 +1,109 @@
-from multiprocessing import Process, Queue, Manager
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, Dict
+from starlette.concurrency import run_in_threadpool
+from typing import Optional, Dict, List
+import asyncio
+import json
 import tempfile
 import os
 import logging
 import uuid
 import threading
-from threading import Semaphore
 import time
 from datetime import datetime, timezone
-from ..workers.transcribe_worker import transcribe_worker
-from ..utils.text_conversion import convert_to_traditional_chinese
+from ..workers.transcribe_pool import TranscribePool, metrics_key
+from ..utils.admission_queue import AdmissionQueue, QueueFullError
+from ..utils.audio_processing import DENOISE_ENGINE, DENOISE_STRENGTHS
+from ..utils.upload_utils import spool_upload, UploadTooLargeError
+from ..utils.result_cache import TranscriptionCache, make_cache_key
+from ..utils.model_registry import load_model_registry, ModelSelectionError
+from ..utils.subtitle_renderer import parse_formats, DEFAULT_FORMATS
+from ..utils.text_conversion import DEFAULT_PROFILE, convert_to_traditional_chinese_async, validate_profile
 
 # 设置日志配置
 logger = logging.getLogger(__name__)
 
-# 并发控制配置 — 使用信号量限制同时进行的转录任务数量
+# 并发控制配置 — worker 进程总数，以及每个模型档位排队等待的任务数量上限
 MAX_CONCURRENT_TASKS = int(os.getenv("MAX_CONCURRENT_TASKS", "3"))  # 可通过环境变量修改
-concurrent_semaphore = Semaphore(MAX_CONCURRENT_TASKS)
+MAX_QUEUED_TASKS = int(os.getenv("MAX_QUEUED_TASKS", "20"))
+
+# 模型档位注册表：每个档位有独立的并发上限和有界 FIFO 队列
+model_registry = load_model_registry()
+tier_queues: Dict[str, AdmissionQueue] = {
+    name: AdmissionQueue(tier.max_concurrent, MAX_QUEUED_TASKS, name=f"transcription:{name}")
+    for name, tier in model_registry.tiers.items()
+}
+# 全局 worker 准入：档位放行的任务再按 FIFO 等待空闲 worker，同时运行的任务数不超过进程池大小。
+# 等待中的任务都占着档位槽位，数量不超过各档位并发之和，因此该队列不会溢出
+worker_queue = AdmissionQueue(
+    MAX_CONCURRENT_TASKS,
+    sum(tier.max_concurrent for tier in model_registry.tiers.values()),
+    name="transcription:workers",
+)
+
+# 批处理推理：每次前向解码的 VAD 片段数，0 表示使用顺序模式（可被请求参数覆盖）
+WHISPER_BATCH_SIZE = int(os.getenv("WHISPER_BATCH_SIZE", "0"))
+MAX_WHISPER_BATCH_SIZE = 64
+
+# 常驻 worker 进程池：各档位共用，同时分派的任务数由 worker_queue 限制在池大小以内。
+# 共享 zhpr 标点服务只在 lifespan 中按需创建，并在进程池启动前注入
+transcribe_pool = TranscribePool(size=MAX_CONCURRENT_TASKS)
 
 # 任务管理
 active_tasks: Dict[str, Dict] = {}  # 存储活跃的转录任务
 task_results: Dict[str, Dict] = {}  # 存储完成的任务结果
 
+# 转录结果缓存（按音频内容哈希 + 选项寻址），以及进行中任务的单飞去重
+transcription_cache = TranscriptionCache()
+inflight_transcriptions: Dict[str, str] = {}  # cache_key -> 正在执行的主任务 ID
+inflight_lock = threading.Lock()
+dedup_stats = {"attached": 0}
+
+# 流式输出：每个任务的事件记录（segment / punctuated / done），供 SSE 端点回放和跟随
+task_streams: Dict[str, List[Dict]] = {}
+STREAM_POLL_INTERVAL = float(os.getenv("TRANSCRIBE_STREAM_POLL_INTERVAL", "0.5"))
+STREAM_KEEPALIVE_SECONDS = 15
+
 router = APIRouter(prefix="/transcribe", tags=["transcribe"])
 
+
+def _task_queue(task_id: str) -> AdmissionQueue:
+    """任务所属模型档位的准入队列"""
+    return tier_queues[active_tasks[task_id]["model"]]
+
+
+def _waiting_queue(task_id: str) -> AdmissionQueue:
+    """排队中任务当前所在的队列：档位队列，或已被档位放行、等待空闲 worker 的全局队列"""
+    admission = _task_queue(task_id)
+    return admission if admission.is_queued(task_id) else worker_queue
+
+
+def _queue_info(task_id: str) -> Dict:
+    """排队中任务的队列位置与预计开始时间"""
+    admission = _waiting_queue(task_id)
+    estimated_start = admission.estimated_start(task_id)
+    return {
+        "queue_position": admission.position(task_id),
+        "estimated_start_time": (
+            datetime.fromtimestamp(estimated_start, timezone.utc).isoformat()
+            if estimated_start is not None else None
+        ),
+    }
+
+def _progress_metrics(progress_dict, task_id: str) -> Dict:
+    """运行中任务的实时指标：当前阶段、已解码时长、实时率（RTF）与预计剩余时间"""
+    metrics = progress_dict.get(metrics_key(task_id)) if progress_dict is not None else None
+    if not metrics:
+        return {}
+    metrics = dict(metrics)
+    eta_seconds = metrics.get("eta_seconds")
+    if eta_seconds is not None:
+        metrics["estimated_completion_time"] = datetime.fromtimestamp(
+            time.time() + eta_seconds, timezone.utc
+        ).isoformat()
+    return metrics
+
 class TranscriptionTask:
     def __init__(self, task_id: str):
         self.task_id = task_id
@@ -35,6 +113,8 @@ class TranscriptionTask:
         
     def cancel(self):
         """强制终止转录进程"""
+        # 先标记为已取消：尚未分派到 worker 的任务据此不再发送，已返回的结果也不会覆盖该状态
+        self.status = "cancelled"
         if self.process and self.process.is_alive():
             logger.info(f"Terminating process for task {self.task_id}")
             self.process.terminate()  # 发送 SIGTERM
@@ -45,21 +125,258 @@ class TranscriptionTask:
                 self.process.kill()  # 强制杀死进程 SIGKILL
                 
             self.process.join(timeout=5)  # 等待进程结束
-        self.status = "cancelled"
         
     def is_cancelled(self):
         return self.status == "cancelled"
 
 
+def _transcription_cache_key(
+    sha256: str,
+    language: Optional[str],
+    denoise: bool,
+    parallel: bool = False,
+    batched: bool = False,
+    model: str = "large-v3",
+    compute_type: Optional[str] = None,
+    formats=DEFAULT_FORMATS,
+    word_timestamps: bool = False,
+    denoise_strength: str = "medium",
+    profile: str = DEFAULT_PROFILE,
+) -> str:
+    """缓存键：音频内容哈希 + 影响输出的选项（并行、批处理模式的分段结果可能略有不同）"""
+    return make_cache_key(
+        sha256,
+        language=language or "auto",
+        # 降噪结果取决于引擎和强度
+        denoise=f"{DENOISE_ENGINE}:{denoise_strength}" if denoise else False,
+        model=model,
+        compute_type=compute_type or "auto",
+        vad_min_silence_ms=500,
+        parallel=bool(parallel),
+        batched=bool(batched),
+        formats=",".join(formats),
+        word_timestamps=bool(word_timestamps),
+        opencc_profile=profile,
+    )
+
+
+def _discard_task(task_id: str):
+    """移除任务登记并删除其暂存文件"""
+    task_info = active_tasks.pop(task_id, None)
+    if task_info is None:
+        return
+    temp_file = task_info.get("temp_file")
+    if temp_file and os.path.exists(temp_file):
+        os.remove(temp_file)
+        logger.info("Temporary file deleted: %s", temp_file)
+
+
+def _admit_transcription(task_id: str) -> Dict:
+    """为已登记的任务选择执行方式：命中缓存、合并到进行中的相同任务，或提交到队列。
+
+    会同步读取磁盘上的缓存结果，不要在事件循环中直接调用。
+    Raises QueueFullError when the job would have to be queued but the queue is full.
+    """
+    task_info = active_tasks[task_id]
+    task = task_info["task"]
+    cache_key = task_info["cache_key"]
+
+    cached = transcription_cache.get(cache_key)
+    if cached is not None:
+        logger.info(f"Transcription cache hit for task {task_id}")
+        task_results[task_id] = dict(cached, cache_hit=True, model=task_info["model"])
+        task.status = "completed"
+        task_streams.setdefault(task_id, []).append({"event": "done", "status": "completed", "cache_hit": True})
+        _discard_task(task_id)
+        return {"status": "completed"}
+
+    with inflight_lock:
+        primary_id = inflight_transcriptions.get(cache_key)
+        if primary_id is not None and primary_id in active_tasks:
+            # 单飞：相同内容的任务只跑一次，其余请求等待同一结果
+            active_tasks[primary_id]["followers"].append(task_id)
+            task_info["attached_to"] = primary_id
+            # 跟随任务直接共享主任务的事件记录
+            task_streams[task_id] = task_streams.setdefault(primary_id, [])
+            task.status = "running"
+            dedup_stats["attached"] += 1
+            logger.info(f"Task {task_id} attached to in-flight task {primary_id}")
+            return {"status": "attached", "attached_to": primary_id}
+
+        task_info["followers"] = []
+        inflight_transcriptions[cache_key] = task_id
+        try:
+            queue_position = _task_queue(task_id).submit(task_id, lambda: _wait_for_worker(task_id))
+        except QueueFullError:
+            inflight_transcriptions.pop(cache_key, None)
+            raise
+        if not queue_position and worker_queue.is_queued(task_id):
+            # 档位有空位但所有 worker 都忙：报告在全局队列中的位置
+            queue_position = worker_queue.position(task_id) or 0
+    return {"status": "queued" if queue_position else "started", "queue_position": queue_position}
+
+
+def _wait_for_worker(task_id: str):
+    """档位已放行：有空闲 worker 时立即启动，否则在全局 worker 队列中排队"""
+    worker_queue.submit(task_id, lambda: _start_transcription(task_id))
+
+
+def _cancel_queued(task_id: str) -> bool:
+    """把仍在排队的任务移出档位队列或全局 worker 队列。任务不在排队时返回 False"""
+    if _task_queue(task_id).cancel(task_id):
+        return True
+    if worker_queue.cancel(task_id):
+        # 归还该任务占用的档位槽位，启动档位中的下一个任务
+        _task_queue(task_id).release(task_id)
+        return True
+    return False
+
+
+def _start_transcription(task_id: str):
+    task = active_tasks[task_id]["task"]
+    task.status = "running"
+    monitor_thread = threading.Thread(target=_monitor_transcription, args=(task_id,), daemon=True)
+    monitor_thread.start()
+
+
+def _monitor_transcription(task_id: str):
+    """Dispatch the job to a warm pool worker and wait for its result in a background thread."""
+    task_info = active_tasks[task_id]
+    task = task_info["task"]
+    result = None
+    stream = task_streams.setdefault(task_id, [])
+
+    def on_dispatch(process):
+        task.process = process
+        task_info["process"] = process
+
+    def on_event(event):
+        stream.append(event)
+
+    try:
+        if not task.is_cancelled():
+            # 进程池会在 worker 被取消/崩溃后自动补充新进程
+            result = transcribe_pool.run(
+                task_id, task_info["job"], on_dispatch=on_dispatch, on_event=on_event, is_cancelled=task.is_cancelled
+            )
+
+        if task.is_cancelled():
+            # 取消后才返回的结果不保存、不写入缓存，也不交给合并等待的任务
+            result = None
+        elif result:
+            if result.get("status") == "completed":
+                # 回显模型档位，便于按档位计费和调优
+                result = dict(result, model=task_info["model"])
+                task_results[task_id] = result
+                task.status = "completed"
+                transcription_cache.put(task_info["cache_key"], result)
+            else:
+                task.status = "error"
+        else:
+            # No result and the task was not cancelled: the worker crashed.
+            task.status = "error"
+    except Exception as e:
+        logger.error(f"Error monitoring process for task {task_id}: {e}")
+        task.status = "error"
+    finally:
+        # Release the worker slot and the tier slot, and start the next queued jobs.
+        worker_queue.release(task_id)
+        tier_queues[task_info["model"]].release(task_id)
+
+        with inflight_lock:
+            if inflight_transcriptions.get(task_info["cache_key"]) == task_id:
+                inflight_transcriptions.pop(task_info["cache_key"], None)
+            followers = list(task_info.get("followers", []))
+
+        # Clean up the temporary file and remove the task from active_tasks.
+        _discard_task(task_id)
+        transcribe_pool.discard_progress(task_id)
+
+        _resolve_followers(followers, result if task.status == "completed" else None)
+        _finish_stream(task_id, stream, task.status)
+
+
+def _finish_stream(task_id: str, stream: List[Dict], status: str):
+    """写入结束事件；未成功的任务没有结果可取，事件记录在已连接的客户端读完后即释放"""
+    stream.append({"event": "done", "status": status})
+    if status != "completed" and task_streams.get(task_id) is stream:
+        task_streams.pop(task_id, None)
+
+
+def _resolve_followers(follower_ids, result: Optional[Dict]):
+    """主任务结束后处理合并等待的任务：成功则共享结果，否则各自重新提交"""
+    for follower_id in follower_ids:
+        follower_info = active_tasks.get(follower_id)
+        if follower_info is None:
+            continue
+        follower_info.pop("attached_to", None)
+        follower = follower_info["task"]
+
+        if result is not None:
+            task_results[follower_id] = dict(result, deduplicated=True, model=follower_info["model"])
+            follower.status = "completed"
+            _discard_task(follower_id)
+            continue
+
+        # 主任务失败或被取消：跟随任务还保留着自己的暂存文件，可以重新执行
+        follower.status = "queued"
+        task_streams[follower_id] = []
+        try:
+            _admit_transcription(follower_id)
+        except QueueFullError:
+            logger.error(f"Queue full, cannot restart transcription task {follower_id}")
+            follower.status = "error"
+            _discard_task(follower_id)
+            _finish_stream(follower_id, task_streams[follower_id], "error")
+
+
 class ConvertToTraditionalRequest(BaseModel):
     txt: Optional[str] = None
     srt: Optional[str] = None
+    # OpenCC 转换配置：s2t（默认）、s2tw、s2twp、s2hk
+    profile: Optional[str] = None
 
 
 class ConvertToTraditionalResponse(BaseModel):
     txt: Optional[str] = None
     srt: Optional[str] = None
 
+
+class ConvertToTraditionalBatchRequest(BaseModel):
+    documents: List[ConvertToTraditionalRequest]
+    # 未单独指定 profile 的文档使用该配置
+    profile: Optional[str] = None
+
+
+class ConvertToTraditionalBatchResponse(BaseModel):
+    documents: List[ConvertToTraditionalResponse]
+
+
+# 批量转换单次请求允许的文档数量上限
+MAX_CONVERT_BATCH_DOCUMENTS = int(os.getenv("MAX_CONVERT_BATCH_DOCUMENTS", "1000"))
+# NDJSON 流式转换中单行的最大字节数；超过的行返回 error 对象并被跳过，不会缓存在内存中
+MAX_NDJSON_LINE_BYTES = int(os.getenv("MAX_NDJSON_LINE_BYTES", str(16 * 1024 * 1024)))
+
+
+def _resolve_profile(*profiles: Optional[str]) -> str:
+    """取第一个指定的转换配置（都未指定时为默认配置），不支持的配置返回 400"""
+    try:
+        return validate_profile(next((profile for profile in profiles if profile), None))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def _convert_document(document: ConvertToTraditionalRequest, profile: str) -> ConvertToTraditionalResponse:
+    """在线程池 / 进程池中转换一份文档的 txt 和 srt，不阻塞事件循环"""
+    txt, srt = await asyncio.gather(
+        convert_to_traditional_chinese_async(document.txt, profile),
+        convert_to_traditional_chinese_async(document.srt, profile),
+    )
+    return ConvertToTraditionalResponse(
+        txt=txt if document.txt is not None else None,
+        srt=srt if document.srt is not None else None,
+    )
+
 @router.post("/", 
     responses={
         200: {
@@ -69,17 +386,38 @@ class ConvertToTraditionalResponse(BaseModel):
                     "example": {
                         "task_id": "123e4567-e89b-12d3-a456-426614174000",
                         "status": "started",
-                        "message": "转录任务已启动"
+                        "message": "转录任务已启动",
+                        "queue_position": 0
+                    }
+                }
+            }
+        },
+        400: {
+            "description": "请求参数无效",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "detail": "batch_size must be between 0 and 64"
+                    }
+                }
+            }
+        },
+        413: {
+            "description": "上传文件超过大小限制",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "detail": "Upload exceeds maximum size of 4294967296 bytes"
                     }
                 }
             }
         },
         429: {
-            "description": "同时转录任务数量超过限制",
+            "description": "转录排队队列已满",
             "content": {
                 "application/json": {
                     "example": {
-                        "detail": "Too many concurrent transcription requests. Please try again later."
+                        "detail": "Transcription queue is full. Please try again later."
                     }
                 }
             }
@@ -89,14 +427,57 @@ class ConvertToTraditionalResponse(BaseModel):
 async def start_transcribe_audio(
     file: UploadFile = File(...),
     language: Optional[str] = Form(None),
-    denoise: bool = Form(False)
+    denoise: bool = Form(False),
+    strength: Optional[str] = Form(None),
+    parallel: bool = Form(False),
+    batch_size: Optional[int] = Form(None),
+    model: Optional[str] = Form(None),
+    compute_type: Optional[str] = Form(None),
+    formats: Optional[str] = Form(None),
+    word_timestamps: bool = Form(False),
+    profile: Optional[str] = Form(None)
 ):
-    """启动转录任务，返回任务ID"""
-    # 并发控制：若已达到上限则立即拒绝请求
-    if not concurrent_semaphore.acquire(blocking=False):
+    """启动转录任务，返回任务ID；运行槽位已满时任务进入队列等待
+
+    ``parallel`` 为 True 时，长音频会在静音处切分并由多个进程并行转录。
+    ``batch_size`` 大于 0 时使用批处理推理，未提供时使用 WHISPER_BATCH_SIZE，0 表示顺序模式。
+    ``model`` / ``compute_type`` 选择模型档位和计算类型，须在模型注册表允许的范围内。
+    ``formats`` 以逗号分隔的额外输出格式（vtt、json），srt 与 txt 总是返回。
+    ``word_timestamps`` 为 True 时计算词级时间戳，并在 json 输出的每个分段中附带 words 数组。
+    ``strength`` 为降噪强度（light、medium、strong，默认 medium），仅在 ``denoise`` 为 True 时生效。
+    ``profile`` 为中文结果的繁体转换配置（s2t、s2tw、s2twp、s2hk，默认 OPENCC_PROFILE）。
+    """
+    strength = strength or "medium"
+    if strength not in DENOISE_STRENGTHS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"strength must be one of: {', '.join(DENOISE_STRENGTHS)}"
+        )
+    if batch_size is None:
+        batch_size = WHISPER_BATCH_SIZE
+    if not 0 <= batch_size <= MAX_WHISPER_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"batch_size must be between 0 and {MAX_WHISPER_BATCH_SIZE}"
+        )
+
+    try:
+        tier, compute_type = model_registry.resolve(model, compute_type)
+    except ModelSelectionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        output_formats = parse_formats(formats)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    profile = _resolve_profile(profile)
+
+    # 并发控制：仅当该档位的排队队列也已满时才拒绝请求
+    if tier_queues[tier.name].is_full():
         raise HTTPException(
             status_code=429,
-            detail="Too many concurrent transcription requests. Please try again later."
+            detail="Transcription queue is full. Please try again later."
         )
 
     task_id = str(uuid.uuid4())
@@ -107,101 +488,110 @@ async def start_transcribe_audio(
     else:
         logger.info("No language specified, will auto-detect")
     
-    logger.info("Noise reduction enabled: %s", denoise)
+    logger.info("Noise reduction enabled: %s (engine %s, strength %s)", denoise, DENOISE_ENGINE, strength)
+    logger.info("Parallel transcription requested: %s", parallel)
+    logger.info("Whisper batch size: %s", batch_size)
+    logger.info("Model tier: %s (compute type: %s)", tier.name, compute_type or "device default")
+    logger.info("Output formats: %s", ", ".join(output_formats))
+    logger.info("Word timestamps requested: %s", word_timestamps)
+    logger.info("Traditional Chinese conversion profile: %s", profile)
 
-    # 暂存文件
+    # 暂存文件：分块流式写入磁盘，同时计算大小和内容哈希
     with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as temp_audio:
-        temp_audio.write(await file.read())
         temp_audio_path = temp_audio.name
-        logger.info("Temporary file created at: %s", temp_audio_path)
+        try:
+            upload_info = await spool_upload(file, temp_audio)
+        except UploadTooLargeError as e:
+            temp_audio.close()
+            os.remove(temp_audio_path)
+            raise HTTPException(status_code=413, detail=str(e))
+    logger.info("Temporary file created at: %s (%d bytes, sha256=%s)", temp_audio_path, upload_info.size, upload_info.sha256)
+
+    # 确保常驻进程池已启动（正常情况下已在应用启动时预热）
+    transcribe_pool.start()
 
     # 创建任务
     task = TranscriptionTask(task_id)
-    
-    # 创建进程间通信对象
-    result_queue = Queue()
-    manager = Manager()
-    progress_dict = manager.dict()
-    progress_dict[task_id] = 0
-    
-    # 创建并启动转录进程
-    process = Process(
-        target=transcribe_worker,
-        args=(temp_audio_path, language, result_queue, progress_dict, task_id, denoise)
-    )
-    process.start()
-    task.process = process
+    task.status = "queued"
     
     active_tasks[task_id] = {
         "task": task,
         "temp_file": temp_audio_path,
         "filename": file.filename,
-        "process": process,
-        "result_queue": result_queue,
-        "progress_dict": progress_dict,
+        "file_size": upload_info.size,
+        "sha256": upload_info.sha256,
+        "cache_key": _transcription_cache_key(
+            upload_info.sha256, language, denoise, parallel, batched=batch_size > 0,
+            model=tier.model, compute_type=compute_type, formats=output_formats,
+            word_timestamps=word_timestamps, denoise_strength=strength, profile=profile
+        ),
+        "job": {
+            "audio_path": temp_audio_path,
+            # 解码后的音频按内容哈希缓存，重试和不同选项的重新转录无需再次解码
+            "sha256": upload_info.sha256,
+            "language": language,
+            "denoise": denoise,
+            "denoise_strength": strength,
+            "parallel": parallel,
+            "batch_size": batch_size,
+            "model": tier.model,
+            "compute_type": compute_type,
+            "formats": list(output_formats),
+            "word_timestamps": word_timestamps,
+            "opencc_profile": profile,
+        },
+        "process": None,
+        "progress_dict": transcribe_pool.progress_dict,
         "denoise": denoise,
+        "parallel": parallel,
+        "model": tier.name,
+        "compute_type": compute_type,
         "language": language or "auto",
         "created_at": datetime.now(timezone.utc).isoformat()
     }
-    
-    # 在后台线程中监控进程
-    def monitor_process():
-        """Monitor the child process in a background thread and read the Queue early to avoid deadlock when sending large results."""
-        try:
-            result = None
+    task_streams[task_id] = []
 
-            # Wait for data to appear in the result_queue. The worker puts the
-            # result before exiting. If the payload is large (e.g. subtitles for
-            # a one-hour audio file) and the parent never consumes it, the child
-            # can block on Queue.put(), which in turn makes process.join()
-            # block forever, leaving the task stuck at 100% progress.
-            while True:
-                if not result_queue.empty():
-                    result = result_queue.get()
-                    break
-
-                # If the child process has already terminated, break the loop.
-                if not process.is_alive():
-                    break
-
-                # Avoid busy-waiting.
-                time.sleep(0.5)
-
-            # Wait for the child process to fully terminate.
-            process.join()
-
-            if result:
-                if result.get("status") == "completed":
-                    task_results[task_id] = result
-                    task.status = "completed"
-                else:
-                    task.status = "error"
-            else:
-                # If there is no result and the child process has terminated,
-                # treat the task as cancelled or errored.
-                task.status = "cancelled" if task.is_cancelled() else "error"
-        except Exception as e:
-            logger.error(f"Error monitoring process for task {task_id}: {e}")
-            task.status = "error"
-        finally:
-            # Release one concurrency slot.
-            concurrent_semaphore.release()
+    # 命中缓存 / 合并到相同内容的进行中任务 / 提交到队列；
+    # 缓存命中时要从磁盘读取并解析整份结果，放到线程池中执行，不阻塞事件循环
+    try:
+        admission = await run_in_threadpool(_admit_transcription, task_id)
+    except QueueFullError:
+        _discard_task(task_id)
+        task_streams.pop(task_id, None)
+        raise HTTPException(
+            status_code=429,
+            detail="Transcription queue is full. Please try again later."
+        )
 
-            # Clean up the temporary file.
-            if os.path.exists(temp_audio_path):
-                os.remove(temp_audio_path)
-                logger.info("Temporary file deleted: %s", temp_audio_path)
+    if admission["status"] == "completed":
+        return {
+            "task_id": task_id,
+            "status": "completed",
+            "message": "转录结果已从缓存返回",
+            "cached": True
+        }
+
+    if admission["status"] == "attached":
+        return {
+            "task_id": task_id,
+            "status": "running",
+            "message": "相同内容的转录任务正在进行，已合并等待其结果",
+            "attached_to": admission["attached_to"]
+        }
+
+    if admission["queue_position"]:
+        return {
+            "task_id": task_id,
+            "status": "queued",
+            "message": "转录任务已进入队列",
+            "queue_position": admission["queue_position"]
+        }
 
-            # Remove the task from the active_tasks dict.
-            active_tasks.pop(task_id, None)
-    
-    monitor_thread = threading.Thread(target=monitor_process)
-    monitor_thread.start()
-    
     return {
         "task_id": task_id,
         "status": "started",
-        "message": "转录任务已启动"
+        "message": "转录任务已启动",
+        "queue_position": 0
     }
 
 @router.post("/{task_id}/cancel",
@@ -239,7 +629,29 @@ async def cancel_transcribe_task(task_id: str):
     task = task_info["task"]
     
     logger.info(f"Force cancelling task {task_id}")
-    task.cancel()  # 这会强制终止进程
+    primary_id = task_info.get("attached_to")
+    if primary_id is not None:
+        # 合并等待的任务只需脱离主任务，不影响其他请求
+        with inflight_lock:
+            primary_info = active_tasks.get(primary_id)
+            if primary_info is not None and task_id in primary_info.get("followers", []):
+                primary_info["followers"].remove(task_id)
+        task.cancel()
+        _discard_task(task_id)
+        # 事件记录与主任务共享，不能写入结束事件，只解除关联
+        task_streams.pop(task_id, None)
+    elif _cancel_queued(task_id):
+        # 仍在排队的任务直接移出队列并清理暂存文件
+        task.cancel()
+        with inflight_lock:
+            if inflight_transcriptions.get(task_info.get("cache_key")) == task_id:
+                inflight_transcriptions.pop(task_info["cache_key"], None)
+            followers = list(task_info.get("followers", []))
+        _discard_task(task_id)
+        _resolve_followers(followers, None)
+        _finish_stream(task_id, task_streams.setdefault(task_id, []), "cancelled")
+    else:
+        task.cancel()  # 这会强制终止进程
     
     return {
         "task_id": task_id,
@@ -264,7 +676,7 @@ async def cancel_transcribe_task(task_id: str):
             }
         },
         400: {
-            "description": "缺少需要转换的文本内容",
+            "description": "缺少需要转换的文本内容，或转换配置不受支持",
             "content": {
                 "application/json": {
                     "example": {
@@ -281,22 +693,189 @@ async def convert_transcription_to_traditional(payload: ConvertToTraditionalRequ
     if payload.txt is None and payload.srt is None:
         raise HTTPException(status_code=400, detail="No text provided for conversion")
 
-    converted_txt = convert_to_traditional_chinese(payload.txt) if payload.txt is not None else None
-    converted_srt = convert_to_traditional_chinese(payload.srt) if payload.srt is not None else None
+    return await _convert_document(payload, _resolve_profile(payload.profile))
 
-    return ConvertToTraditionalResponse(txt=converted_txt, srt=converted_srt)
 
-@router.get("/{task_id}/status",
+@router.post(
+    "/convert-traditional/batch",
+    response_model=ConvertToTraditionalBatchResponse,
     responses={
         200: {
-            "description": "成功获取任务状态",
+            "description": "所有文档已转换为繁体中文，顺序与请求一致",
             "content": {
                 "application/json": {
                     "example": {
-                        "task_id": "123e4567-e89b-12d3-a456-426614174000",
-                        "status": "running",
-                        "progress": 45,
-                        "filename": "audio.mp3"
+                        "documents": [
+                            {"txt": "繁體中文內容", "srt": None},
+                            {"txt": None, "srt": "1\n00:00:00,000 --> 00:00:02,000\n繁體字幕內容"}
+                        ]
+                    }
+                }
+            }
+        },
+        400: {
+            "description": "文档数量超过上限，或转换配置不受支持",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "detail": "At most 1000 documents can be converted per request"
+                    }
+                }
+            }
+        }
+    }
+)
+async def convert_transcriptions_to_traditional(payload: ConvertToTraditionalBatchRequest):
+    """一次转换多份文档（各文档并发转换）"""
+    if len(payload.documents) > MAX_CONVERT_BATCH_DOCUMENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_CONVERT_BATCH_DOCUMENTS} documents can be converted per request"
+        )
+
+    profiles = [_resolve_profile(document.profile, payload.profile) for document in payload.documents]
+    documents = await asyncio.gather(
+        *(_convert_document(document, profile) for document, profile in zip(payload.documents, profiles))
+    )
+    return ConvertToTraditionalBatchResponse(documents=list(documents))
+
+
+class _RequestDrivenStreamingResponse(StreamingResponse):
+    """边读请求体边输出的流式响应
+
+    StreamingResponse 在 ASGI spec < 2.4（如 uvicorn）下会并发监听客户端断开，与生成器读取
+    请求体争抢 receive()；这里只发送数据，客户端断开由读取请求体时的 ClientDisconnect 处理。
+    后台任务（background）在响应发送完毕后执行。
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def _iter_ndjson_lines(request: Request):
+    """逐行读取请求体，不把整个请求体读入内存
+
+    每个新数据块只从上次扫描到的位置继续查找换行符。超过 MAX_NDJSON_LINE_BYTES 的行产出 None
+    （每行一次），其内容直接丢弃到下一个换行符为止。
+    """
+    max_line_bytes = MAX_NDJSON_LINE_BYTES
+    buffer = bytearray()
+    skipping = False  # 正在丢弃一个超长行的剩余部分
+    async for chunk in request.stream():
+        scan_from = len(buffer)
+        buffer += chunk
+        start = 0
+        while True:
+            newline = buffer.find(b"\n", scan_from)
+            if newline < 0:
+                break
+            if skipping:
+                skipping = False
+            elif newline - start > max_line_bytes:
+                yield None
+            else:
+                line = bytes(buffer[start:newline])
+                if line.strip():
+                    yield line
+            start = scan_from = newline + 1
+        del buffer[:start]
+        if len(buffer) > max_line_bytes:
+            if not skipping:
+                yield None
+                skipping = True
+            buffer.clear()
+    if buffer.strip() and not skipping:
+        yield bytes(buffer)
+
+
+async def _convert_ndjson_stream(request: Request, default_profile: str):
+    line_number = 0
+    async for line in _iter_ndjson_lines(request):
+        line_number += 1
+        if line is None:
+            yield json.dumps(
+                {"error": f"Line {line_number} exceeds {MAX_NDJSON_LINE_BYTES} bytes"}, ensure_ascii=False
+            ) + "\n"
+            continue
+        try:
+            document = json.loads(line)
+            if not isinstance(document, dict):
+                raise ValueError("each line must be a JSON object")
+        except ValueError as e:
+            yield json.dumps({"error": f"Invalid JSON on line {line_number}: {e}"}, ensure_ascii=False) + "\n"
+            continue
+
+        try:
+            profile = validate_profile(document.get("profile") or default_profile)
+        except (AttributeError, ValueError) as e:
+            yield json.dumps({"error": f"Line {line_number}: {e}"}, ensure_ascii=False) + "\n"
+            continue
+
+        # 只转换 txt / srt 字段，其余字段（如 id、profile）原样返回
+        for key in ("txt", "srt"):
+            if isinstance(document.get(key), str):
+                document[key] = await convert_to_traditional_chinese_async(document[key], profile)
+        yield json.dumps(document, ensure_ascii=False) + "\n"
+
+
+@router.post(
+    "/convert-traditional/stream",
+    responses={
+        200: {
+            "description": "逐行返回转换后的 NDJSON；无法解析的行返回 error 对象",
+            "content": {
+                "application/x-ndjson": {
+                    "example": '{"id": 1, "txt": "繁體中文內容"}\n{"id": 2, "srt": "1\\n00:00:00,000 --> 00:00:02,000\\n繁體字幕內容"}\n'
+                }
+            }
+        }
+    }
+)
+async def stream_convert_to_traditional(request: Request, profile: Optional[str] = None):
+    """以 NDJSON 流式转换：请求体每行一个 JSON 对象（txt / srt 字段），边读边转换边返回
+
+    查询参数 profile 为默认转换配置，单行可用 profile 字段覆盖。
+    """
+    return _RequestDrivenStreamingResponse(
+        _convert_ndjson_stream(request, _resolve_profile(profile)), media_type="application/x-ndjson"
+    )
+
+@router.get("/{task_id}/status",
+    responses={
+        200: {
+            "description": "成功获取任务状态；排队中返回队列位置，运行中返回实时率（RTF）与预计剩余时间",
+            "content": {
+                "application/json": {
+                    "examples": {
+                        "queued": {
+                            "summary": "排队中",
+                            "value": {
+                                "task_id": "123e4567-e89b-12d3-a456-426614174000",
+                                "status": "queued",
+                                "progress": 0,
+                                "filename": "audio.mp3",
+                                "queue_position": 2,
+                                "estimated_start_time": "2024-01-01T12:03:00+00:00"
+                            }
+                        },
+                        "running": {
+                            "summary": "运行中",
+                            "value": {
+                                "task_id": "123e4567-e89b-12d3-a456-426614174000",
+                                "status": "running",
+                                "progress": 42,
+                                "filename": "audio.mp3",
+                                "stage": "decoding",
+                                "audio_duration": 3600.0,
+                                "decoded_seconds": 1512.4,
+                                "elapsed_seconds": 302.5,
+                                "rtf": 0.2,
+                                "eta_seconds": 417.5,
+                                "estimated_completion_time": "2024-01-01T12:10:00+00:00"
+                            }
+                        }
                     }
                 }
             }
@@ -317,23 +896,42 @@ async def get_task_status(task_id: str):
     """获取任务状态"""
     # 检查活跃任务
     if task_id in active_tasks:
-        task = active_tasks[task_id]["task"]
-        progress_dict = active_tasks[task_id]["progress_dict"]
-        current_progress = progress_dict.get(task_id, 0)
+        task_info = active_tasks[task_id]
+        task = task_info["task"]
+        status = task.status
+        # 合并等待的任务展示其主任务的状态与进度
+        source_id = task_info.get("attached_to") or task_id
+        source_info = active_tasks.get(source_id, task_info)
+        if source_id != task_id:
+            status = source_info["task"].status
+        progress_dict = source_info["progress_dict"]
+        current_progress = progress_dict.get(source_id, 0)
         
-        return {
+        response = {
             "task_id": task_id,
-            "status": task.status,
+            "status": status,
             "progress": current_progress,
-            "filename": active_tasks[task_id]["filename"]
+            "filename": task_info["filename"],
+            "model": task_info.get("model"),
+            "compute_type": task_info.get("compute_type")
         }
+        if status == "queued":
+            response.update(_queue_info(source_id))
+        else:
+            response.update(_progress_metrics(progress_dict, source_id))
+        if source_id != task_id:
+            response["attached_to"] = source_id
+        return response
     
     # 检查已完成任务
     if task_id in task_results:
+        result = task_results[task_id]
         return {
             "task_id": task_id,
             "status": "completed",
-            "progress": 100
+            "progress": 100,
+            "model": result.get("model"),
+            "compute_type": result.get("compute_type")
         }
     
     raise HTTPException(status_code=404, detail="任务不存在")
@@ -400,7 +998,7 @@ async def get_task_result(task_id: str):
     if task_id not in task_results:
         if task_id in active_tasks:
             task = active_tasks[task_id]["task"]
-            if task.status == "running":
+            if task.status in ("running", "queued"):
                 raise HTTPException(status_code=202, detail="任务仍在进行中")
             elif task.status == "cancelled":
                 raise HTTPException(status_code=410, detail="任务已被取消")
@@ -412,22 +1010,135 @@ async def get_task_result(task_id: str):
     result = task_results[task_id]
     # 返回结果后清理
     del task_results[task_id]
+    task_streams.pop(task_id, None)
     
     return result
 
+def _format_sse(event: Dict) -> str:
+    payload = {key: value for key, value in event.items() if key != "event"}
+    return f"event: {event['event']}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+async def _stream_task_events(task_id: str):
+    """回放已有事件并持续推送新事件，直到收到 done"""
+    events = task_streams.get(task_id)
+    index = 0
+    idle_seconds = 0.0
+    while True:
+        current = task_streams.get(task_id)
+        if current is None:
+            # 事件记录已被释放（如合并等待的任务被取消），读完已拿到的事件后结束
+            if events is not None:
+                for event in events[index:]:
+                    yield _format_sse(event)
+                    if event["event"] == "done":
+                        return
+            status = "completed" if task_id in task_results else "cancelled"
+            yield _format_sse({"event": "done", "status": status})
+            return
+        if current is not events:
+            # 主任务失败后重新提交的跟随任务会得到新的事件记录，从头开始推送
+            events, index = current, 0
+
+        while index < len(events):
+            event = events[index]
+            index += 1
+            yield _format_sse(event)
+            idle_seconds = 0.0
+            if event["event"] == "done":
+                latest = task_streams.get(task_id)
+                if latest is None or latest is events:
+                    return
+
+        await asyncio.sleep(STREAM_POLL_INTERVAL)
+        idle_seconds += STREAM_POLL_INTERVAL
+        if idle_seconds >= STREAM_KEEPALIVE_SECONDS:
+            # 注释行保持连接，避免代理因长时间无数据而断开
+            idle_seconds = 0.0
+            yield ": keep-alive\n\n"
+
+
+@router.get("/{task_id}/stream",
+    responses={
+        200: {
+            "description": "以 Server-Sent Events 推送转录进度：每个 segment 解码后立即推送原始文本，段落完成标点与繁体转换后推送处理后的文本",
+            "content": {
+                "text/event-stream": {
+                    "example": (
+                        "event: segment\n"
+                        "data: {\"index\": 1, \"start\": 0.0, \"end\": 2.5, \"text\": \"你好这是测试\"}\n\n"
+                        "event: punctuated\n"
+                        "data: {\"index\": 1, \"text\": \"你好，這是測試。\", \"subtitle\": \"你好這是測試\"}\n\n"
+                        "event: done\n"
+                        "data: {\"status\": \"completed\"}\n\n"
+                    )
+                }
+            }
+        },
+        404: {
+            "description": "任务不存在",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "detail": "任务不存在"
+                    }
+                }
+            }
+        }
+    }
+)
+async def stream_task_events(task_id: str):
+    """以 SSE 流式推送转录中的字幕片段，完整结果仍通过 /result 获取"""
+    if task_id not in task_streams:
+        raise HTTPException(status_code=404, detail="任务不存在")
+
+    return StreamingResponse(
+        _stream_task_events(task_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """转录结果缓存命中统计，用于评估缓存容量"""
+    with inflight_lock:
+        inflight = len(inflight_transcriptions)
+    return {
+        "cache": transcription_cache.stats(),
+        "inflight": inflight,
+        "deduplicated": dedup_stats["attached"]
+    }
+
+@router.get("/models")
+async def list_models():
+    """列出可选的模型档位、各自的并发上限和允许的计算类型"""
+    return model_registry.describe()
+
 @router.get("/tasks")
 async def list_active_tasks():
     """列出所有活跃任务"""
     tasks = []
     for task_id, task_info in active_tasks.items():
         task = task_info["task"]
-        tasks.append({
+        entry = {
             "task_id": task_id,
             "status": task.status,
             "progress": task_info["progress_dict"].get(task_id, 0),
             "filename": task_info["filename"],
             "denoise": task_info.get("denoise", False),
+            "parallel": task_info.get("parallel", False),
+            "model": task_info.get("model"),
             "language": task_info.get("language"),
             "created_at": task_info.get("created_at")
-        })
-    return {"active_tasks": tasks} 
+        }
+        if task.status == "queued":
+            entry.update(_queue_info(task_id))
+        else:
+            metrics = _progress_metrics(task_info["progress_dict"], task_id)
+            entry.update({key: metrics[key] for key in ("stage", "rtf", "eta_seconds") if key in metrics})
+        tasks.append(entry)
+    return {
+        "active_tasks": tasks,
+        "queues": {name: admission.stats() for name, admission in tier_queues.items()},
+        "worker_queue": worker_queue.stats()
+    } 
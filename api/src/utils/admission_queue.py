@@ -0,0 +1,148 @@
+"""Bounded FIFO admission queue for background jobs.
+
+Jobs beyond the number of running slots wait in a FIFO queue instead of being
+rejected; callers only get a "queue full" error once the waiting list itself
+reaches its bound. Job durations are tracked so queued jobs can report an
+estimated start time.
+"""
+
+import heapq
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when both the running slots and the waiting queue are full."""
+
+
+class AdmissionQueue:
+    """Admit up to ``max_running`` jobs at once and queue up to ``max_queued`` more."""
+
+    def __init__(
+        self,
+        max_running: int,
+        max_queued: int,
+        name: str = "jobs",
+        default_job_seconds: float = 60.0,
+        smoothing: float = 0.3,
+    ):
+        self.max_running = max_running
+        self.max_queued = max_queued
+        self.name = name
+        self.smoothing = smoothing
+        self.avg_job_seconds = default_job_seconds
+        self._lock = threading.Lock()
+        self._running: Dict[str, float] = {}  # job_id -> start time
+        self._queued: "OrderedDict[str, Callable[[], None]]" = OrderedDict()
+
+    def is_full(self) -> bool:
+        """True if a new job would be rejected right now."""
+        with self._lock:
+            return len(self._running) >= self.max_running and len(self._queued) >= self.max_queued
+
+    def submit(self, job_id: str, start_fn: Callable[[], None]) -> int:
+        """Start the job now if a slot is free, otherwise queue it.
+
+        Returns 0 when the job was started immediately, or its 1-based queue
+        position. Raises QueueFullError when the queue is full.
+        """
+        with self._lock:
+            if len(self._running) < self.max_running and not self._queued:
+                self._running[job_id] = time.time()
+                position = 0
+            elif len(self._queued) < self.max_queued:
+                self._queued[job_id] = start_fn
+                position = len(self._queued)
+            else:
+                raise QueueFullError(f"{self.name} queue is full")
+
+        if position == 0:
+            try:
+                start_fn()
+            except Exception:
+                self.release(job_id)
+                raise
+        else:
+            logger.info(f"Queued {self.name} job {job_id} at position {position}")
+        return position
+
+    def release(self, job_id: str):
+        """Mark a running job as finished and start the next queued job, if any."""
+        with self._lock:
+            started_at = self._running.pop(job_id, None)
+            if started_at is not None:
+                duration = time.time() - started_at
+                self.avg_job_seconds += self.smoothing * (duration - self.avg_job_seconds)
+        self._dispatch_next()
+
+    def cancel(self, job_id: str) -> bool:
+        """Remove a job that is still waiting. Returns False if it is not queued."""
+        with self._lock:
+            return self._queued.pop(job_id, None) is not None
+
+    def is_queued(self, job_id: str) -> bool:
+        with self._lock:
+            return job_id in self._queued
+
+    def position(self, job_id: str) -> Optional[int]:
+        """1-based position of a queued job, or None if it is not queued."""
+        with self._lock:
+            for index, queued_id in enumerate(self._queued, start=1):
+                if queued_id == job_id:
+                    return index
+        return None
+
+    def estimated_start(self, job_id: str) -> Optional[float]:
+        """Estimated epoch time at which a queued job will start."""
+        with self._lock:
+            position = None
+            for index, queued_id in enumerate(self._queued, start=1):
+                if queued_id == job_id:
+                    position = index
+                    break
+            if position is None:
+                return None
+
+            now = time.time()
+            avg = self.avg_job_seconds
+            # 每个槽位的预计空闲时间：运行中任务按平均耗时估算剩余时间
+            free_at = [max(now, started + avg) for started in self._running.values()]
+            free_at.extend([now] * (self.max_running - len(free_at)))
+            heapq.heapify(free_at)
+
+            start = now
+            for _ in range(position):
+                start = heapq.heappop(free_at)
+                heapq.heappush(free_at, start + avg)
+            return start
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "running": len(self._running),
+                "queued": len(self._queued),
+                "max_running": self.max_running,
+                "max_queued": self.max_queued,
+                "avg_job_seconds": round(self.avg_job_seconds, 2),
+            }
+
+    def _dispatch_next(self):
+        with self._lock:
+            if not self._queued or len(self._running) >= self.max_running:
+                return
+            job_id, start_fn = self._queued.popitem(last=False)
+            self._running[job_id] = time.time()
+        logger.info(f"Starting queued {self.name} job {job_id}")
+        self._start(job_id, start_fn)
+
+    def _start(self, job_id: str, start_fn: Callable[[], None]):
+        try:
+            start_fn()
+        except Exception as e:
+            logger.error(f"Failed to start {self.name} job {job_id}: {e}")
+            self.release(job_id)
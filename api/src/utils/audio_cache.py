@@ -0,0 +1,186 @@
+"""Decode-once cache of 16 kHz mono float32 audio, stored as memory-mapped ``.npy`` files.
+
+Every upload is decoded once into ``<content sha256>.npy`` in
+``DECODED_AUDIO_DIR`` (in the temp directory beside the spooled uploads).
+Denoise, VAD, language detection and transcription then read the same
+memory-mapped array. Entries are keyed by content hash, so a retry or a
+re-transcription with other options skips decoding, even though it spools a
+new upload file. Derived arrays, such as denoised audio, are cached under the
+same hash with a suffix.
+
+The sample count is in the ``.npy`` header, and the duration follows from it.
+Reading an entry refreshes its mtime. ``remove_expired_audio`` (run by
+``cleanup_service``) deletes entries not used for ``DECODED_AUDIO_TTL_SECONDS``.
+The directory is also bounded by ``DECODED_AUDIO_MAX_BYTES``: after each write,
+``enforce_size_limit`` evicts the least-recently-used entries (oldest mtime)
+first. A worker that still has an evicted file mapped keeps reading it, because
+unlinking does not invalidate an existing mapping on POSIX.
+"""
+
+import logging
+import os
+import pathlib
+import tempfile
+import time
+from typing import Callable, NamedTuple, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+DECODED_AUDIO_DIR = os.getenv(
+    "DECODED_AUDIO_DIR",
+    str(pathlib.Path(tempfile.gettempdir()) / "decoded_audio"),
+)
+DECODED_AUDIO_TTL_SECONDS = int(os.getenv("DECODED_AUDIO_TTL_SECONDS", str(6 * 60 * 60)))
+# 缓存目录的总大小上限（字节），超出时先删除最久未使用的条目；0 表示不限制。
+# 16 kHz float32 每小时音频约 230 MB，默认 4 GiB 约可容纳 18 小时
+DECODED_AUDIO_MAX_BYTES = int(os.getenv("DECODED_AUDIO_MAX_BYTES", str(4 * 1024 * 1024 * 1024)))
+
+
+class DecodedAudio(NamedTuple):
+    samples: np.ndarray  # read-only np.memmap
+    path: str
+
+    @property
+    def sample_count(self) -> int:
+        return len(self.samples)
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / SAMPLE_RATE
+
+
+def cache_path(key: str, cache_dir: Optional[str] = None) -> pathlib.Path:
+    return pathlib.Path(cache_dir or DECODED_AUDIO_DIR) / f"{key}.npy"
+
+
+def load_cached_audio(key: str, cache_dir: Optional[str] = None) -> Optional[DecodedAudio]:
+    """Map a cached entry read-only, or return None if it does not exist (or is unreadable)."""
+    path = cache_path(key, cache_dir)
+    try:
+        samples = np.load(path, mmap_mode="r")
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Discarding unreadable decoded audio {path}: {e}")
+        path.unlink(missing_ok=True)
+        return None
+    return DecodedAudio(samples, str(path))
+
+
+def get_or_create_audio(
+    key: str,
+    produce: Callable[[], np.ndarray],
+    cache_dir: Optional[str] = None,
+) -> DecodedAudio:
+    """Return the cached array for ``key``, calling ``produce`` and storing its result on a miss.
+
+    The array is written to a temporary name and renamed into place, so
+    workers decoding the same content concurrently never see a partial file.
+    """
+    cached = load_cached_audio(key, cache_dir)
+    if cached is not None:
+        logger.info(f"Decoded audio cache hit: {cached.path} ({cached.duration:.1f}s)")
+        return cached
+
+    path = cache_path(key, cache_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    started = time.monotonic()
+    samples = np.ascontiguousarray(produce(), dtype=np.float32)
+    partial_path = path.with_name(f"{path.stem}.{os.getpid()}.partial.npy")
+    try:
+        np.save(partial_path, samples)
+        os.replace(partial_path, path)
+    finally:
+        partial_path.unlink(missing_ok=True)
+    logger.info(
+        f"Decoded {len(samples) / SAMPLE_RATE:.1f}s of audio into {path} in {time.monotonic() - started:.1f}s"
+    )
+    decoded = DecodedAudio(np.load(path, mmap_mode="r"), str(path))
+    enforce_size_limit(DECODED_AUDIO_MAX_BYTES, cache_dir, keep=path)
+    return decoded
+
+
+def decode_cached_audio(audio_path: str, content_hash: str, cache_dir: Optional[str] = None) -> DecodedAudio:
+    """Decode ``audio_path`` to 16 kHz mono float32 once per content hash."""
+
+    def decode():
+        from faster_whisper.audio import decode_audio
+
+        return decode_audio(audio_path, sampling_rate=SAMPLE_RATE)
+
+    return get_or_create_audio(content_hash, decode, cache_dir)
+
+
+def enforce_size_limit(
+    max_bytes: int = DECODED_AUDIO_MAX_BYTES,
+    cache_dir: Optional[str] = None,
+    keep: Optional[pathlib.Path] = None,
+) -> int:
+    """Delete least-recently-used entries until the cache fits in ``max_bytes``; returns the count.
+
+    ``keep`` (the entry just written) is never evicted, even if it alone
+    exceeds the budget. Partial files of writes in progress are skipped.
+    """
+    directory = pathlib.Path(cache_dir or DECODED_AUDIO_DIR)
+    if not max_bytes or not directory.exists():
+        return 0
+
+    entries = []
+    for path in directory.glob("*.npy"):
+        if path.name.endswith(".partial.npy"):
+            continue
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+
+    removed = 0
+    for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+        if total <= max_bytes:
+            break
+        if keep is not None and path == pathlib.Path(keep):
+            continue
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Failed to evict decoded audio {path}: {e}")
+            continue
+        else:
+            removed += 1
+        total -= size
+    if removed:
+        logger.info(f"Evicted {removed} decoded audio entries to stay within {max_bytes} bytes")
+    return removed
+
+
+def remove_expired_audio(
+    ttl_seconds: int = DECODED_AUDIO_TTL_SECONDS,
+    cache_dir: Optional[str] = None,
+    now: Optional[float] = None,
+) -> int:
+    """Delete entries (and leftover partial files) not used for ``ttl_seconds``; returns the count."""
+    directory = pathlib.Path(cache_dir or DECODED_AUDIO_DIR)
+    if not directory.exists():
+        return 0
+
+    now = time.time() if now is None else now
+    removed = 0
+    for path in directory.glob("*.npy"):
+        try:
+            if now - path.stat().st_mtime > ttl_seconds:
+                path.unlink()
+                removed += 1
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            logger.warning(f"Failed to delete decoded audio {path}: {e}")
+    return removed
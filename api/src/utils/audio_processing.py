@@ -4,17 +4,36 @@ import logging
 import os
 import subprocess
 import tempfile
+import threading
 from typing import Optional, Tuple
 
+import numpy as np
+
 from .ffmpeg_utils import check_ffmpeg_installed
 
 logger = logging.getLogger(__name__)
 
+# Whisper's input format: 16 kHz mono float32
+SAMPLE_RATE = 16000
+_PIPE_READ_SIZE = 1 << 20
+
 _AFFTDN_PRESETS = {
     "light": "afftdn=nf=-15",
     "medium": "afftdn=nf=-20",
     "strong": "afftdn=nf=-25",
 }
+DENOISE_STRENGTHS = tuple(_AFFTDN_PRESETS)
+
+# 降噪引擎：ffmpeg（afftdn 子进程）或 spectral（worker 进程内的 NumPy 频谱门限，见 spectral_gate）
+DENOISE_ENGINES = ("ffmpeg", "spectral")
+# 不支持的值记录警告并回退到 ffmpeg（否则 worker 会静默走 ffmpeg 分支，缓存键却记录错误的引擎名）
+DENOISE_ENGINE = os.getenv("DENOISE_ENGINE", "ffmpeg").strip().lower()
+if DENOISE_ENGINE not in DENOISE_ENGINES:
+    logger.warning(
+        "Unsupported DENOISE_ENGINE %r, falling back to ffmpeg. Allowed engines: %s",
+        DENOISE_ENGINE, ", ".join(DENOISE_ENGINES),
+    )
+    DENOISE_ENGINE = "ffmpeg"
 
 
 def denoise_audio(
@@ -77,3 +96,152 @@ def denoise_audio(
         message = exc.stderr.strip() if exc.stderr else str(exc)
         logger.error("FFmpeg denoise failed: %s", message)
         return False, None, message
+
+
+def denoise_audio_to_array(
+    input_path: str,
+    *,
+    strength: str = "medium",
+    sampling_rate: int = SAMPLE_RATE,
+) -> Tuple[Optional[np.ndarray], str]:
+    """
+    Denoise and resample in a single FFmpeg pass, returning the samples in memory.
+
+    FFmpeg applies the same ``afftdn`` preset as ``denoise_audio``, downmixes to
+    mono and resamples to ``sampling_rate``, then writes raw float32 samples to
+    its stdout pipe. The result can be passed straight to
+    ``WhisperModel.transcribe``, so no temporary file is written and the audio
+    is not decoded a second time.
+
+    Args:
+        input_path: Original audio file.
+        strength: One of 'light' | 'medium' | 'strong'. Controls the noise floor.
+        sampling_rate: Output sample rate (Whisper expects 16 kHz).
+
+    Returns:
+        Tuple of (float32 samples or None on failure, message).
+    """
+    if not os.path.exists(input_path):
+        return None, f"Input file not found: {input_path}"
+
+    if not check_ffmpeg_installed():
+        return None, "FFmpeg is required for noise reduction but is not installed."
+
+    filter_expr = _AFFTDN_PRESETS.get(strength, _AFFTDN_PRESETS["medium"])
+    cmd = [
+        "ffmpeg",
+        "-nostdin",
+        "-loglevel",
+        "error",
+        "-i",
+        input_path,
+        "-af",
+        filter_expr,
+        "-ac",
+        "1",
+        "-ar",
+        str(sampling_rate),
+        "-f",
+        "f32le",
+        "pipe:1",
+    ]
+
+    logger.info("Running in-memory denoise command: %s", " ".join(cmd))
+    audio, message = _run_ffmpeg_to_array(cmd)
+    if audio is None:
+        return None, message
+    return audio, f"Noise reduction applied ({len(audio) / sampling_rate:.1f}s decoded in memory)."
+
+
+def denoise_samples(
+    samples: np.ndarray,
+    *,
+    strength: str = "medium",
+    sampling_rate: int = SAMPLE_RATE,
+) -> Tuple[Optional[np.ndarray], str]:
+    """
+    Apply the ``afftdn`` preset to already decoded mono float32 samples.
+
+    The samples (typically the memory-mapped decoded-audio cache) are streamed
+    to FFmpeg's stdin, and the filtered samples are read back from its stdout,
+    so the original file is not decoded again.
+
+    Returns:
+        Tuple of (filtered float32 samples or None on failure, message).
+    """
+    if not check_ffmpeg_installed():
+        return None, "FFmpeg is required for noise reduction but is not installed."
+
+    filter_expr = _AFFTDN_PRESETS.get(strength, _AFFTDN_PRESETS["medium"])
+    raw_format = ["-f", "f32le", "-ac", "1", "-ar", str(sampling_rate)]
+    cmd = [
+        "ffmpeg", "-nostdin", "-loglevel", "error",
+        *raw_format, "-i", "pipe:0",
+        "-af", filter_expr,
+        *raw_format, "pipe:1",
+    ]
+
+    logger.info("Running in-memory denoise command: %s", " ".join(cmd))
+    audio, message = _run_ffmpeg_to_array(cmd, input_samples=samples)
+    if audio is None:
+        return None, message
+    return audio, f"Noise reduction applied ({len(audio) / sampling_rate:.1f}s of cached samples)."
+
+
+def _run_ffmpeg_to_array(cmd, input_samples: Optional[np.ndarray] = None) -> Tuple[Optional[np.ndarray], str]:
+    """Run FFmpeg with raw f32le output on stdout and return it as a float32 array."""
+    try:
+        process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE if input_samples is not None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+    except OSError as exc:
+        logger.error("FFmpeg denoise failed to start: %s", exc)
+        return None, str(exc)
+
+    # Drain stderr in the background so a chatty FFmpeg cannot block on a full pipe.
+    stderr_chunks = []
+    readers = [threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True)]
+    if input_samples is not None:
+        readers.append(threading.Thread(target=_feed_samples, args=(process.stdin, input_samples), daemon=True))
+    for reader in readers:
+        reader.start()
+
+    # Grow one bytearray instead of joining chunks, so the samples are held only once.
+    buffer = bytearray()
+    while True:
+        chunk = process.stdout.read(_PIPE_READ_SIZE)
+        if not chunk:
+            break
+        buffer += chunk
+    returncode = process.wait()
+    for reader in readers:
+        reader.join()
+    stderr = b"".join(stderr_chunks).decode("utf-8", errors="replace").strip()
+
+    if returncode != 0:
+        message = stderr or f"ffmpeg exited with code {returncode}"
+        logger.error("FFmpeg denoise failed: %s", message)
+        return None, message
+    if stderr:
+        logger.debug("FFmpeg denoise stderr: %s", stderr[:500])
+
+    usable = len(buffer) - len(buffer) % 4
+    return np.frombuffer(buffer, dtype=np.float32, count=usable // 4), ""
+
+
+def _feed_samples(stdin, samples: np.ndarray) -> None:
+    data = memoryview(np.ascontiguousarray(samples, dtype="<f4")).cast("B")
+    try:
+        for offset in range(0, len(data), _PIPE_READ_SIZE):
+            stdin.write(data[offset:offset + _PIPE_READ_SIZE])
+    except (BrokenPipeError, ValueError):
+        # FFmpeg exited early; its return code and stderr report the failure
+        pass
+    finally:
+        try:
+            stdin.close()
+        except OSError:
+            pass
@@ -3,21 +3,46 @@
 import subprocess
 import os
 import logging
-from typing import Optional, Tuple
+import shutil
+import threading
+from collections import deque
+from typing import Dict, Iterable, Iterator, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# 转换时保留的 ffmpeg stderr 末尾行数（环形缓冲，长时间运行也不会增长内存）
+FFMPEG_STDERR_TAIL_LINES = int(os.getenv("FFMPEG_STDERR_TAIL_LINES", "50"))
+
+# ffmpeg -version 的检查结果；常驻的转录 worker 每次降噪都会检查，只在首次启动子进程
+_tool_lock = threading.Lock()
+_ffmpeg_available: Optional[bool] = None
+
 def check_ffmpeg_installed() -> bool:
-    """检查系统是否安装了FFmpeg"""
+    """检查系统是否安装了FFmpeg（每个进程只运行一次 ffmpeg -version，超时不缓存）"""
+    global _ffmpeg_available
+    with _tool_lock:
+        if _ffmpeg_available is not None:
+            return _ffmpeg_available
     try:
-        result = subprocess.run(['ffmpeg', '-version'], 
-                              capture_output=True, text=True, timeout=10)
-        return result.returncode == 0
-    except (subprocess.TimeoutExpired, FileNotFoundError):
+        result = subprocess.run(['ffmpeg', '-version'], capture_output=True, text=True, timeout=10)
+        available = result.returncode == 0
+    except subprocess.TimeoutExpired:
         return False
+    except FileNotFoundError:
+        available = False
+    with _tool_lock:
+        _ffmpeg_available = available
+    return available
+
+def check_ffprobe_installed() -> bool:
+    """检查 PATH 中是否有 FFprobe（只查找可执行文件，不启动子进程）"""
+    return shutil.which('ffprobe') is not None
 
 def get_video_info(video_path: str) -> Optional[dict]:
-    """获取视频文件信息"""
+    """获取视频文件信息；调用方应复用结果（如转换任务把它同时用于验证和进度计算），避免重复探测"""
+    if not check_ffprobe_installed():
+        logger.error("FFprobe not installed or not found in PATH")
+        return None
     try:
         cmd = [
             'ffprobe', '-v', 'quiet', '-print_format', 'json',
@@ -41,7 +66,9 @@ def convert_video_to_audio(
     output_path: str, 
     format: str = 'mp3',
     quality: str = 'medium',
-    progress_callback: Optional[callable] = None
+    progress_callback: Optional[callable] = None,
+    video_info: Optional[dict] = None,
+    stats_callback: Optional[callable] = None
 ) -> Tuple[bool, str]:
     """
     将视频文件转换为音频文件
@@ -52,6 +79,8 @@ def convert_video_to_audio(
         format: 输出格式 ('mp3', 'wav', 'ogg', 'aac')
         quality: 音质 ('high', 'medium', 'low')
         progress_callback: 进度回调函数
+        video_info: 调用方已获取的 ffprobe 结果（如验证阶段的探测结果），避免再次运行 ffprobe
+        stats_callback: 每次 ffmpeg 进度报告时以 ``progress_stats`` 的结果调用（已编码时长、编码速度、输出字节数）
     
     Returns:
         Tuple[bool, str]: (是否成功, 错误信息或成功信息)
@@ -65,8 +94,9 @@ def convert_video_to_audio(
         if not os.path.exists(input_path):
             return False, f"Input file not found: {input_path}"
         
-        # 获取视频信息以计算进度
-        video_info = get_video_info(input_path)
+        # 获取视频信息以计算进度（优先使用调用方传入的探测结果）
+        if video_info is None:
+            video_info = get_video_info(input_path)
         total_duration = None
         if video_info and 'format' in video_info:
             try:
@@ -82,7 +112,8 @@ def convert_video_to_audio(
         }
         
         # 构建FFmpeg命令
-        cmd = ['ffmpeg', '-i', input_path, '-y']  # -y 覆盖输出文件
+        # -y 覆盖输出文件；-progress pipe:1 在 stdout 输出机器可读的 key=value 进度，-nostats 关闭 stderr 上的进度行
+        cmd = ['ffmpeg', '-nostats', '-progress', 'pipe:1', '-i', input_path, '-y']
         
         # 添加格式特定参数
         if format == 'mp3':
@@ -119,30 +150,27 @@ def convert_video_to_audio(
         
         logger.info(f"FFmpeg process started with PID: {process.pid}")
         
-        # 监控进度
-        while True:
-            output = process.stderr.readline()
-            if output == '' and process.poll() is not None:
-                break
-            
-            if output and progress_callback and total_duration:
-                # 解析FFmpeg输出中的时间信息
-                if 'time=' in output:
-                    try:
-                        time_str = output.split('time=')[1].split()[0]
-                        current_time = parse_time_string(time_str)
-                        if current_time and total_duration > 0:
-                            progress = min(100, int((current_time / total_duration) * 100))
-                            progress_callback(progress)
-                    except Exception as e:
-                        logger.debug(f"Error parsing progress: {e}")
+        # stderr 在后台线程中读入有界的环形缓冲，只保留最后几行用于日志和错误信息
+        stderr_tail = deque(maxlen=FFMPEG_STDERR_TAIL_LINES)
+        stderr_reader = threading.Thread(target=stderr_tail.extend, args=(process.stderr,), daemon=True)
+        stderr_reader.start()
+        
+        # 监控进度：逐块解析 stdout 上的 -progress 报告
+        for block in iter_progress_blocks(process.stdout):
+            stats = progress_stats(block, total_duration)
+            if progress_callback and stats["progress"] is not None:
+                progress_callback(stats["progress"])
+            if stats_callback:
+                stats_callback(stats)
         
         # 等待进程完成
-        stdout, stderr = process.communicate()
+        process.wait()
+        stderr_reader.join()
+        stderr = "".join(stderr_tail)
         
         logger.info(f"FFmpeg process completed with return code: {process.returncode}")
         if stderr:
-            logger.info(f"FFmpeg stderr output: {stderr[:500]}...")  # 只顯示前500字符
+            logger.info(f"FFmpeg stderr output (last {len(stderr_tail)} lines): {stderr}")
         
         if process.returncode == 0:
             if os.path.exists(output_path):
@@ -161,6 +189,49 @@ def convert_video_to_audio(
         logger.error(f"Conversion error: {e}")
         return False, f"Conversion error: {str(e)}"
 
+def iter_progress_blocks(lines: Iterable[str]) -> Iterator[Dict[str, str]]:
+    """把 ffmpeg ``-progress`` 输出的 key=value 行按报告分组，每遇到 ``progress=continue|end`` 产出一个字典"""
+    block = {}
+    for line in lines:
+        key, separator, value = line.strip().partition('=')
+        if not separator:
+            continue
+        block[key] = value
+        if key == 'progress':
+            yield block
+            block = {}
+
+def _parse_number(value: Optional[str], suffix: str = '') -> Optional[float]:
+    # 未知的值为 N/A（例如刚开始编码时的 speed）
+    try:
+        return float(value.strip().rstrip(suffix))
+    except (AttributeError, ValueError):
+        return None
+
+def progress_stats(block: Dict[str, str], total_duration: Optional[float] = None) -> dict:
+    """
+    从一个进度报告中提取进度百分比、已编码时长（秒）、编码速度（实时倍数）和已输出字节数。
+
+    未知的值为 None；没有总时长时无法计算百分比。
+    """
+    # 旧版 ffmpeg 没有 out_time_us，out_time_ms 实际上也是微秒
+    out_time_us = _parse_number(block.get('out_time_us', block.get('out_time_ms')))
+    out_time = max(out_time_us, 0) / 1_000_000 if out_time_us is not None else None
+    output_bytes = _parse_number(block.get('total_size'))
+
+    progress = None
+    if block.get('progress') == 'end':
+        progress = 100
+    elif out_time is not None and total_duration:
+        progress = min(100, int(out_time / total_duration * 100))
+
+    return {
+        "progress": progress,
+        "out_time_seconds": round(out_time, 3) if out_time is not None else None,
+        "encode_speed": _parse_number(block.get('speed'), 'x'),
+        "output_bytes": int(output_bytes) if output_bytes is not None else None,
+    }
+
 def parse_time_string(time_str: str) -> Optional[float]:
     """解析FFmpeg时间字符串 (HH:MM:SS.mmm) 为秒数"""
     try:
@@ -178,8 +249,8 @@ def get_supported_formats() -> list:
     """获取支持的音频格式列表"""
     return ['mp3', 'wav', 'ogg', 'aac']
 
-def validate_video_file(file_path: str) -> Tuple[bool, str]:
-    """验证视频文件是否有效"""
+def validate_video_file(file_path: str, video_info: Optional[dict] = None) -> Tuple[bool, str]:
+    """验证视频文件是否有效；传入 ``video_info`` 时使用已有的 ffprobe 结果"""
     try:
         if not os.path.exists(file_path):
             return False, "File does not exist"
@@ -190,8 +261,11 @@ def validate_video_file(file_path: str) -> Tuple[bool, str]:
             return False, "File is empty"
         
         # 使用FFprobe检查文件格式
-        video_info = get_video_info(file_path)
+        if video_info is None:
+            video_info = get_video_info(file_path)
         if not video_info:
+            if not check_ffprobe_installed():
+                return False, "FFprobe not installed or not found in PATH"
             return False, "Invalid video file or unsupported format"
         
         # 检查是否有音频流
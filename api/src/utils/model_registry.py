@@ -0,0 +1,146 @@
+"""Registry of Whisper model tiers that clients may request.
+
+Each tier maps a public name (the ``model`` form field) to a faster-whisper
+model id or path, the compute types it may run with and its own concurrency
+limit. The built-in tiers can be replaced with a JSON document, given inline
+in ``WHISPER_MODEL_REGISTRY`` or as a file path in ``WHISPER_MODEL_REGISTRY_FILE``::
+
+    {
+      "default": "large-v3",
+      "tiers": {
+        "small": {"model": "small", "max_concurrent": 4, "compute_types": ["int8"]},
+        "large-v3": {"model": "large-v3", "max_concurrent": 2}
+      }
+    }
+"""
+
+import json
+import logging
+import os
+from typing import Dict, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# CTranslate2 支持的量化 / 计算类型
+SUPPORTED_COMPUTE_TYPES = (
+    "int8", "int8_float16", "int8_float32", "int8_bfloat16",
+    "int16", "float16", "bfloat16", "float32",
+)
+
+
+class ModelSelectionError(ValueError):
+    """Raised when a requested model tier or compute type is not allowed."""
+
+
+class ModelTier(NamedTuple):
+    name: str
+    model: str
+    max_concurrent: int
+    compute_types: Tuple[str, ...] = SUPPORTED_COMPUTE_TYPES
+    # None 表示按设备选择（GPU 使用 float16，CPU 使用 int8）
+    default_compute_type: Optional[str] = None
+
+
+def _default_tiers() -> Dict:
+    default_concurrency = int(os.getenv("MAX_CONCURRENT_TASKS", "3"))
+    return {
+        "default": os.getenv("WHISPER_DEFAULT_MODEL", "large-v3"),
+        "tiers": {
+            "tiny": {"model": "tiny", "max_concurrent": 3},
+            "small": {"model": "small", "max_concurrent": 3},
+            "medium": {"model": "medium", "max_concurrent": 2},
+            "large-v3": {"model": "large-v3", "max_concurrent": default_concurrency},
+            "distil-large-v3": {"model": "distil-large-v3", "max_concurrent": 2},
+        },
+    }
+
+
+class ModelRegistry:
+    """The allowed model tiers and the default tier."""
+
+    def __init__(self, tiers: Dict[str, ModelTier], default: str):
+        if not tiers:
+            raise ValueError("Model registry must define at least one tier")
+        if default not in tiers:
+            raise ValueError(f"Default model tier '{default}' is not defined")
+        self.tiers = tiers
+        self.default = default
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "ModelRegistry":
+        tiers = {}
+        for name, spec in config["tiers"].items():
+            compute_types = tuple(spec.get("compute_types", SUPPORTED_COMPUTE_TYPES))
+            unknown = set(compute_types) - set(SUPPORTED_COMPUTE_TYPES)
+            if unknown:
+                raise ValueError(f"Tier '{name}' lists unsupported compute types: {sorted(unknown)}")
+            default_compute_type = spec.get("default_compute_type")
+            if default_compute_type is not None and default_compute_type not in compute_types:
+                raise ValueError(f"Tier '{name}' default compute type '{default_compute_type}' is not allowed")
+            tiers[name] = ModelTier(
+                name=name,
+                model=spec.get("model", name),
+                max_concurrent=int(spec.get("max_concurrent", 1)),
+                compute_types=compute_types,
+                default_compute_type=default_compute_type,
+            )
+        return cls(tiers, config.get("default", next(iter(tiers))))
+
+    @property
+    def default_tier(self) -> ModelTier:
+        return self.tiers[self.default]
+
+    def resolve(self, model: Optional[str] = None, compute_type: Optional[str] = None) -> Tuple[ModelTier, Optional[str]]:
+        """
+        Validate a client's selection.
+
+        Returns:
+            The tier and the compute type to load it with (None means the
+            device default).
+
+        Raises:
+            ModelSelectionError: If the tier or compute type is not allowed.
+        """
+        tier = self.tiers.get(model or self.default)
+        if tier is None:
+            raise ModelSelectionError(
+                f"Unsupported model '{model}'. Allowed models: {', '.join(self.tiers)}"
+            )
+        if compute_type is None:
+            return tier, tier.default_compute_type
+        if compute_type not in tier.compute_types:
+            raise ModelSelectionError(
+                f"Unsupported compute_type '{compute_type}' for model '{tier.name}'. "
+                f"Allowed compute types: {', '.join(tier.compute_types)}"
+            )
+        return tier, compute_type
+
+    def describe(self) -> Dict:
+        return {
+            "default": self.default,
+            "models": [
+                {
+                    "name": tier.name,
+                    "max_concurrent": tier.max_concurrent,
+                    "compute_types": list(tier.compute_types),
+                    "default_compute_type": tier.default_compute_type,
+                }
+                for tier in self.tiers.values()
+            ],
+        }
+
+
+def load_model_registry() -> ModelRegistry:
+    """Build the registry from WHISPER_MODEL_REGISTRY(_FILE), or the built-in tiers."""
+    inline = os.getenv("WHISPER_MODEL_REGISTRY")
+    path = os.getenv("WHISPER_MODEL_REGISTRY_FILE")
+    if inline:
+        config = json.loads(inline)
+    elif path:
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    else:
+        config = _default_tiers()
+    registry = ModelRegistry.from_config(config)
+    logger.info(f"Model registry loaded with tiers: {', '.join(registry.tiers)} (default {registry.default})")
+    return registry
@@ -0,0 +1,177 @@
+"""Rule-based Chinese punctuation, used when the zhpr model is unavailable.
+
+The rules insert a question mark after question words, a comma after a leading
+那/这, and a comma before the last conjunction and the last transition word of
+the text, then end the sentence with a full stop and clean up punctuation
+combinations such as ``，。``.
+
+All keywords are found by one combined regex in a single scan. The insertion
+points are computed from the keyword positions and the text is rebuilt with one
+join. The cleanup is a second single scan over the runs of ``，`` and ``。``.
+The output is the same as applying the original sequence of ``re.sub`` calls,
+whose ``(.{3,})(所以|...)`` patterns backtrack quadratically on long paragraphs.
+"""
+
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+import re
+
+# 疑问词后加问号
+QUESTION_WORDS = ("什么", "为什么", "怎么", "哪里", "哪儿", "谁", "何时", "如何", "是否", "吗", "呢")
+# 连接词前加逗号（需要前后各至少 3 个字符）
+CONJUNCTIONS = ("所以", "因为", "如果", "就是", "也就是说")
+# 转折词前加逗号（需要前面至少 3 个字符）
+TRANSITIONS = ("但是", "不过", "然而", "可是", "而且", "另外", "同时", "接着", "然后")
+# 句号改为逗号的短语（句号后还有内容时）
+CONTINUING_PHRASES = ("会", "也会", "可能会", "应该", "就是", "这样", "那个")
+# 连续逗号合并为一个的连接词
+COMMA_CONNECTIVES = ("然后", "但是", "而且", "所以")
+
+# 关键词后是这些标点时不再插入
+_PUNCTUATION = frozenset("。！？，、；：")
+_SENTENCE_END = frozenset("。！？")
+_QUESTION, _CONJUNCTION, _TRANSITION = range(3)
+_KEYWORD_RULES = {
+    **{word: _QUESTION for word in QUESTION_WORDS},
+    **{word: _CONJUNCTION for word in CONJUNCTIONS},
+    **{word: _TRANSITION for word in TRANSITIONS},
+}
+# 零宽匹配，重叠的关键词（如"因为什么"）都能找到
+_KEYWORD_RE = re.compile(
+    "(?=(" + "|".join(map(re.escape, sorted(_KEYWORD_RULES, key=len, reverse=True))) + "))"
+)
+_RUN_RE = re.compile("[，。]+")
+_COMMAS_RE = re.compile("，，+")
+_PERIODS_RE = re.compile("。。+")
+_CONNECTIVE_COMMAS_RE = re.compile(f"({'|'.join(COMMA_CONNECTIVES)})，，")
+
+
+def add_chinese_punctuation(text: str, language: str) -> str:
+    """
+    Add basic punctuation to Chinese text with keyword rules.
+
+    Text in other languages is returned unchanged. Whitespace is removed; text
+    that already has enough punctuation is only cleaned up.
+    """
+    if not text or language not in ("zh", "chinese"):
+        return text
+
+    text = "".join(text.split())
+    length = len(text)
+
+    # 已有足够标点时只做清理
+    punctuation_count = sum(map(text.count, _PUNCTUATION))
+    if punctuation_count > 0 and punctuation_count / length > 0.02:
+        return clean_punctuation_combinations(text)
+
+    # 一次扫描找出所有关键词；疑问词按 re.sub 的规则从左到右、互不重叠地匹配
+    question_ends = []
+    conjunctions = []
+    transitions = []
+    consumed = 0
+    for match in _KEYWORD_RE.finditer(text):
+        start = match.start()
+        word = match.group(1)
+        end = start + len(word)
+        rule = _KEYWORD_RULES[word]
+        if rule == _QUESTION:
+            if start >= consumed and (end == length or text[end] not in _PUNCTUATION):
+                question_ends.append(end)
+                consumed = end
+        elif rule == _CONJUNCTION:
+            conjunctions.append((start, end))
+        else:
+            transitions.append((start, end))
+
+    # 插入点：原文位置 -> 在该字符之前插入的标点（同一位置按插入顺序排列）
+    insertions = [(end, "？") for end in question_ends]
+    inserted = list(question_ends)
+
+    # 开头的"那/这"后加逗号：其后至少 5 个字符（含已插入的问号）且紧跟的不是标点
+    if (
+        length > 1
+        and text[0] in "那这"
+        and length + len(inserted) - 1 >= 5
+        and 1 not in inserted
+        and text[1] not in _PUNCTUATION
+    ):
+        insertions.append((1, "，"))
+        inserted.append(1)
+        inserted.sort()
+
+    # 连接词与转折词各自只在最后一个满足条件的位置前加逗号（贪婪的 (.{3,}) 只匹配一次）
+    conjunction_start = _last_keyword(text, conjunctions, inserted, min_following=3)
+    if conjunction_start is not None:
+        insertions.append((conjunction_start, "，"))
+        inserted = sorted(inserted + [conjunction_start])
+    transition_start = _last_keyword(text, transitions, inserted, min_following=0)
+    if transition_start is not None:
+        insertions.append((transition_start, "，"))
+
+    insertions.sort(key=lambda insertion: insertion[0])
+    parts = []
+    previous = 0
+    for position, mark in insertions:
+        parts.append(text[previous:position])
+        parts.append(mark)
+        previous = position
+    parts.append(text[previous:])
+    last_char = parts[-2] if previous == length and insertions else text[-1:]
+    if last_char not in _SENTENCE_END:
+        parts.append("。")
+
+    return clean_punctuation_combinations("".join(parts))
+
+
+def _last_keyword(text, keywords, inserted, min_following):
+    """Start of the last keyword that has 3+ characters before it in the punctuated text."""
+    length = len(text)
+    inserted_positions = set(inserted)
+    for start, end in reversed(keywords):
+        if start + bisect_right(inserted, start) < 3:
+            return None
+        # 紧跟的字符不能是标点（包括已插入的标点）
+        if end in inserted_positions or (end < length and text[end] in _PUNCTUATION):
+            continue
+        if min_following and length - end + len(inserted) - bisect_left(inserted, end) < min_following:
+            continue
+        return start
+    return None
+
+
+@lru_cache(maxsize=1024)
+def _collapse_run(run: str) -> str:
+    # 依次：，。-> 。 / 。，-> 。 / 连续逗号 / 连续句号
+    run = run.replace("，。", "。").replace("。，", "。")
+    return _PERIODS_RE.sub("。", _COMMAS_RE.sub("，", run))
+
+
+def clean_punctuation_combinations(text: str) -> str:
+    """Clean up unreasonable combinations of ``，`` and ``。`` in one scan."""
+    length = len(text)
+    parts = []
+    previous = 0
+    for match in _RUN_RE.finditer(text):
+        start, end = match.span()
+        run = _collapse_run(match.group())
+        # 短语后的句号改为逗号（句号后还有内容时）
+        if run[0] == "。" and text.endswith(CONTINUING_PHRASES, previous, start):
+            followed = len(run) > 1 or (end < length and text[end] != "\n")
+            if followed:
+                run = "，" + run[1:]
+        # 移除开头的逗号
+        if start == 0 and run[0] == "，":
+            run = run[1:]
+        # 结尾的逗号改为句号
+        if run.endswith("，") and (end == length or (end == length - 1 and text[end] == "\n")):
+            run = run[:-1] + "。"
+        parts.append(text[previous:start])
+        parts.append(run)
+        previous = end
+    parts.append(text[previous:])
+    text = "".join(parts)
+
+    # 清理连接词后的重复逗号
+    if "，，" in text:
+        text = _CONNECTIVE_COMMAS_RE.sub(r"\1，", text)
+    return text
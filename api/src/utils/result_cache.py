@@ -0,0 +1,162 @@
+"""On-disk, content-addressed cache for transcription results.
+
+Entries are keyed by the audio content hash plus the options that influence
+the output (language, denoise, model settings). The cache is bounded both by
+total size (least-recently-used entries are evicted first) and by age (TTL).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIPTION_CACHE_DIR = os.getenv(
+    "TRANSCRIPTION_CACHE_DIR",
+    str(pathlib.Path(tempfile.gettempdir()) / "transcription_cache"),
+)
+TRANSCRIPTION_CACHE_MAX_BYTES = int(os.getenv("TRANSCRIPTION_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+TRANSCRIPTION_CACHE_TTL_SECONDS = int(os.getenv("TRANSCRIPTION_CACHE_TTL_SECONDS", str(7 * 24 * 60 * 60)))
+
+
+def make_cache_key(content_hash: str, **options) -> str:
+    """Build a stable cache key from the content hash and output-affecting options."""
+    payload = json.dumps({"content": content_hash, **options}, sort_keys=True, ensure_ascii=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TranscriptionCache:
+    """Size-bounded LRU cache with TTL, persisted as one JSON file per entry."""
+
+    def __init__(
+        self,
+        cache_dir: str = TRANSCRIPTION_CACHE_DIR,
+        max_bytes: int = TRANSCRIPTION_CACHE_MAX_BYTES,
+        ttl_seconds: int = TRANSCRIPTION_CACHE_TTL_SECONDS,
+    ):
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # key -> [size, last_used]; created time is the file's mtime
+        self._index: Dict[str, list] = {}
+        self._total_bytes = 0
+        self._loaded = False
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _load_index(self):
+        """Scan existing entries once so the cache survives restarts."""
+        if self._loaded:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            self._index[path.stem] = [stat.st_size, stat.st_atime]
+            self._total_bytes += stat.st_size
+        self._loaded = True
+
+    def _remove(self, key: str):
+        size, _ = self._index.pop(key, (0, 0))
+        self._total_bytes -= size
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Failed to remove cache entry {key}: {e}")
+
+    def _is_expired(self, key: str, now: float) -> bool:
+        if self.ttl_seconds <= 0:
+            return False
+        try:
+            return now - self._path(key).stat().st_mtime > self.ttl_seconds
+        except OSError:
+            return True
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the cached result for ``key`` or None (counted as hit/miss)."""
+        with self._lock:
+            self._load_index()
+            now = time.time()
+            if key not in self._index or self._is_expired(key, now):
+                if key in self._index:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            try:
+                with open(self._path(key), "r", encoding="utf-8") as f:
+                    result = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Dropping unreadable cache entry {key}: {e}")
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._index[key][1] = now
+            self.hits += 1
+            return result
+
+    def put(self, key: str, result: Dict):
+        """Store a result, evicting expired and least-recently-used entries as needed."""
+        data = json.dumps(result, ensure_ascii=False).encode("utf-8")
+        if self.max_bytes and len(data) > self.max_bytes:
+            return
+        with self._lock:
+            self._load_index()
+            if key in self._index:
+                self._remove(key)
+            # 先写临时文件再原子替换，避免读到写了一半的条目
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, self._path(key))
+            except OSError as e:
+                logger.warning(f"Failed to write cache entry {key}: {e}")
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return
+            self._index[key] = [len(data), time.time()]
+            self._total_bytes += len(data)
+            self._evict()
+
+    def _evict(self):
+        now = time.time()
+        for key in [k for k in self._index if self._is_expired(k, now)]:
+            self._remove(key)
+            self.evictions += 1
+        if not self.max_bytes or self._total_bytes <= self.max_bytes:
+            return
+        for key, _ in sorted(self._index.items(), key=lambda item: item[1][1]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._remove(key)
+            self.evictions += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._load_index()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._index),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+            }
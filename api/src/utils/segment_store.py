@@ -0,0 +1,200 @@
+"""Compact, column-oriented storage for the segments of one transcription.
+
+A multi-hour transcript has tens of thousands of segments. Keeping them as
+Python objects (faster-whisper ``Segment`` with its token list, or a namedtuple
+per segment and per word) costs a few hundred bytes per segment and per word.
+``SegmentStore`` keeps start/end times in NumPy float64 arrays. Texts live in
+offset-indexed string pools, where each block of strings is joined into one
+``str``. Word timings live in parallel arrays with per-segment offsets.
+
+Segments are appended as they are decoded, with their raw text. Once a run of
+segments has been punctuated (and converted), ``set_outputs`` records the
+subtitle and punctuated texts for it. ``cues`` then yields ``SubtitleCue``
+values one at a time for rendering.
+"""
+
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .subtitle_renderer import SubtitleCue, WordTiming
+
+# 每个字符串块拼接的字符串个数
+STRING_BLOCK_SIZE = 1024
+
+
+class _Column:
+    """A growable 1-D NumPy array with amortised O(1) append."""
+
+    def __init__(self, dtype, capacity: int = 1024):
+        self._data = np.empty(capacity, dtype=dtype)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, value) -> None:
+        if self._size == len(self._data):
+            self._data = np.resize(self._data, 2 * len(self._data))
+        self._data[self._size] = value
+        self._size += 1
+
+    def __getitem__(self, index):
+        return self._data[index]
+
+    @property
+    def values(self) -> np.ndarray:
+        """The filled part of the column (a view, invalidated by later appends)."""
+        return self._data[:self._size]
+
+
+class StringPool:
+    """Append-only pool of strings addressed by index.
+
+    Every ``block_size`` strings are joined into one ``str``; a string is a
+    slice of its block between two entries of the offsets array.
+    """
+
+    def __init__(self, block_size: int = STRING_BLOCK_SIZE):
+        self.block_size = block_size
+        self._blocks: List[str] = []
+        self._tail: List[str] = []
+        self._tail_length = 0
+        # 第 i 个字符串在所在块中的结束偏移
+        self._ends = _Column(np.int64)
+
+    def __len__(self) -> int:
+        return len(self._ends)
+
+    def append(self, text: str) -> int:
+        self._tail.append(text)
+        self._tail_length += len(text)
+        self._ends.append(self._tail_length)
+        if len(self._tail) == self.block_size:
+            self._blocks.append("".join(self._tail))
+            self._tail = []
+            self._tail_length = 0
+        return len(self._ends) - 1
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("string pool index out of range")
+        block, position = divmod(index, self.block_size)
+        if block == len(self._blocks):
+            return self._tail[position]
+        start = int(self._ends[index - 1]) if position else 0
+        return self._blocks[block][start:int(self._ends[index])]
+
+    def slice(self, start: int, stop: int) -> List[str]:
+        return [self[index] for index in range(start, stop)]
+
+
+class SegmentStore:
+    """Columnar store for decoded segments and their processed texts."""
+
+    def __init__(self, word_timestamps: bool = False):
+        self.word_timestamps = word_timestamps
+        self._starts = _Column(np.float64)
+        self._ends = _Column(np.float64)
+        # 原始文本（去除首尾空白）的字符数，段落分组按它限制长度
+        self._lengths = _Column(np.int64)
+        self._raw = StringPool()
+        self._subtitles = StringPool()
+        self._texts = StringPool()
+        if word_timestamps:
+            self._word_offsets = _Column(np.int64)
+            self._word_offsets.append(0)
+            self._words = StringPool()
+            self._word_starts = _Column(np.float64)
+            self._word_ends = _Column(np.float64)
+            self._word_probabilities = _Column(np.float64)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    @property
+    def finalized(self) -> int:
+        """Number of leading segments whose outputs have been recorded."""
+        return len(self._texts)
+
+    @property
+    def starts(self) -> np.ndarray:
+        return self._starts.values
+
+    @property
+    def ends(self) -> np.ndarray:
+        return self._ends.values
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return self._lengths.values
+
+    def append(self, start: float, end: float, text: str, words: Optional[Iterable] = None) -> int:
+        """
+        Add a decoded segment and return its index.
+
+        ``text`` should already be stripped. ``words`` (faster-whisper
+        ``Word`` objects or WordTiming) is kept only when the store was created
+        with ``word_timestamps``; times and probabilities are rounded to
+        milliseconds like ``compact_words``.
+        """
+        self._starts.append(start)
+        self._ends.append(end)
+        self._lengths.append(len(text))
+        self._raw.append(text)
+        if self.word_timestamps:
+            for word in words or ():
+                self._words.append(word.word)
+                self._word_starts.append(round(word.start, 3))
+                self._word_ends.append(round(word.end, 3))
+                self._word_probabilities.append(round(word.probability, 3))
+            self._word_offsets.append(len(self._words))
+        return len(self) - 1
+
+    def text(self, index: int) -> str:
+        """Raw (stripped) text of segment ``index``."""
+        return self._raw[index]
+
+    def texts(self, start: int, stop: int) -> List[str]:
+        return self._raw.slice(start, stop)
+
+    def words(self, index: int) -> Optional[Tuple[WordTiming, ...]]:
+        if not self.word_timestamps:
+            return None
+        first, last = int(self._word_offsets[index]), int(self._word_offsets[index + 1])
+        return tuple(
+            WordTiming(
+                self._words[position],
+                float(self._word_starts[position]),
+                float(self._word_ends[position]),
+                float(self._word_probabilities[position]),
+            )
+            for position in range(first, last)
+        )
+
+    def set_outputs(self, start: int, subtitles: List[str], texts: List[str]) -> None:
+        """Record subtitle and punctuated texts for segments ``start, start + 1, ...``.
+
+        Outputs must be recorded in segment order, without gaps.
+        """
+        if start != self.finalized:
+            raise ValueError(f"outputs must continue at segment {self.finalized}, got {start}")
+        if len(subtitles) != len(texts) or start + len(texts) > len(self):
+            raise ValueError("outputs do not match the stored segments")
+        for subtitle, text in zip(subtitles, texts):
+            self._subtitles.append(subtitle)
+            self._texts.append(text)
+
+    def cues(self) -> Iterator[SubtitleCue]:
+        """Yield a SubtitleCue per finalized segment, in order."""
+        starts, ends = self.starts, self.ends
+        for index in range(self.finalized):
+            yield SubtitleCue(
+                float(starts[index]),
+                float(ends[index]),
+                self._subtitles[index],
+                self._texts[index],
+                self.words(index),
+            )
@@ -0,0 +1,142 @@
+"""Render processed transcription segments into subtitle and text formats.
+
+All requested formats are produced in one pass over the segments, with list
+builders joined once at the end. Timestamps are rounded to whole milliseconds
+once and formatted with integer arithmetic, so SRT and WebVTT cues never
+disagree and float artefacts such as ``7323.998 -> ,997`` cannot occur.
+
+SRT and TXT are always rendered. WebVTT (``vtt``) and a JSON segment list
+(``json``) are opt-in per request; when word timestamps were requested the JSON
+segments also carry a compact ``[word, start, end, probability]`` array.
+"""
+
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+SUBTITLE_FORMATS = ("srt", "txt", "vtt", "json")
+DEFAULT_FORMATS = ("srt", "txt")
+
+# 这些语言的纯文本直接拼接，不用空格分隔
+NO_SPACE_LANGUAGES = frozenset(("zh", "ja", "ko", "th", "chinese", "japanese", "korean", "thai"))
+
+
+class WordTiming(NamedTuple):
+    """A word with its timing, detached from faster-whisper's per-word objects."""
+    word: str
+    start: float
+    end: float
+    probability: float
+
+
+class SubtitleCue(NamedTuple):
+    """One segment ready for rendering."""
+    start: float
+    end: float
+    subtitle: str  # 字幕行文本（SRT / WebVTT）
+    text: str  # 标点处理后的文本（TXT / JSON）
+    words: Optional[Tuple[WordTiming, ...]] = None  # 未请求词级时间戳时为 None
+
+
+def compact_words(words) -> Tuple[WordTiming, ...]:
+    """Convert faster-whisper ``Word`` objects (or WordTiming) to rounded WordTiming tuples."""
+    return tuple(
+        WordTiming(word.word, round(word.start, 3), round(word.end, 3), round(word.probability, 3))
+        for word in words or ()
+    )
+
+
+def parse_formats(value: Optional[str]) -> Tuple[str, ...]:
+    """
+    Parse a comma separated ``formats`` request field.
+
+    SRT and TXT are always included; unknown names raise ValueError.
+    """
+    requested = [name.strip().lower() for name in (value or "").split(",") if name.strip()]
+    unknown = sorted(set(requested) - set(SUBTITLE_FORMATS))
+    if unknown:
+        raise ValueError(
+            f"Unsupported formats: {', '.join(unknown)}. Allowed formats: {', '.join(SUBTITLE_FORMATS)}"
+        )
+    return tuple(name for name in SUBTITLE_FORMATS if name in DEFAULT_FORMATS or name in requested)
+
+
+def to_milliseconds(seconds: float) -> int:
+    return int(round(seconds * 1000))
+
+
+def _clock(milliseconds: int, separator: str) -> str:
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02}:{minutes:02}:{seconds:02}{separator}{milliseconds:03}"
+
+
+def format_srt_timestamp(milliseconds: int) -> str:
+    """``hh:mm:ss,mmm``"""
+    return _clock(milliseconds, ",")
+
+
+def format_vtt_timestamp(milliseconds: int) -> str:
+    """``hh:mm:ss.mmm``"""
+    return _clock(milliseconds, ".")
+
+
+def render_subtitles(
+    cues: Iterable[SubtitleCue],
+    language: Optional[str],
+    formats: Iterable[str] = DEFAULT_FORMATS,
+) -> Dict:
+    """
+    Render ``cues`` into every format in ``formats``.
+
+    Returns:
+        A dict keyed by format name. ``srt``, ``txt`` and ``vtt`` are strings;
+        ``json`` is a list of ``{"index", "start", "end", "text", "subtitle"}``
+        dicts with times in seconds, plus ``"words"`` for cues that have them.
+    """
+    formats = set(formats)
+    want_srt = "srt" in formats
+    want_vtt = "vtt" in formats
+    want_json = "json" in formats
+
+    srt_parts: List[str] = []
+    vtt_parts: List[str] = ["WEBVTT\n\n"]
+    txt_parts: List[str] = []
+    json_segments: List[Dict] = []
+
+    for index, cue in enumerate(cues, start=1):
+        start_ms = to_milliseconds(cue.start)
+        end_ms = to_milliseconds(cue.end)
+        if want_srt:
+            srt_parts.append(
+                f"{index}\n{format_srt_timestamp(start_ms)} --> {format_srt_timestamp(end_ms)}\n{cue.subtitle}\n\n"
+            )
+        if want_vtt:
+            vtt_parts.append(
+                f"{index}\n{format_vtt_timestamp(start_ms)} --> {format_vtt_timestamp(end_ms)}\n{cue.subtitle}\n\n"
+            )
+        if want_json:
+            item = {
+                "index": index,
+                "start": start_ms / 1000,
+                "end": end_ms / 1000,
+                "text": cue.text,
+                "subtitle": cue.subtitle,
+            }
+            if cue.words is not None:
+                item["words"] = [list(word) for word in cue.words]
+            json_segments.append(item)
+        # 开头的空文本不参与拼接（与逐段追加的旧实现一致）
+        if txt_parts or cue.text:
+            txt_parts.append(cue.text)
+
+    rendered = {}
+    if want_srt:
+        rendered["srt"] = "".join(srt_parts)
+    if "txt" in formats:
+        separator = "" if language in NO_SPACE_LANGUAGES else " "
+        rendered["txt"] = separator.join(txt_parts).strip()
+    if want_vtt:
+        rendered["vtt"] = "".join(vtt_parts)
+    if want_json:
+        rendered["json"] = json_segments
+    return rendered
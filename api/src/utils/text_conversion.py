@@ -1,22 +1,93 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
 import logging
+import multiprocessing
+import os
+import threading
 from functools import lru_cache
-from typing import Optional
+from typing import List, Optional
 
 import opencc
 
 
 logger = logging.getLogger(__name__)
 
+# 大文本按行切成不超过该字符数的块，由进程池并行转换（纯 Python 后端无法用线程并行）
+CONVERT_CHUNK_CHARS = int(os.getenv("CONVERT_CHUNK_CHARS", "65536"))
+# 转换进程数，小于 2 时所有转换都在线程池中执行
+CONVERT_PROCESSES = int(os.getenv("CONVERT_PROCESSES", str(min(4, os.cpu_count() or 1))))
 
-@lru_cache(maxsize=1)
-def _get_converter() -> opencc.OpenCC:
-    """Lazily create and cache the OpenCC converter."""
-    return opencc.OpenCC("s2t")
+# 可按请求选择的转换配置：通用繁体 / 台湾正体 / 台湾正体（含惯用词）/ 香港繁体
+SUPPORTED_PROFILES = ("s2t", "s2tw", "s2twp", "s2hk")
+# 默认配置；不支持的值记录警告并回退到 s2t，避免每次转换（包括转录）都因配置错误失败
+DEFAULT_PROFILE = os.getenv("OPENCC_PROFILE", "s2t").strip().lower()
+if DEFAULT_PROFILE not in SUPPORTED_PROFILES:
+    logger.warning(
+        "Unsupported OPENCC_PROFILE %r, falling back to s2t. Allowed profiles: %s",
+        DEFAULT_PROFILE, ", ".join(SUPPORTED_PROFILES),
+    )
+    DEFAULT_PROFILE = "s2t"
+# 已转换短行的 LRU 缓存条目数（字幕中重复的短句很多），0 表示不缓存
+PHRASE_CACHE_SIZE = int(os.getenv("OPENCC_PHRASE_CACHE_SIZE", "65536"))
+# 超过该字符数的行不进入缓存
+PHRASE_CACHE_MAX_CHARS = int(os.getenv("OPENCC_PHRASE_CACHE_MAX_CHARS", "128"))
 
 
-def convert_to_traditional_chinese(text: Optional[str]) -> str:
+def conversion_backend() -> str:
+    """Name of the installed OpenCC implementation: ``native`` or ``python``.
+
+    The official bindings (``pip install opencc``) and the pure-Python
+    ``opencc-python-reimplemented`` package are both imported as ``opencc``;
+    only the official one ships the ``opencc_clib`` C++ extension.
+    """
+    return "native" if hasattr(opencc, "opencc_clib") else "python"
+
+
+def validate_profile(profile: Optional[str]) -> str:
+    """Normalise a profile name; None selects DEFAULT_PROFILE.
+
+    Raises ValueError for profiles outside SUPPORTED_PROFILES.
+    """
+    profile = (profile or DEFAULT_PROFILE).strip().lower()
+    if profile not in SUPPORTED_PROFILES:
+        raise ValueError(
+            f"Unsupported conversion profile: {profile}. Allowed profiles: {', '.join(SUPPORTED_PROFILES)}"
+        )
+    return profile
+
+
+@lru_cache(maxsize=None)
+def _get_converter(profile: str = "s2t") -> opencc.OpenCC:
+    """Lazily create and cache one OpenCC converter per profile."""
+    converter = opencc.OpenCC(f"{profile}.json" if conversion_backend() == "native" else profile)
+    logger.info("Loaded OpenCC %s converter (%s backend)", profile, conversion_backend())
+    return converter
+
+
+@lru_cache(maxsize=PHRASE_CACHE_SIZE)
+def _convert_phrase(profile: str, phrase: str) -> str:
+    return _get_converter(profile).convert(phrase)
+
+
+def _convert_lines(text: str, profile: str) -> str:
+    # OpenCC 的词组不会跨行，逐行转换与整体转换结果一致
+    converter = _get_converter(profile)
+    converted = []
+    for line in text.split("\n"):
+        if line.isascii():
+            # 序号、时间轴和空行无需转换
+            converted.append(line)
+        elif len(line) <= PHRASE_CACHE_MAX_CHARS:
+            converted.append(_convert_phrase(profile, line))
+        else:
+            converted.append(converter.convert(line))
+    return "\n".join(converted)
+
+
+def convert_to_traditional_chinese(text: Optional[str], profile: str = DEFAULT_PROFILE) -> str:
     """Convert simplified Chinese text to traditional Chinese.
 
+    ``profile`` selects the OpenCC configuration (see SUPPORTED_PROFILES).
     When conversion fails the original text is returned.
     """
 
@@ -24,9 +95,110 @@ def convert_to_traditional_chinese(text: Optional[str]) -> str:
         # Preserve empty string/None semantics for callers.
         return text or ""
 
+    profile = validate_profile(profile)
     try:
-        converter = _get_converter()
-        return converter.convert(text)
+        return _convert_lines(text, profile)
     except Exception as exc:
         logger.warning("Failed to convert to traditional Chinese: %s", exc)
         return text
+
+
+def convert_many_to_traditional_chinese(texts: List[str], profile: str = DEFAULT_PROFILE) -> List[str]:
+    """Convert several texts with a single OpenCC call.
+
+    The texts are joined with newlines, converted once and split again. Texts
+    that themselves contain newlines are converted one by one instead.
+    """
+
+    if not texts:
+        return []
+    if any("\n" in text for text in texts):
+        return [convert_to_traditional_chinese(text, profile) for text in texts]
+
+    converted = convert_to_traditional_chinese("\n".join(texts), profile).split("\n")
+    if len(converted) != len(texts):
+        return [convert_to_traditional_chinese(text, profile) for text in texts]
+    return converted
+
+
+def split_at_line_boundaries(text: str, max_chars: int) -> List[str]:
+    """Split ``text`` into chunks of whole lines, each at most ``max_chars`` long.
+
+    A single line longer than ``max_chars`` becomes its own chunk. Joining the
+    chunks gives back ``text``. OpenCC phrases never span a newline, so the
+    chunks can be converted independently.
+    """
+
+    if len(text) <= max_chars:
+        return [text]
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = start + max_chars
+        if end >= len(text):
+            chunks.append(text[start:])
+            break
+        cut = text.rfind("\n", start, end)
+        if cut == -1:
+            # 单行超过块大小：切在该行结尾
+            cut = text.find("\n", end)
+            if cut == -1:
+                chunks.append(text[start:])
+                break
+        chunks.append(text[start:cut + 1])
+        start = cut + 1
+    return chunks
+
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def _get_process_pool() -> Optional[ProcessPoolExecutor]:
+    """Lazily start the conversion processes (None when CONVERT_PROCESSES < 2)."""
+
+    global _process_pool
+    if CONVERT_PROCESSES < 2:
+        return None
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=CONVERT_PROCESSES, mp_context=multiprocessing.get_context("spawn")
+            )
+            logger.info("Started %d traditional Chinese conversion processes", CONVERT_PROCESSES)
+        return _process_pool
+
+
+def shutdown_conversion_pool() -> None:
+    """Stop the conversion processes, e.g. on application shutdown."""
+
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
+
+
+async def convert_to_traditional_chinese_async(text: Optional[str], profile: str = DEFAULT_PROFILE) -> str:
+    """Convert text without blocking the event loop.
+
+    Text that fits in one chunk is converted in the default thread pool.
+    Larger text is split at line boundaries and the chunks are converted in
+    parallel in the process pool.
+    """
+
+    if not text:
+        return text or ""
+
+    profile = validate_profile(profile)
+    loop = asyncio.get_running_loop()
+    chunks = split_at_line_boundaries(text, CONVERT_CHUNK_CHARS)
+    executor = _get_process_pool() if len(chunks) > 1 else None
+    if executor is None:
+        return await loop.run_in_executor(None, convert_to_traditional_chinese, text, profile)
+
+    converted = await asyncio.gather(
+        *(loop.run_in_executor(executor, convert_to_traditional_chinese, chunk, profile) for chunk in chunks)
+    )
+    return "".join(converted)
@@ -0,0 +1,66 @@
+"""Helpers for spooling uploaded files to disk without buffering them in memory."""
+
+import hashlib
+import logging
+import os
+from typing import BinaryIO, NamedTuple
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+# 每次从上传流读取并写入磁盘的块大小，以及单个上传允许的最大字节数
+UPLOAD_BLOCK_SIZE = int(os.getenv("UPLOAD_BLOCK_SIZE", str(1024 * 1024)))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(4 * 1024 * 1024 * 1024)))
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds the configured maximum size."""
+
+
+class SpooledUpload(NamedTuple):
+    size: int
+    sha256: str
+
+
+def _write_block(dest: BinaryIO, hasher, block: bytes) -> None:
+    hasher.update(block)
+    dest.write(block)
+
+
+async def spool_upload(
+    upload: UploadFile,
+    dest: BinaryIO,
+    *,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+    block_size: int = UPLOAD_BLOCK_SIZE,
+) -> SpooledUpload:
+    """
+    Copy an upload into ``dest`` in fixed-size blocks.
+
+    Hashing and file writes run in the thread pool so a large upload does not
+    stall the event loop. Only one block is held in memory at a time.
+
+    Args:
+        upload: The incoming FastAPI upload.
+        dest: Binary file object opened for writing.
+        max_bytes: Maximum accepted size; exceeding it raises UploadTooLargeError.
+        block_size: Number of bytes copied per iteration.
+
+    Returns:
+        SpooledUpload with the total size and hex SHA-256 of the content.
+    """
+    hasher = hashlib.sha256()
+    size = 0
+    while True:
+        block = await upload.read(block_size)
+        if not block:
+            break
+        size += len(block)
+        if max_bytes and size > max_bytes:
+            raise UploadTooLargeError(f"Upload exceeds maximum size of {max_bytes} bytes")
+        await run_in_threadpool(_write_block, dest, hasher, block)
+
+    await run_in_threadpool(dest.flush)
+    return SpooledUpload(size=size, sha256=hasher.hexdigest())
@@ -7,12 +7,17 @@ except RuntimeError:
 
 import torch
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
 
 from .routers.convert import router as convert_router
-from .routers.transcribe import router as transcribe_router
-from .utils.text_conversion import convert_to_traditional_chinese
-from .workers.transcribe_worker import add_chinese_punctuation, format_timestamp
+from .routers import punctuate as punctuate_module
+from .routers.punctuate import router as punctuate_router
+from .routers.transcribe import router as transcribe_router, transcribe_pool, MAX_CONCURRENT_TASKS
+from .utils.text_conversion import convert_to_traditional_chinese, shutdown_conversion_pool
+from .workers.punctuation_service import PUNCTUATION_SERVICE_ENABLED, PunctuationService
+from .workers.transcribe_worker import _ZHPR_AVAILABLE, add_chinese_punctuation, format_timestamp
 
 # 设置日志配置
 logging.basicConfig(level=logging.INFO)  # 设置日志级别为 INFO
@@ -24,11 +29,33 @@ compute_type = "float16" if device == "cuda" else "int8"
 logger.info(f"使用设备: {device}, 计算类型: {compute_type}")
 logger.info("API server started on port http://localhost:8010")
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """启动时预热共享标点服务和常驻 Whisper 进程池，关闭时停止所有 worker、标点服务和繁体转换进程"""
+    # 标点服务只在启用且安装了 zhpr 时创建，并先于进程池启动，worker 创建时才能拿到服务的客户端
+    punctuation_service = None
+    if PUNCTUATION_SERVICE_ENABLED and _ZHPR_AVAILABLE:
+        punctuation_service = PunctuationService(num_clients=MAX_CONCURRENT_TASKS)
+        await run_in_threadpool(punctuation_service.start)
+        transcribe_pool.punctuation_service = punctuation_service
+        punctuate_module.punctuation_service = punctuation_service
+    await run_in_threadpool(transcribe_pool.start)
+    yield
+    await run_in_threadpool(transcribe_pool.shutdown)
+    if punctuation_service is not None:
+        punctuate_module.punctuation_service = None
+        transcribe_pool.punctuation_service = None
+        await run_in_threadpool(punctuation_service.shutdown)
+    shutdown_conversion_pool()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # 挂载路由
 app.include_router(transcribe_router)
 app.include_router(convert_router)
+app.include_router(punctuate_router)
 
 @app.get("/health")
 async def health_check():
@@ -4,7 +4,13 @@ import os
 import tempfile
 import logging
 import sys
-from ..utils.ffmpeg_utils import convert_video_to_audio, validate_video_file
+from ..utils.ffmpeg_utils import convert_video_to_audio, get_video_info, validate_video_file
+
+# 編碼統計（已編碼時長、編碼速度、輸出字節數）在 progress_dict 中的鍵，與進度百分比並列
+ENCODE_STATS_FIELDS = ("out_time_seconds", "encode_speed", "output_bytes")
+
+def stats_key(task_id: str) -> str:
+    return f"{task_id}:stats"
 
 # 配置子進程日誌
 def setup_worker_logging():
@@ -57,9 +63,10 @@ def convert_worker(
             })
             return
         
-        # 验证输入文件
+        # 验证输入文件：只运行一次 ffprobe，探测结果同时用于验证和转换进度计算
         logger.info("Validating video file...")
-        is_valid, validation_message = validate_video_file(video_path)
+        video_info = get_video_info(video_path)
+        is_valid, validation_message = validate_video_file(video_path, video_info=video_info)
         if not is_valid:
             error_msg = f"Video validation failed: {validation_message}"
             logger.error(error_msg)
@@ -86,6 +93,12 @@ def convert_worker(
             progress_dict[task_id] = progress
             logger.info(f"Task {task_id} progress: {progress}%")
         
+        # 編碼統計回調：每次 ffmpeg 進度報告時更新，完成後保留最後一次的值
+        encode_stats = {}
+        def stats_callback(stats: dict):
+            encode_stats.update({field: stats[field] for field in ENCODE_STATS_FIELDS})
+            progress_dict[stats_key(task_id)] = dict(encode_stats)
+        
         # 执行转换
         logger.info("Starting FFmpeg conversion...")
         success, message = convert_video_to_audio(
@@ -93,7 +106,9 @@ def convert_worker(
             output_path=output_path,
             format=output_format,
             quality=quality,
-            progress_callback=progress_callback
+            progress_callback=progress_callback,
+            video_info=video_info,
+            stats_callback=stats_callback
         )
         
         logger.info(f"FFmpeg conversion result: success={success}, message={message}")
@@ -114,7 +129,8 @@ def convert_worker(
                     "format": output_format,
                     "quality": quality,
                     "file_size": output_size,
-                    "message": message
+                    "message": message,
+                    "encode_stats": encode_stats
                 }
                 logger.info(f"Putting result into queue for task {task_id}")
                 result_queue.put(result)
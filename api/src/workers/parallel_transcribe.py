@@ -0,0 +1,268 @@
+"""Opt-in parallel transcription for long recordings.
+
+The audio is decoded once, cut into roughly equal chunks at silence boundaries
+found by Silero VAD, and every chunk is transcribed in its own process. Chunk
+results are stitched back together in order with their timestamps shifted by
+the chunk offset, so callers consume one stream of segments exactly like the
+output of ``WhisperModel.transcribe``.
+
+Each chunk process loads its own copy of the model, so memory use grows with
+the number of workers; the mode is meant for CPU hosts with idle cores. The
+chunk processes only live for one job: they are started for it and shut down
+when its segments have been consumed. ``TranscribePool`` caps how many jobs run
+in parallel mode at once (``PARALLEL_TRANSCRIBE_MAX_JOBS``).
+
+Chunks are not pickled into the children. Each child maps the audio from a
+``.npy`` file (the decoded-audio cache entry, or a temporary file) and reads
+its own sample range.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+# 并行转录使用的进程数，以及启用切分所需的最短音频时长（秒）
+PARALLEL_TRANSCRIBE_WORKERS = int(os.getenv("PARALLEL_TRANSCRIBE_WORKERS", "4"))
+PARALLEL_TRANSCRIBE_MIN_SECONDS = float(os.getenv("PARALLEL_TRANSCRIBE_MIN_SECONDS", "600"))
+# 所有 worker 合计最多同时运行多少个并行转录任务（每个任务另外加载 PARALLEL_TRANSCRIBE_WORKERS 份模型），
+# 超出的任务按顺序转录
+PARALLEL_TRANSCRIBE_MAX_JOBS = int(os.getenv("PARALLEL_TRANSCRIBE_MAX_JOBS", "1"))
+
+
+class StitchedSegment(NamedTuple):
+    """A segment from one chunk with timestamps relative to the whole recording."""
+    start: float
+    end: float
+    text: str
+    words: Optional[Tuple] = None  # WordTiming，仅在请求词级时间戳时提供
+
+
+class ParallelTranscriptionInfo(NamedTuple):
+    language: str
+    duration: float
+    chunks: int
+
+
+def choose_split_points(
+    speech_timestamps: List[Dict],
+    total_samples: int,
+    num_chunks: int,
+) -> List[int]:
+    """
+    Pick sample offsets at which to cut the audio into ``num_chunks`` parts.
+
+    Every cut lies in the middle of a silence between two speech regions, the
+    one closest to the ideal equal-length boundary. Boundaries that have no
+    usable silence are dropped, so fewer chunks may be returned.
+
+    Args:
+        speech_timestamps: VAD output, dicts with ``start``/``end`` in samples.
+        total_samples: Length of the audio in samples.
+        num_chunks: Desired number of chunks.
+
+    Returns:
+        Strictly increasing cut offsets (excluding 0 and ``total_samples``).
+    """
+    if num_chunks < 2 or len(speech_timestamps) < 2:
+        return []
+
+    # 相邻语音片段之间的静音区间中点
+    gap_midpoints = [
+        (previous["end"] + current["start"]) // 2
+        for previous, current in zip(speech_timestamps, speech_timestamps[1:])
+        if current["start"] > previous["end"]
+    ]
+
+    points = []
+    for k in range(1, num_chunks):
+        ideal = total_samples * k // num_chunks
+        candidates = [p for p in gap_midpoints if not points or p > points[-1]]
+        if not candidates:
+            break
+        best = min(candidates, key=lambda p: abs(p - ideal))
+        if 0 < best < total_samples:
+            points.append(best)
+    return points
+
+
+def split_audio_at_silence(audio, num_chunks: int, vad_parameters: Optional[Dict] = None) -> List[Tuple[int, int]]:
+    """Return ``(start, end)`` sample ranges covering ``audio``, cut at silences."""
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    speech = get_speech_timestamps(audio, VadOptions(**(vad_parameters or {})))
+    bounds = [0] + choose_split_points(speech, len(audio), num_chunks) + [len(audio)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+# ---- chunk worker processes -------------------------------------------------
+
+_chunk_model = None
+
+
+def _exit_when_orphaned(parent_pid: int):
+    # 所属的转录 worker 被取消（杀死）时，子进程不会收到通知，这里自行退出
+    while True:
+        if os.getppid() != parent_pid:
+            os._exit(0)
+        time.sleep(1)
+
+
+def _init_chunk_worker(model_name: str, compute_type: Optional[str], cpu_threads: int, parent_pid: int):
+    global _chunk_model
+    threading.Thread(target=_exit_when_orphaned, args=(parent_pid,), daemon=True).start()
+
+    from .transcribe_worker import load_whisper_model
+    _chunk_model = load_whisper_model(model_name, compute_type, cpu_threads=cpu_threads)
+
+
+def _shift_words(words, offset_seconds: float):
+    if words is None:
+        return None
+    from ..utils.subtitle_renderer import WordTiming
+    return tuple(
+        WordTiming(word.word, word.start + offset_seconds, word.end + offset_seconds, word.probability)
+        for word in words
+    )
+
+
+def _transcribe_chunk(audio_file: str, start: int, end: int, language: Optional[str], transcribe_options: Dict):
+    # 子进程从内存映射的 .npy 中只读取自己的采样区间，父进程不必序列化整段音频
+    audio_chunk = np.load(audio_file, mmap_mode="r")[start:end]
+    offset_seconds = start / SAMPLE_RATE
+    segments, _ = _chunk_model.transcribe(audio_chunk, language=language, **transcribe_options)
+    return [
+        StitchedSegment(
+            segment.start + offset_seconds, segment.end + offset_seconds, segment.text,
+            _shift_words(segment.words, offset_seconds),
+        )
+        for segment in segments
+    ]
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _start_executor(num_workers: int, model_name: str, compute_type: Optional[str] = None) -> ProcessPoolExecutor:
+    """Start the chunk processes for one job; ``shutdown_executor`` stops them when the job ends."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        cpu_threads = max(1, (os.cpu_count() or 1) // num_workers)
+        _executor = ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_chunk_worker,
+            initargs=(model_name, compute_type, cpu_threads, os.getpid()),
+        )
+        logger.info(f"Started {num_workers} chunk transcription processes ({cpu_threads} CPU threads each)")
+        return _executor
+
+
+def shutdown_executor():
+    """Stop the chunk processes (and free their models) at the end of a job or when the pool worker retires."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def _npy_file_for(audio: np.ndarray) -> Tuple[str, bool]:
+    """Return a ``.npy`` file holding ``audio`` and whether it is a temporary file to delete afterwards.
+
+    A memory-mapped decoded-audio cache entry is used as is; other arrays are
+    written to a temporary file once.
+    """
+    filename = getattr(audio, "filename", None)
+    if isinstance(audio, np.memmap) and filename and str(filename).endswith(".npy"):
+        try:
+            mapped = np.load(filename, mmap_mode="r")
+            if mapped.shape == audio.shape and mapped.dtype == audio.dtype:
+                return str(filename), False
+        except (OSError, ValueError):
+            pass
+    fd, path = tempfile.mkstemp(suffix=".npy", prefix="parallel_audio_")
+    with os.fdopen(fd, "wb") as file:
+        np.save(file, np.ascontiguousarray(audio, dtype=np.float32))
+    return path, True
+
+
+def transcribe_parallel(
+    model,
+    audio_path: Union[str, np.ndarray],
+    language: Optional[str],
+    transcribe_options: Dict,
+    num_workers: int = PARALLEL_TRANSCRIBE_WORKERS,
+    min_duration: float = PARALLEL_TRANSCRIBE_MIN_SECONDS,
+    model_name: str = "large-v3",
+    compute_type: Optional[str] = None,
+):
+    """
+    Transcribe ``audio_path`` in silence-aligned chunks across several processes.
+
+    ``audio_path`` may also be an already decoded 16 kHz mono float32 array
+    (for example the output of ``denoise_audio_to_array``).
+
+    ``model`` is the caller's already loaded WhisperModel; it is only used to
+    detect the language once for the whole recording so that every chunk is
+    decoded with the same language.
+
+    Returns:
+        ``(segments, info)`` shaped like ``WhisperModel.transcribe`` output, where
+        ``segments`` yields StitchedSegment in order as chunks complete, or None
+        when the audio is too short (or has no usable silence) to split.
+    """
+    from faster_whisper.audio import decode_audio
+
+    if isinstance(audio_path, np.ndarray):
+        audio = audio_path
+    else:
+        audio = decode_audio(audio_path, sampling_rate=SAMPLE_RATE)
+    duration = len(audio) / SAMPLE_RATE
+    if num_workers < 2 or duration < min_duration:
+        return None
+
+    ranges = split_audio_at_silence(audio, num_workers, transcribe_options.get("vad_parameters"))
+    if len(ranges) < 2:
+        return None
+
+    if not language:
+        language, probability, _ = model.detect_language(audio=audio)
+        logger.info(f"Detected language '{language}' ({probability:.2f}) for parallel transcription")
+
+    audio_file, temporary = _npy_file_for(audio)
+    executor = _start_executor(num_workers, model_name, compute_type)
+    futures = [
+        executor.submit(_transcribe_chunk, audio_file, start, end, language, transcribe_options)
+        for start, end in ranges
+    ]
+    logger.info(f"Transcribing {duration:.0f}s of audio in {len(ranges)} parallel chunks")
+
+    def iter_segments():
+        try:
+            for future in futures:
+                yield from future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+            # 任务结束即停止子进程，模型副本不在任务之间常驻
+            shutdown_executor()
+            if temporary:
+                try:
+                    os.remove(audio_file)
+                except OSError:
+                    pass
+
+    return iter_segments(), ParallelTranscriptionInfo(language=language, duration=duration, chunks=len(ranges))
@@ -0,0 +1,383 @@
+"""Shared zhpr punctuation service with cross-request micro-batching.
+
+One service process owns the ``_ZhPunctuationRestorer``. Transcription workers
+and the ``/punctuate`` endpoint put ``(client id, request id, texts)`` on a
+shared request queue. The service waits for the first request, then keeps
+collecting until ``PUNCTUATION_MAX_BATCH`` texts are waiting or
+``PUNCTUATION_MAX_WAIT_MS`` has passed. It runs one ``punctuate_many`` over
+all of them and answers every request on its client's response queue.
+
+Each pool slot has its own response queue, and the API process has one more.
+``PunctuationClient`` has the same ``punctuate_many`` interface as the
+restorer, so a worker can use it in place of a local model. A failed or
+timed-out request raises, and the worker falls back to the punctuation rules.
+
+A watchdog thread in the parent restarts the service process when it dies.
+The restarted process gets fresh queues, because a killed process can leave
+a queue lock held. A shared generation counter is bumped on every restart.
+Clients holding the old queues notice within ``PUNCTUATION_WATCHDOG_SECONDS``
+and fail fast instead of waiting for ``PUNCTUATION_REQUEST_TIMEOUT``. The
+pool then respawns idle workers so they get clients for the new generation.
+"""
+
+import asyncio
+import itertools
+import logging
+from multiprocessing import Process, Queue, Value
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 是否在 API 进程旁启动共享标点服务（需要安装 zhpr）
+PUNCTUATION_SERVICE_ENABLED = os.getenv("PUNCTUATION_SERVICE", "1") == "1"
+# 每个微批次最多合并的文本（段落）数；单个请求超过该数量时整体作为一批
+PUNCTUATION_MAX_BATCH = int(os.getenv("PUNCTUATION_MAX_BATCH", "64"))
+# 收到第一个请求后最多等待多少毫秒来凑批
+PUNCTUATION_MAX_WAIT_MS = float(os.getenv("PUNCTUATION_MAX_WAIT_MS", "20"))
+# 客户端等待结果的超时时间（秒），超时后由调用方回退到规则标点
+PUNCTUATION_REQUEST_TIMEOUT = float(os.getenv("PUNCTUATION_REQUEST_TIMEOUT", "120"))
+# 检查服务进程是否存活的间隔（秒）；客户端也按此间隔检查服务是否已重启
+PUNCTUATION_WATCHDOG_SECONDS = float(os.getenv("PUNCTUATION_WATCHDOG_SECONDS", "1"))
+# 服务进程启动后很快（STABLE_SECONDS 内）连续退出超过该次数时不再重启，改用规则标点
+PUNCTUATION_MAX_RESTARTS = int(os.getenv("PUNCTUATION_MAX_RESTARTS", "5"))
+# 服务进程运行超过该时长后退出，不计入连续重启次数
+STABLE_SECONDS = 60
+
+Request = Tuple[int, str, List[str]]
+
+
+def collect_batch(request_queue, max_batch: int, max_wait_ms: float) -> Tuple[List[Request], bool]:
+    """
+    Block for one request, then collect more until the batch is full or the wait is over.
+
+    Returns the requests and whether the stop sentinel (None) was received.
+    """
+    first = request_queue.get()
+    if first is None:
+        return [], True
+
+    batch = [first]
+    text_count = len(first[2])
+    deadline = time.monotonic() + max_wait_ms / 1000
+    while text_count < max_batch:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            request = request_queue.get(timeout=remaining)
+        except queue.Empty:
+            break
+        if request is None:
+            return batch, True
+        batch.append(request)
+        text_count += len(request[2])
+    return batch, False
+
+
+def run_batch(restorer, batch: List[Request], response_queues: Sequence) -> None:
+    """Punctuate all texts of ``batch`` in one call and answer every request."""
+    texts = [text for _, _, request_texts in batch for text in request_texts]
+    results, error = None, None
+    if restorer is None:
+        error = "punctuation model unavailable"
+    else:
+        try:
+            results = restorer.punctuate_many(texts)
+        except Exception as e:
+            logger.warning(f"Punctuation batch of {len(texts)} texts failed: {e}")
+            error = str(e) or type(e).__name__
+
+    offset = 0
+    for client_id, request_id, request_texts in batch:
+        request_results = results[offset:offset + len(request_texts)] if results is not None else None
+        offset += len(request_texts)
+        response_queues[client_id].put((request_id, request_results, error))
+
+
+def serve(restorer, request_queue, response_queues: Sequence, max_batch: int, max_wait_ms: float) -> Dict:
+    """Serve micro-batches until the stop sentinel arrives; returns batch statistics."""
+    stats = {"batches": 0, "requests": 0, "texts": 0}
+    stopping = False
+    while not stopping:
+        batch, stopping = collect_batch(request_queue, max_batch, max_wait_ms)
+        if not batch:
+            continue
+        run_batch(restorer, batch, response_queues)
+        stats["batches"] += 1
+        stats["requests"] += len(batch)
+        stats["texts"] += sum(len(texts) for _, _, texts in batch)
+    return stats
+
+
+def _default_restorer():
+    import torch
+    from .transcribe_worker import _ZhPunctuationRestorer
+
+    return _ZhPunctuationRestorer(device="cuda" if torch.cuda.is_available() else "cpu")
+
+
+def punctuation_service_main(
+    request_queue,
+    response_queues,
+    max_batch: int,
+    max_wait_ms: float,
+    restorer_factory: Optional[Callable] = None,
+):
+    """Service process entry point: load the model once, then serve micro-batches."""
+    logging.basicConfig(level=logging.INFO, format='%(name)s - %(levelname)s - %(message)s')
+    service_logger = logging.getLogger(__name__)
+
+    try:
+        restorer = (restorer_factory or _default_restorer)()
+        service_logger.info(f"Punctuation service (pid {os.getpid()}) ready")
+    except Exception as e:
+        # 模型加载失败时仍然应答请求，调用方回退到规则标点
+        service_logger.error(f"Punctuation service failed to load the model: {e}")
+        restorer = None
+
+    stats = serve(restorer, request_queue, response_queues, max_batch, max_wait_ms)
+    if stats["batches"]:
+        service_logger.info(
+            f"Punctuation service exiting after {stats['batches']} batches "
+            f"({stats['texts'] / stats['batches']:.1f} texts per batch)"
+        )
+
+
+class PunctuationClient:
+    """Blocking client for worker processes, used in place of ``_ZhPunctuationRestorer``."""
+
+    def __init__(
+        self,
+        request_queue,
+        response_queue,
+        client_id: int,
+        timeout: float = PUNCTUATION_REQUEST_TIMEOUT,
+        generation=None,
+        poll_interval: float = PUNCTUATION_WATCHDOG_SECONDS,
+    ):
+        self.request_queue = request_queue
+        self.response_queue = response_queue
+        self.client_id = client_id
+        self.timeout = timeout
+        # 共享的服务代数（multiprocessing.Value）；与创建时不同说明服务已重启，这些队列不再有人读取
+        self.generation = generation
+        self.expected_generation = generation.value if generation is not None else None
+        self.poll_interval = poll_interval
+        self._request_ids = itertools.count()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["_request_ids"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._request_ids = itertools.count()
+
+    def punctuate(self, text: str) -> str:
+        return self.punctuate_many([text])[0]
+
+    @property
+    def stale(self) -> bool:
+        """True once the service process this client was created for has died."""
+        return self.generation is not None and self.generation.value != self.expected_generation
+
+    def punctuate_many(self, texts, **_ignored) -> List[str]:
+        if self.stale:
+            raise RuntimeError("punctuation service restarted")
+        # 请求 ID 带上进程号：同一槽位重启后的 worker 共用响应队列，旧 worker 遗留的响应会被跳过
+        request_id = f"{os.getpid()}-{next(self._request_ids)}"
+        self.request_queue.put((self.client_id, request_id, list(texts)))
+        deadline = time.monotonic() + self.timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"punctuation service did not answer within {self.timeout:.0f}s")
+            try:
+                response_id, results, error = self.response_queue.get(timeout=min(remaining, self.poll_interval))
+            except queue.Empty:
+                # 服务进程退出后请求不会再有应答，不必等到超时
+                if self.stale:
+                    raise RuntimeError("punctuation service restarted")
+                continue
+            if response_id != request_id:
+                continue
+            if error is not None:
+                raise RuntimeError(error)
+            return results
+
+
+class PunctuationService:
+    """Parent-side handle: starts the service process and hands out clients."""
+
+    def __init__(
+        self,
+        num_clients: int,
+        max_batch: int = PUNCTUATION_MAX_BATCH,
+        max_wait_ms: float = PUNCTUATION_MAX_WAIT_MS,
+        restorer_factory: Optional[Callable] = None,
+        timeout: float = PUNCTUATION_REQUEST_TIMEOUT,
+        watchdog_interval: float = PUNCTUATION_WATCHDOG_SECONDS,
+        max_restarts: int = PUNCTUATION_MAX_RESTARTS,
+    ):
+        self.num_clients = num_clients
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self.restorer_factory = restorer_factory
+        self.timeout = timeout
+        self.watchdog_interval = watchdog_interval
+        self.max_restarts = max_restarts
+        self.process: Optional[Process] = None
+        self.restarts = 0
+        self._generation = Value("i", 0)
+        self._rapid_restarts = 0
+        self._process_started_at = 0.0
+        self._stopping = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+        self._request_queue = None
+        self._response_queues: List = []
+        self._pending: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = {}
+        self._pending_lock = threading.Lock()
+        self._dispatcher: Optional[threading.Thread] = None
+        self._request_ids = itertools.count()
+
+    @property
+    def running(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    @property
+    def generation(self) -> int:
+        """Incremented each time the service process is replaced (or given up on)."""
+        return self._generation.value
+
+    def start(self):
+        """Start the service process. Safe to call more than once."""
+        if self.process is not None:
+            return
+        self._stopping.clear()
+        self._start_process()
+        self._watchdog = threading.Thread(target=self._watch, daemon=True)
+        self._watchdog.start()
+        logger.info(
+            f"Punctuation service started (pid {self.process.pid}, batch {self.max_batch}, wait {self.max_wait_ms}ms)"
+        )
+
+    def _start_process(self):
+        self._request_queue = Queue()
+        # 每个 worker 槽位一个响应队列，最后一个留给 API 进程
+        self._response_queues = [Queue() for _ in range(self.num_clients + 1)]
+        self.process = Process(
+            target=punctuation_service_main,
+            args=(self._request_queue, self._response_queues, self.max_batch, self.max_wait_ms, self.restorer_factory),
+            daemon=True,
+        )
+        self.process.start()
+        self._process_started_at = time.monotonic()
+        self._dispatcher = threading.Thread(
+            target=self._dispatch_responses, args=(self._response_queues[self.num_clients],), daemon=True
+        )
+        self._dispatcher.start()
+
+    def _watch(self):
+        # 后台线程：服务进程退出（崩溃、OOM、被杀死）时换上新进程，并让旧队列上的客户端尽快放弃
+        while not self._stopping.wait(self.watchdog_interval):
+            if self.process.is_alive():
+                continue
+            if time.monotonic() - self._process_started_at < STABLE_SECONDS:
+                self._rapid_restarts += 1
+            else:
+                self._rapid_restarts = 0
+            with self._generation.get_lock():
+                self._generation.value += 1
+            self._fail_pending("punctuation service restarted")
+            if self._rapid_restarts > self.max_restarts:
+                logger.error(
+                    f"Punctuation service exited (exit code {self.process.exitcode}) {self._rapid_restarts} times "
+                    f"in a row, not restarting; falling back to rule-based punctuation"
+                )
+                return
+            old_pid, exitcode = self.process.pid, self.process.exitcode
+            self._start_process()
+            self.restarts += 1
+            logger.warning(
+                f"Punctuation service (pid {old_pid}) exited (exit code {exitcode}), restarted as pid {self.process.pid}"
+            )
+
+    def _fail_pending(self, error: str):
+        with self._pending_lock:
+            pending = list(self._pending.values())
+        for loop, future in pending:
+            loop.call_soon_threadsafe(_resolve, future, None, error)
+
+    def client(self, slot_id: int) -> PunctuationClient:
+        """Client for the worker in pool slot ``slot_id``, valid until the service process is replaced."""
+        return PunctuationClient(
+            self._request_queue, self._response_queues[slot_id], slot_id, self.timeout,
+            generation=self._generation, poll_interval=self.watchdog_interval,
+        )
+
+    async def punctuate_many(self, texts: List[str]) -> List[str]:
+        """Punctuate ``texts`` from the API process without blocking the event loop."""
+        if not self.running:
+            raise RuntimeError("punctuation service is not running")
+        request_id = f"api-{next(self._request_ids)}"
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._pending_lock:
+            self._pending[request_id] = (loop, future)
+        try:
+            self._request_queue.put((self.num_clients, request_id, list(texts)))
+            return await asyncio.wait_for(future, self.timeout)
+        finally:
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+
+    def _dispatch_responses(self, response_queue):
+        # 后台线程：把 API 响应队列中的结果交给等待中的协程；服务进程被替换后退出
+        while True:
+            try:
+                response = response_queue.get(timeout=self.watchdog_interval)
+            except queue.Empty:
+                if response_queue is not self._response_queues[self.num_clients]:
+                    break
+                continue
+            if response is None:
+                break
+            request_id, results, error = response
+            with self._pending_lock:
+                pending = self._pending.get(request_id)
+            if pending is None:
+                continue
+            loop, future = pending
+            loop.call_soon_threadsafe(_resolve, future, results, error)
+
+    def shutdown(self, timeout: float = 5.0):
+        """Stop the service process and the response dispatcher."""
+        if self.process is None:
+            return
+        self._stopping.set()
+        self._watchdog.join(timeout=timeout)
+        try:
+            self._request_queue.put(None)
+        except Exception:
+            pass
+        self.process.join(timeout=timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+        self._response_queues[self.num_clients].put(None)
+        self._dispatcher.join(timeout=timeout)
+        self.process = None
+        logger.info("Punctuation service stopped")
+
+
+def _resolve(future: asyncio.Future, results, error):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(RuntimeError(error))
+    else:
+        future.set_result(results)
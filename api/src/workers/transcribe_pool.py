@@ -0,0 +1,371 @@
+"""Long-lived pool of Whisper transcription worker processes.
+
+Each pool slot owns one worker process that loads the default Whisper model
+once and then serves jobs from its own inbox queue; models for other tiers are
+loaded on first use and kept in a small per-worker cache. The parent keeps track of which
+process runs which task so that ``TranscriptionTask.cancel`` can still kill the
+process; a killed, crashed or retired worker is replaced automatically.
+"""
+
+from collections import OrderedDict
+from multiprocessing import Process, Queue, Manager
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from .parallel_transcribe import PARALLEL_TRANSCRIBE_MAX_JOBS
+
+logger = logging.getLogger(__name__)
+
+# 每个 worker 进程处理多少个任务后回收（防止内存碎片/泄漏长期累积）
+MAX_JOBS_PER_WORKER = int(os.getenv("WHISPER_WORKER_MAX_JOBS", "50"))
+# 每个 worker 进程同时保留的已加载模型数量（不同模型档位的请求共用 worker）
+MAX_MODELS_PER_WORKER = int(os.getenv("WHISPER_WORKER_MAX_MODELS", "2"))
+
+
+def metrics_key(task_id: str) -> str:
+    """Key under which a worker publishes live metrics (stage, RTF, ETA) in the progress dict."""
+    return f"{task_id}:metrics"
+
+
+def pool_worker_main(
+    slot_id: int,
+    job_queue: Queue,
+    result_queue: Queue,
+    progress_dict: dict,
+    max_jobs: int,
+    punctuation_client=None,
+):
+    """Worker process entry point: load the default model once, then serve jobs until told to stop.
+
+    ``punctuation_client`` connects the worker to the shared punctuation service
+    instead of loading its own zhpr model.
+    """
+    logging.basicConfig(level=logging.INFO, format='%(name)s - %(levelname)s - %(message)s')
+    worker_logger = logging.getLogger(__name__)
+
+    from .transcribe_worker import load_whisper_model, transcribe_worker
+    from ..utils.model_registry import load_model_registry
+    from ..utils.subtitle_renderer import DEFAULT_FORMATS
+
+    # 已加载的模型按 (模型, 计算类型) 缓存，超过上限时淘汰最久未使用的
+    models: "OrderedDict[tuple, object]" = OrderedDict()
+
+    def get_model(model_name: str, compute_type: Optional[str]):
+        key = (model_name, compute_type)
+        if key in models:
+            models.move_to_end(key)
+            return models[key]
+        while len(models) >= max(1, MAX_MODELS_PER_WORKER):
+            evicted, _ = models.popitem(last=False)
+            worker_logger.info(f"Pool worker {slot_id} unloading model {evicted}")
+        started = time.time()
+        models[key] = load_whisper_model(model_name, compute_type)
+        worker_logger.info(
+            f"Pool worker {slot_id} (pid {os.getpid()}) loaded model {key} in {time.time() - started:.1f}s"
+        )
+        return models[key]
+
+    try:
+        default_tier = load_model_registry().default_tier
+        get_model(default_tier.model, default_tier.default_compute_type)
+    except Exception as e:
+        # 预加载失败时在任务中再次加载，错误会作为任务结果返回
+        worker_logger.error(f"Pool worker {slot_id} failed to preload model: {e}")
+
+    jobs_done = 0
+    while max_jobs <= 0 or jobs_done < max_jobs:
+        job = job_queue.get()
+        if job is None:
+            break
+
+        model_name = job.get("model", "large-v3")
+        compute_type = job.get("compute_type")
+        try:
+            model = get_model(model_name, compute_type)
+        except Exception as e:
+            worker_logger.error(f"Pool worker {slot_id} failed to load model {model_name} ({compute_type}): {e}")
+            result_queue.put({"error": "Transcription failed.", "status": "error"})
+            jobs_done += 1
+            continue
+
+        transcribe_worker(
+            job["audio_path"],
+            job.get("language"),
+            result_queue,
+            progress_dict,
+            job["task_id"],
+            job.get("denoise", False),
+            model=model,
+            denoise_strength=job.get("denoise_strength", "medium"),
+            event_queue=result_queue,
+            parallel=job.get("parallel", False),
+            batch_size=job.get("batch_size", 0),
+            word_timestamps=job.get("word_timestamps", False),
+            model_name=model_name,
+            compute_type=compute_type,
+            output_formats=job.get("formats", DEFAULT_FORMATS),
+            punctuation_client=punctuation_client,
+            content_hash=job.get("sha256"),
+            opencc_profile=job.get("opencc_profile"),
+        )
+        jobs_done += 1
+
+    from .parallel_transcribe import shutdown_executor
+    shutdown_executor()
+    worker_logger.info(f"Pool worker {slot_id} exiting after {jobs_done} jobs")
+
+
+class _PoolSlot:
+    """Bookkeeping for one worker process and its private queues."""
+
+    def __init__(self, slot_id: int):
+        self.slot_id = slot_id
+        self.process: Optional[Process] = None
+        self.job_queue: Optional[Queue] = None
+        self.result_queue: Optional[Queue] = None
+        self.jobs_done = 0
+        self.task_id: Optional[str] = None
+        # 创建该 worker 的标点客户端时的服务代数（没有客户端时为 None）
+        self.punctuation_generation: Optional[int] = None
+
+
+class TranscribePool:
+    """A fixed-size pool of warm Whisper worker processes."""
+
+    def __init__(
+        self,
+        size: int,
+        max_jobs_per_worker: int = MAX_JOBS_PER_WORKER,
+        worker_target: Callable = pool_worker_main,
+        punctuation_service=None,
+        max_parallel_jobs: int = PARALLEL_TRANSCRIBE_MAX_JOBS,
+    ):
+        self.size = size
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.worker_target = worker_target
+        # 共享标点服务（PunctuationService）；运行中时每个 worker 通过它做 zhpr 标点
+        self.punctuation_service = punctuation_service
+        # 同时以并行模式运行的任务数上限（每个任务另外启动一组各自加载模型的切分进程）
+        self.max_parallel_jobs = max_parallel_jobs
+        self._parallel_jobs = 0
+        self.progress_dict = None
+        self._manager = None
+        self._slots: List[_PoolSlot] = []
+        self._lock = threading.Lock()
+        self._slot_available = threading.Condition(self._lock)
+        self._started = False
+
+    def start(self):
+        """Spawn the worker processes. Safe to call more than once."""
+        with self._lock:
+            if self._started:
+                return
+            self._manager = Manager()
+            self.progress_dict = self._manager.dict()
+            self._slots = [_PoolSlot(i) for i in range(self.size)]
+            for slot in self._slots:
+                self._spawn(slot)
+            self._started = True
+        logger.info(f"Transcribe pool started with {self.size} workers (recycle after {self.max_jobs_per_worker} jobs)")
+
+    def _spawn(self, slot: _PoolSlot):
+        slot.job_queue = Queue()
+        slot.result_queue = Queue()
+        slot.jobs_done = 0
+        kwargs = {}
+        slot.punctuation_generation = None
+        if self.punctuation_service is not None and self.punctuation_service.running:
+            kwargs["punctuation_client"] = self.punctuation_service.client(slot.slot_id)
+            slot.punctuation_generation = self.punctuation_service.generation
+        slot.process = Process(
+            target=self.worker_target,
+            args=(slot.slot_id, slot.job_queue, slot.result_queue, self.progress_dict, self.max_jobs_per_worker),
+            kwargs=kwargs,
+        )
+        slot.process.start()
+        logger.info(f"Spawned pool worker {slot.slot_id} (pid {slot.process.pid})")
+
+    def _acquire_slot(self, task_id: str) -> _PoolSlot:
+        with self._slot_available:
+            while True:
+                slot = next((slot for slot in self._slots if slot.task_id is None), None)
+                if slot is not None:
+                    break
+                self._slot_available.wait()
+            # 先占住槽位，替换进程时其他任务不会选中它；join/启动进程在锁外进行
+            slot.task_id = task_id
+            if not slot.process.is_alive():
+                # 空闲时退出的 worker（OOM、被外部杀死）在分派任务前替换，避免任务直接失败
+                logger.warning(
+                    f"Idle pool worker {slot.slot_id} exited (exit code {slot.process.exitcode}), respawning"
+                )
+                replace, stop = True, False
+            elif self._has_stale_punctuation_client(slot):
+                # 标点服务重启后旧客户端的队列已无人读取，换一个连接新服务的 worker
+                logger.info(f"Punctuation service restarted, respawning idle pool worker {slot.slot_id}")
+                replace, stop = True, True
+            else:
+                replace = False
+        if replace:
+            try:
+                self._replace_worker(slot, stop=stop)
+            except BaseException:
+                self._free_slot(slot)
+                raise
+        return slot
+
+    def _has_stale_punctuation_client(self, slot: _PoolSlot) -> bool:
+        service = self.punctuation_service
+        return (
+            service is not None
+            and service.running
+            and slot.punctuation_generation != service.generation
+        )
+
+    def _replace_worker(self, slot: _PoolSlot, stop: bool):
+        """Replace the worker of a slot taken out of rotation.
+
+        Called without holding the lock: waiting for the old process and
+        spawning the new one can take seconds. ``stop`` asks a live worker to
+        exit first; a worker that does not exit in time is terminated.
+        """
+        if stop:
+            slot.job_queue.put(None)
+        if stop or slot.process.is_alive():
+            slot.process.join(timeout=5)
+            if slot.process.is_alive():
+                slot.process.terminate()
+        self._spawn(slot)
+        with self._lock:
+            stopped = not self._started
+        if stopped:
+            # 替换期间进程池已关闭，新进程不会再被 shutdown 回收
+            slot.process.terminate()
+
+    def _free_slot(self, slot: _PoolSlot):
+        with self._slot_available:
+            slot.task_id = None
+            self._slot_available.notify()
+
+    def _release_slot(self, slot: _PoolSlot):
+        with self._lock:
+            if not slot.process.is_alive():
+                logger.warning(
+                    f"Pool worker {slot.slot_id} exited (exit code {slot.process.exitcode}) while running task {slot.task_id}, respawning"
+                )
+                replace = True
+            elif self.max_jobs_per_worker > 0 and slot.jobs_done >= self.max_jobs_per_worker:
+                # 工作进程达到任务上限后会自行退出，这里等待并替换
+                logger.info(f"Recycling pool worker {slot.slot_id} after {slot.jobs_done} jobs")
+                replace = True
+            else:
+                replace = False
+        try:
+            if replace:
+                # 槽位仍被占用，替换完成后才放回轮转
+                self._replace_worker(slot, stop=False)
+        finally:
+            self._free_slot(slot)
+
+    def run(
+        self,
+        task_id: str,
+        job: Dict,
+        on_dispatch: Optional[Callable[[Process], None]] = None,
+        poll_interval: float = 0.5,
+        on_event: Optional[Callable[[Dict], None]] = None,
+        is_cancelled: Optional[Callable[[], bool]] = None,
+    ) -> Optional[Dict]:
+        """Run one job on an idle worker and block until it finishes.
+
+        Streaming events (dicts with an ``"event"`` key) sent by the worker
+        while it runs are passed to ``on_event``. ``is_cancelled`` is checked
+        once a worker has been acquired; a job cancelled by then is never sent.
+        A ``parallel`` job beyond ``max_parallel_jobs`` runs sequentially.
+
+        Returns the worker's result dict, or None if the job was cancelled or
+        the worker died before producing one (cancelled or crashed).
+        """
+        self.start()
+        slot = self._acquire_slot(task_id)
+        parallel = False
+        try:
+            self.progress_dict[task_id] = 0
+            if on_dispatch:
+                on_dispatch(slot.process)
+            # 在 on_dispatch 之后检查：此后的取消会直接终止该 worker 进程
+            if is_cancelled is not None and is_cancelled():
+                logger.info(f"Task {task_id} was cancelled before dispatch, not sending it to worker {slot.slot_id}")
+                return None
+            if job.get("parallel"):
+                with self._lock:
+                    parallel = self._parallel_jobs < self.max_parallel_jobs
+                    if parallel:
+                        self._parallel_jobs += 1
+                if not parallel:
+                    logger.info(
+                        f"{self.max_parallel_jobs} parallel transcription job(s) already running, "
+                        f"transcribing task {task_id} sequentially"
+                    )
+                    job = dict(job, parallel=False)
+            slot.job_queue.put(dict(job, task_id=task_id))
+
+            # 和之前的 monitor 一样尽早读取结果，避免大结果阻塞子进程的 Queue.put()
+            while True:
+                try:
+                    result = slot.result_queue.get(timeout=poll_interval)
+                except queue.Empty:
+                    if not slot.process.is_alive():
+                        result = None
+                        break
+                    continue
+                if isinstance(result, dict) and "event" in result:
+                    if on_event:
+                        on_event(result)
+                    continue
+                break
+            slot.jobs_done += 1
+            return result
+        finally:
+            if parallel:
+                with self._lock:
+                    self._parallel_jobs -= 1
+            self._release_slot(slot)
+
+    def get_progress(self, task_id: str, default: int = 0) -> int:
+        if self.progress_dict is None:
+            return default
+        return self.progress_dict.get(task_id, default)
+
+    def get_metrics(self, task_id: str) -> Dict:
+        if self.progress_dict is None:
+            return {}
+        return dict(self.progress_dict.get(metrics_key(task_id)) or {})
+
+    def discard_progress(self, task_id: str):
+        if self.progress_dict is not None:
+            self.progress_dict.pop(task_id, None)
+            self.progress_dict.pop(metrics_key(task_id), None)
+
+    def shutdown(self, timeout: float = 5.0):
+        """Stop all workers and the shared manager."""
+        with self._lock:
+            if not self._started:
+                return
+            for slot in self._slots:
+                try:
+                    slot.job_queue.put(None)
+                except Exception:
+                    pass
+            for slot in self._slots:
+                slot.process.join(timeout=timeout)
+                if slot.process.is_alive():
+                    slot.process.terminate()
+            if self._manager is not None:
+                self._manager.shutdown()
+            self._started = False
+        logger.info("Transcribe pool stopped")
@@ -1,27 +1,68 @@
 from multiprocessing import Queue
 import os
+import queue
+import threading
+import time
+import numpy as np
 import torch
-from faster_whisper import WhisperModel
+from faster_whisper import WhisperModel, BatchedInferencePipeline
 import logging
 
-from ..utils.text_conversion import convert_to_traditional_chinese
-from ..utils.audio_processing import denoise_audio
+from ..utils.text_conversion import DEFAULT_PROFILE, convert_many_to_traditional_chinese
+from ..utils.audio_cache import decode_cached_audio, get_or_create_audio
+from ..utils.audio_processing import DENOISE_ENGINE, denoise_audio, denoise_audio_to_array, denoise_samples
+from ..utils.punctuation_alignment import distribute_punctuation_to_segments
+from ..utils.punctuation_rules import add_chinese_punctuation, clean_punctuation_combinations
+from ..utils.segment_store import SegmentStore
+from ..utils.spectral_gate import spectral_gate
+from ..utils.subtitle_renderer import DEFAULT_FORMATS, render_subtitles
+from .transcribe_pool import metrics_key
+from .parallel_transcribe import shutdown_executor, transcribe_parallel
 
 # 设置日志配置
 logger = logging.getLogger(__name__)
 
+# zhpr 标点推理：每次前向的窗口数。默认（ZHPR_PAD_TO_WINDOW=1）沿用 zhpr 原始做法，所有窗口补齐到
+# window_size 且不传 attention mask，与旧版逐段落结果逐位一致；设为 0 时改为按批内最长窗口补齐并传
+# attention mask，计算更少，但不足一个窗口的文本标点可能与旧版不同
+ZHPR_BATCH_SIZE = int(os.getenv("ZHPR_BATCH_SIZE", "32"))
+ZHPR_PAD_TO_WINDOW = os.getenv("ZHPR_PAD_TO_WINDOW", "1") == "1"
+# 转录过程中累积多少个段落后一起做标点推理（越大批次越满）
+ZHPR_PARAGRAPH_BATCH = int(os.getenv("ZHPR_PARAGRAPH_BATCH", "8"))
+# 段落在标点缓冲中最多等待的秒数：解码停顿这么久，或最早的段落已等待这么久时，不等凑满批次就先处理，
+# 限制流式 punctuated 事件的延迟
+ZHPR_FLUSH_SECONDS = float(os.getenv("ZHPR_FLUSH_SECONDS", "1.0"))
+# zhpr 模型的 CPU 推理后端：fp32（原始模型）、int8（Linear 层动态量化）、torchscript（trace 后 freeze）
+ZHPR_BACKENDS = ("fp32", "int8", "torchscript")
+ZHPR_BACKEND = os.getenv("ZHPR_BACKEND", "fp32")
+# zhpr 推理使用的 intra-op 线程数，0 表示沿用 torch 默认值
+ZHPR_NUM_THREADS = int(os.getenv("ZHPR_NUM_THREADS", "0"))
+# 降噪时由 ffmpeg 一次完成降噪与重采样（16 kHz 单声道 float32），经管道读入内存直接交给 Whisper；
+# 设为 0 时沿用旧方式：写出全采样率的临时 WAV，再由 faster-whisper 重新解码
+DENOISE_IN_MEMORY = os.getenv("DENOISE_IN_MEMORY", "1") == "1"
+# 传入内容哈希时先将音频解码为内存映射的 .npy 缓存（见 audio_cache），降噪、VAD、语种检测与转录都读取它
+DECODED_AUDIO_CACHE = os.getenv("DECODED_AUDIO_CACHE", "1") == "1"
+
 # Optional zh punctuation restoration (zhpr)
 _ZHPR_AVAILABLE = True
 try:
     # Avoid importing heavy modules unless needed
-    from zhpr.predict import DocumentDataset, merge_stride, decode_pred  # type: ignore
+    from zhpr.predict import merge_stride, decode_pred  # type: ignore
     from transformers import AutoModelForTokenClassification, AutoTokenizer  # type: ignore
-    from torch.utils.data import DataLoader  # type: ignore
     logger.info("zhpr modules loaded successfully - Chinese punctuation restoration available")
 except Exception as e:
     _ZHPR_AVAILABLE = False
     logger.warning(f"zhpr modules not available - falling back to basic punctuation rules: {e}")
 
+def default_compute_type() -> str:
+    """当前设备的默认计算类型（GPU 使用 float16，CPU 使用 int8）"""
+    return "float16" if torch.cuda.is_available() else "int8"
+
+def load_whisper_model(model_name: str = "large-v3", compute_type: str = None, **model_kwargs):
+    """根据当前设备加载 Whisper 模型；未指定 ``compute_type`` 时使用设备默认值"""
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    return WhisperModel(model_name, device=device, compute_type=compute_type or default_compute_type(), **model_kwargs)
+
 def format_timestamp(seconds: float) -> str:
     """将秒数格式化为 SRT 格式的时间字符串（hh:mm:ss,mmm）"""
     hours = int(seconds // 3600)
@@ -30,236 +71,133 @@ def format_timestamp(seconds: float) -> str:
     milliseconds = int((seconds - int(seconds)) * 1000)
     return f"{hours:02}:{minutes:02}:{secs:02},{milliseconds:03}"
 
+def paragraph_ranges(starts, ends, lengths, max_gap_seconds=2.0, max_paragraph_segments=10, max_paragraph_chars=500):
+    """用 NumPy 計算段落邊界，返回每個段落的 segment 索引區間
+
+    與逐個 segment 累積的分組結果一致：新段落在時間間隔超過 max_gap_seconds、
+    或加入後超過段落 segment 數／字符數上限時開始。
+
+    starts / ends 為各 segment 的起止時間，lengths 為去除首尾空白後的字符數。
+    """
+    starts = np.asarray(starts, dtype=np.float64)
+    ends = np.asarray(ends, dtype=np.float64)
+    count = len(starts)
+    if count == 0:
+        return []
+    positions = np.arange(count)
+
+    # 與上一個 segment 的間隔超過上限的位置必定開始新段落；next_gap[i] 為 i 之後第一個這樣的位置
+    gap_breaks = np.flatnonzero(starts[1:] - ends[:-1] > max_gap_seconds) + 1
+    next_gap = np.append(gap_breaks, count)[np.searchsorted(gap_breaks, positions, side="right")]
+
+    # 從 i 開始的段落，字符數不超過上限時最多延伸到 char_end[i]（不含）
+    cumulative = np.concatenate(([0], np.cumsum(np.asarray(lengths, dtype=np.int64))))
+    char_end = np.searchsorted(cumulative, cumulative[:-1] + max_paragraph_chars, side="right") - 1
+
+    # 每個段落至少包含第一個 segment
+    paragraph_end = np.minimum(np.minimum(next_gap, positions + max_paragraph_segments), char_end)
+    paragraph_end = np.maximum(paragraph_end, positions + 1).tolist()
+
+    ranges = []
+    start = 0
+    while start < count:
+        end = paragraph_end[start]
+        ranges.append(range(start, end))
+        start = end
+    return ranges
+
+
 def group_segments_into_paragraphs(segments_list, max_gap_seconds=2.0, max_paragraph_segments=10, max_paragraph_chars=500):
     """將 segments 按時間間隔分組成段落，限制段落大小以避免內存和處理問題"""
-    if not segments_list:
-        return []
-    
-    paragraphs = []
-    current_paragraph = [segments_list[0]]
-    current_char_count = len(segments_list[0].text.strip())
-    
-    for i in range(1, len(segments_list)):
-        prev_segment = segments_list[i-1]
-        current_segment = segments_list[i]
-        segment_text = current_segment.text.strip()
-        
-        # 檢查是否需要開始新段落的條件
-        gap = current_segment.start - prev_segment.end
-        would_exceed_segments = len(current_paragraph) >= max_paragraph_segments
-        would_exceed_chars = current_char_count + len(segment_text) > max_paragraph_chars
-        has_time_gap = gap > max_gap_seconds
-        
-        if has_time_gap or would_exceed_segments or would_exceed_chars:
-            paragraphs.append(current_paragraph)
-            current_paragraph = [current_segment]
-            current_char_count = len(segment_text)
-        else:
-            current_paragraph.append(current_segment)
-            current_char_count += len(segment_text)
-    
-    # 添加最後一個段落
-    if current_paragraph:
-        paragraphs.append(current_paragraph)
-    
-    return paragraphs
-
-def process_paragraph_punctuation(paragraph_segments, zh_restorer, detected_language, worker_logger):
-    """處理整個段落的標點符號，返回處理後的段落文本和每個segment的文本"""
+    segments_list = list(segments_list)
+    ranges = paragraph_ranges(
+        [segment.start for segment in segments_list],
+        [segment.end for segment in segments_list],
+        [len(segment.text.strip()) for segment in segments_list],
+        max_gap_seconds, max_paragraph_segments, max_paragraph_chars,
+    )
+    return [segments_list[paragraph.start:paragraph.stop] for paragraph in ranges]
+
+def process_paragraph_punctuation(segment_texts, zh_restorer, detected_language, worker_logger):
+    """處理整個段落的標點符號，返回每個segment處理後的文本"""
+    return process_paragraphs_punctuation([segment_texts], zh_restorer, detected_language, worker_logger)[0]
+
+def process_paragraphs_punctuation(segment_texts_list, zh_restorer, detected_language, worker_logger):
+    """一次處理多個段落（每個段落為其 segment 文本列表）的標點符號，zhpr 模型對所有段落的窗口做批量推理；
+    返回每個段落的 segment 文本列表"""
     # 組合段落文本
-    paragraph_text = ""
-    segment_texts = []
-    
-    for segment in paragraph_segments:
-        clean_text = segment.text.strip()
-        segment_texts.append(clean_text)
-        paragraph_text += clean_text
-    
-    # 處理標點符號
-    if detected_language == 'zh':
-        if zh_restorer is not None:
-            try:
-                punctuated_paragraph = zh_restorer.punctuate(paragraph_text)
-                worker_logger.info(f"Applied zhpr punctuation to paragraph: '{paragraph_text[:50]}...' -> '{punctuated_paragraph[:50]}...'")
-                distributed_result = distribute_punctuation_to_segments(segment_texts, paragraph_text, punctuated_paragraph)
-                worker_logger.info(f"Distributed result: {distributed_result[:3]}...")  # Show first 3 segments
-                return distributed_result
-            except Exception as e:
-                worker_logger.warning(f"zhpr punctuate failed for paragraph, falling back to rules: {e}")
-                # 逐句處理作為後備方案
-                result = []
-                for segment_text in segment_texts:
-                    result.append(add_chinese_punctuation(segment_text, detected_language))
-                return result
-        else:
-            # 使用規則處理整個段落
-            punctuated_paragraph = add_chinese_punctuation(paragraph_text, detected_language)
-            return distribute_punctuation_to_segments(segment_texts, paragraph_text, punctuated_paragraph)
-    
+    paragraph_texts = ["".join(segment_texts) for segment_texts in segment_texts_list]
+
     # 非中文直接返回原文本
-    return segment_texts
-
-def distribute_punctuation_to_segments(original_segments, original_paragraph, punctuated_paragraph):
-    """將標點符號處理後的段落文本重新分配給原始segments"""
-    import re
-    
-    # 如果標點符號處理失敗或沒有變化，直接返回原文本
-    if not punctuated_paragraph or punctuated_paragraph == original_paragraph:
-        return original_segments
-    
-    # 移除原始段落中的所有空格來匹配
-    clean_punctuated = punctuated_paragraph.replace(' ', '')
-
-    def _preserve_length_placeholder(match):
-        return ' ' * len(match.group(0))
-
-    # 用空格佔位保留特殊 token 長度，避免破壞索引對齊
-    clean_punctuated = re.sub(r'\[(UNK|PAD|CLS|SEP|MASK)\]', _preserve_length_placeholder, clean_punctuated)
-
-    result = []
-    punctuated_index = 0
-
-    # 定義標點符號集合
-    PUNCTUATION = '，。！？；：、（）【】""''…—'
-    # 向前看的最大字符數（用於重新對齊）
-    LOOKAHEAD = 3
-
-    for segment_text in original_segments:
-        clean_segment = segment_text.replace(' ', '')
-        segment_result = ""
-
-        # 查找這個segment在標點文本中的對應位置
-        if punctuated_index < len(clean_punctuated):
-            # 逐字符匹配並收集標點符號
-            char_index = 0
-            while char_index < len(clean_segment) and punctuated_index < len(clean_punctuated):
-                orig_char = clean_segment[char_index]
-                punct_char = clean_punctuated[punctuated_index]
-
-                if orig_char == punct_char:
-                    # 字符匹配，添加到結果
-                    segment_result += punct_char
-                    char_index += 1
-                    punctuated_index += 1
-                elif punct_char in PUNCTUATION:
-                    # 遇到標點符號，添加到結果但不增加原文索引
-                    segment_result += punct_char
-                    punctuated_index += 1
-                elif punct_char == ' ':
-                    # 佔位符 - 跳過但保留索引位置
-                    punctuated_index += 1
-                else:
-                    # 不匹配 - 嘗試向前看以重新對齊
-                    realigned = False
-                    for look_ahead in range(1, LOOKAHEAD + 1):
-                        if punctuated_index + look_ahead < len(clean_punctuated):
-                            future_punct_char = clean_punctuated[punctuated_index + look_ahead]
-                            if future_punct_char == orig_char:
-                                # 找到對齊點 - 跳過中間的標點符號
-                                for skip_idx in range(look_ahead):
-                                    skip_char = clean_punctuated[punctuated_index + skip_idx]
-                                    if skip_char in PUNCTUATION:
-                                        segment_result += skip_char
-                                punctuated_index += look_ahead
-                                realigned = True
-                                break
-
-                    if not realigned:
-                        # 無法重新對齊 - 保留原文字符，跳過標點文本
-                        segment_result += orig_char
-                        char_index += 1
-                        punctuated_index += 1
-
-            # 處理原文剩餘的字符
-            while char_index < len(clean_segment):
-                segment_result += clean_segment[char_index]
-                char_index += 1
-
-            # 如果這是段落的最後一個segment，檢查是否有剩餘的標點符號
-            if segment_text == original_segments[-1]:
-                while punctuated_index < len(clean_punctuated):
-                    remaining_char = clean_punctuated[punctuated_index]
-                    if remaining_char in PUNCTUATION:
-                        segment_result += remaining_char
-                    punctuated_index += 1
-
-        # 如果沒有找到匹配，使用原文本
-        if not segment_result:
-            segment_result = segment_text
+    if detected_language != 'zh':
+        return segment_texts_list
+
+    if zh_restorer is None:
+        # 使用規則處理整個段落
+        return [
+            distribute_punctuation_to_segments(
+                segment_texts, paragraph_text, add_chinese_punctuation(paragraph_text, detected_language)
+            )
+            for segment_texts, paragraph_text in zip(segment_texts_list, paragraph_texts)
+        ]
+
+    try:
+        punctuated_paragraphs = zh_restorer.punctuate_many(paragraph_texts)
+    except Exception as e:
+        worker_logger.warning(f"zhpr punctuate failed for {len(paragraph_texts)} paragraphs, falling back to rules: {e}")
+        # 逐句處理作為後備方案
+        return [
+            [add_chinese_punctuation(segment_text, detected_language) for segment_text in segment_texts]
+            for segment_texts in segment_texts_list
+        ]
+
+    worker_logger.info(f"Applied zhpr punctuation to {len(paragraph_texts)} paragraphs ({sum(map(len, paragraph_texts))} chars)")
+    results = []
+    for segment_texts, paragraph_text, punctuated_paragraph in zip(segment_texts_list, paragraph_texts, punctuated_paragraphs):
+        worker_logger.debug(f"zhpr paragraph: '{paragraph_text[:50]}...' -> '{punctuated_paragraph[:50]}...'")
+        results.append(distribute_punctuation_to_segments(segment_texts, paragraph_text, punctuated_paragraph))
+    return results
+
+class _TokenClassifierLogits(torch.nn.Module):
+    """Wrap a token classification model so it maps (input_ids, attention_mask) to logits."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask)["logits"]
+
+
+def build_punctuation_forward(model, backend: str = "fp32", device: str = "cpu"):
+    """Prepare ``model`` for inference with the given backend.
+
+    Returns a module called as ``forward(input_ids, attention_mask)`` that
+    returns the token classification logits.
+
+    * ``fp32`` runs the model unchanged.
+    * ``int8`` applies dynamic int8 quantization to the Linear layers (CPU only).
+    * ``torchscript`` traces and freezes the model. The trace uses a partially
+      masked example batch so the padded-attention branch is recorded, and it
+      accepts any batch size and sequence length up to the model's maximum.
+    """
+    if backend not in ZHPR_BACKENDS:
+        raise ValueError(f"Unsupported zhpr backend '{backend}'. Allowed backends: {', '.join(ZHPR_BACKENDS)}")
+    model.eval()
+    if backend == "int8":
+        if device == "cuda":
+            logger.warning("zhpr int8 backend is CPU only, using fp32 on cuda")
         else:
-            # 驗證：移除標點後應該與原文相同
-            stripped_result = re.sub(f'[{re.escape(PUNCTUATION)}]', '', segment_result)
-            stripped_result = stripped_result.replace(' ', '')
-            if stripped_result != clean_segment:
-                # segment 級別的回退 - 只回退這一個 segment
-                segment_result = segment_text
-
-        result.append(segment_result)
-    
-    return result
-
-def add_chinese_punctuation(text: str, language: str) -> str:
-    """为中文文本添加基本标点符号 - 简化版本"""
-    if not text or language not in ['zh', 'chinese']:
-        return text
-    
-    import re
-    
-    # 移除多余空格
-    text = re.sub(r'\s+', '', text.strip())
-    
-    # 如果文本已经有足够的标点符号，直接返回
-    punctuation_count = len(re.findall(r'[。！？，、；：]', text))
-    text_length = len(text)
-    if punctuation_count > 0 and (punctuation_count / text_length) > 0.02:
-        return clean_punctuation_combinations(text)
-    
-    # 简单的规则：只在明确的语言标记处添加标点
-    # 疑问词后加问号
-    text = re.sub(r'(什么|为什么|怎么|哪里|哪儿|谁|何时|如何|是否|吗|呢)(?![。！？，、；：])', r'\1？', text)
-    
-    # 语气词后加逗号（但不在句子末尾，且只在句子开头）
-    text = re.sub(r'^(那|这)(?=.{5,})(?![。！？，、；：])', r'\1，', text)
-    
-    # 连接词前加逗号（在句子中间）
-    text = re.sub(r'(.{3,})(所以|因为|如果|就是|也就是说)(?=.{3,})(?![。！？，、；：])', r'\1，\2', text)
-    
-    # 转折词前加逗号
-    text = re.sub(r'(.{3,})(但是|不过|然而|可是|而且|另外|同时|接着|然后)(?![。！？，、；：])', r'\1，\2', text)
-    
-    # 在句子结尾添加句号（如果没有其他标点）
-    if not re.search(r'[。！？]$', text):
-        text += '。'
-    
-    # 清理不合理的标点符号组合
-    text = clean_punctuation_combinations(text)
-    
-    return text
-
-
-def clean_punctuation_combinations(text: str) -> str:
-    """清理不合理的标点符号组合"""
-    import re
-    
-    # 清理连续的标点符号组合
-    text = re.sub(r'，。', '。', text)  # 逗号后跟句号 -> 句号
-    text = re.sub(r'。，', '。', text)  # 句号后跟逗号 -> 句号
-    text = re.sub(r'，，+', '，', text)  # 多个逗号 -> 单个逗号
-    text = re.sub(r'。。+', '。', text)  # 多个句号 -> 单个句号
-    
-    # 清理短语后不合理的标点符号
-    text = re.sub(r'(会|也会|可能会|应该|就是|这样|那个)。(?=.)', r'\1，', text)  # 短语后的句号改为逗号
-    
-    # 移除句子开头的逗号
-    text = re.sub(r'^，', '', text)
-    
-    # 移除句子结尾多余的逗号
-    text = re.sub(r'，$', '。', text)
-    
-    # 清理连接词后的重复逗号
-    text = re.sub(r'(然后|但是|而且|所以)，，', r'\1，', text)
-    
-    return text
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    forward = _TokenClassifierLogits(model).eval()
+    if backend == "torchscript":
+        example_ids = torch.full((2, 8), model.config.pad_token_id or 0, dtype=torch.long, device=device)
+        example_mask = torch.ones_like(example_ids)
+        example_mask[1, 4:] = 0
+        with torch.no_grad():
+            forward = torch.jit.freeze(torch.jit.trace(forward, (example_ids, example_mask), check_trace=False))
+    return forward
 
 
 class _ZhPunctuationRestorer:
@@ -267,62 +205,218 @@ class _ZhPunctuationRestorer:
 
     Loads the pretrained model 'p208p2002/zh-wiki-punctuation-restore' and
     restores punctuation for a given Chinese text. If model loading fails,
-    callers should catch exceptions and fall back.
+    callers should catch exceptions and fall back. ``backend`` selects one of
+    ``ZHPR_BACKENDS`` (see ``build_punctuation_forward``).
     """
 
-    def __init__(self, device: str = "cpu") -> None:
+    def __init__(self, device: str = "cpu", backend: str = None, model=None, tokenizer=None) -> None:
         self.device = device
+        self.backend = backend or ZHPR_BACKEND
         self.model_name = "p208p2002/zh-wiki-punctuation-restore"
-        self.model = AutoModelForTokenClassification.from_pretrained(self.model_name)
-        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        self.model = model if model is not None else AutoModelForTokenClassification.from_pretrained(self.model_name)
+        self.tokenizer = tokenizer if tokenizer is not None else AutoTokenizer.from_pretrained(self.model_name)
         if self.device == "cuda":
             self.model.to("cuda")
+        if ZHPR_NUM_THREADS > 0:
+            torch.set_num_threads(ZHPR_NUM_THREADS)
+        self.id2label = self.model.config.id2label
+        self.forward = build_punctuation_forward(self.model, self.backend, self.device)
+        logger.info(f"zhpr punctuation model ready (backend {self.backend}, {torch.get_num_threads()} threads)")
 
     def punctuate(self, text: str, window_size: int = 256, step: int = 200) -> str:
-        if not text:
-            return text
-        dataset = DocumentDataset(text, window_size=window_size, step=step)
-        dataloader = DataLoader(dataset=dataset, shuffle=False, batch_size=4)
+        return self.punctuate_many([text], window_size=window_size, step=step)[0]
+
+    def punctuate_many(self, texts, window_size: int = 256, step: int = 200, batch_size: int = None):
+        """Restore punctuation for several texts with batched inference.
+
+        Every text is cut into the same character windows as zhpr's
+        ``DocumentDataset``. Windows from all texts are sorted by length and run
+        in batches. By default every window is padded to ``window_size`` without
+        an attention mask, exactly like zhpr, so the output matches punctuating
+        each text on its own. With ``ZHPR_PAD_TO_WINDOW=0`` batches are padded
+        only to their longest window and masked, which is faster but can change
+        predictions on windows shorter than ``window_size``. Per-window
+        predictions are then merged back per text with zhpr's ``merge_stride``.
+        """
+        batch_size = batch_size or ZHPR_BATCH_SIZE
+        windows = []  # (text index, window tokens)
+        for text_index, text in enumerate(texts):
+            chars = list(text or "")
+            for window_start in range(0, len(chars), step):
+                windows.append((text_index, chars[window_start:window_start + window_size]))
+
+        # 按长度排序后分批，同一批内的窗口长度接近，补齐浪费最少
+        order = sorted(range(len(windows)), key=lambda i: len(windows[i][1]))
+        window_preds = [None] * len(windows)
+        pad_id = self.tokenizer.pad_token_id
+        with torch.inference_mode():
+            for batch_start in range(0, len(order), batch_size):
+                batch_indices = order[batch_start:batch_start + batch_size]
+                batch_ids = [self.tokenizer.convert_tokens_to_ids(windows[i][1]) for i in batch_indices]
+                padded_length = window_size if ZHPR_PAD_TO_WINDOW else max(len(ids) for ids in batch_ids)
+
+                input_ids = torch.full((len(batch_ids), padded_length), pad_id, dtype=torch.long)
+                attention_mask = torch.zeros((len(batch_ids), padded_length), dtype=torch.long)
+                for row, ids in enumerate(batch_ids):
+                    input_ids[row, :len(ids)] = torch.tensor(ids, dtype=torch.long)
+                    attention_mask[row, :len(ids)] = 1
+                if ZHPR_PAD_TO_WINDOW:
+                    # 舊版不傳 mask，等同於全 1 的 mask
+                    attention_mask.fill_(1)
+
+                logits = self.forward(input_ids.to(self.device), attention_mask.to(self.device))
+                predicted = logits.argmax(-1).tolist()
+
+                for row, window_index in enumerate(batch_indices):
+                    window_preds[window_index] = self._label_window(batch_ids[row], predicted[row])
+
+        per_text = [[] for _ in texts]
+        for (text_index, _), preds in zip(windows, window_preds):
+            per_text[text_index].append(preds)
+        return [
+            "".join(decode_pred(merge_stride(preds, step))) if preds else (text or "")
+            for text, preds in zip(texts, per_text)
+        ]
+
+    def _label_window(self, ids, predicted_ids):
+        """Pair each token of a window with its predicted label, dropping padding (as zhpr does)."""
+        try:
+            pad_start = ids.index(self.tokenizer.pad_token_id)
+        except ValueError:
+            pad_start = len(ids)
+        tokens = self.tokenizer.convert_ids_to_tokens(ids[:pad_start])
+        return [(token, self.id2label[label_id]) for token, label_id in zip(tokens, predicted_ids[:pad_start])]
+
+# 各階段在整體進度中的權重：降噪 0-10%，解碼（含段落標點）至 90%，生成輸出 90-100%
+DENOISE_PROGRESS_END = 10
+DECODE_PROGRESS_END = 90
+
+class _ProgressReporter:
+    """按已解碼的音頻時長計算整體進度，並發布即時的實時率（RTF）與預計剩餘時間"""
+
+    def __init__(self, progress_dict, task_id: str):
+        self.progress_dict = progress_dict
+        self.task_id = task_id
+        self.decode_start_progress = 0
+        self.decode_started_at = None
+        self.audio_duration = None
+        self.metrics = {}
+
+    def set(self, progress: int, stage: str, **metrics):
+        """更新進度與階段；未傳入的指標沿用上一次的值"""
+        # 進度只增不減，避免估算抖動造成進度條倒退
+        try:
+            current = self.progress_dict.get(self.task_id, 0)
+        except Exception:
+            current = 0
+        self.progress_dict[self.task_id] = max(current, int(progress))
+        self.metrics.update(metrics, stage=stage)
+        self.progress_dict[metrics_key(self.task_id)] = dict(self.metrics)
+
+    def start_decoding(self, audio_duration, started_at: float = None):
+        """``started_at`` 為調用 transcribe() 的時間，使 RTF 包含 VAD 與語言檢測的耗時"""
+        self.decode_start_progress = self.progress_dict.get(self.task_id, 0)
+        self.decode_started_at = started_at if started_at is not None else time.monotonic()
+        self.audio_duration = audio_duration or None
+        self.set(self.decode_start_progress, "decoding", audio_duration=self.audio_duration)
+
+    def decoded(self, decoded_seconds: float):
+        """解碼到 ``decoded_seconds`` 時更新進度、RTF 與 ETA"""
+        if not self.audio_duration or self.decode_started_at is None:
+            return
+        elapsed = time.monotonic() - self.decode_started_at
+        fraction = min(1.0, max(0.0, decoded_seconds / self.audio_duration))
+        span = DECODE_PROGRESS_END - self.decode_start_progress
+        metrics = {
+            "audio_duration": self.audio_duration,
+            "decoded_seconds": round(decoded_seconds, 2),
+            "elapsed_seconds": round(elapsed, 2),
+            "rtf": None,
+            "eta_seconds": None,
+        }
+        if decoded_seconds > 0:
+            rtf = elapsed / decoded_seconds
+            metrics["rtf"] = round(rtf, 3)
+            metrics["eta_seconds"] = round(max(0.0, self.audio_duration - decoded_seconds) * rtf, 1)
+        self.set(self.decode_start_progress + span * fraction, "decoding", **metrics)
+
+    def finish_decoding(self):
+        metrics = {"audio_duration": self.audio_duration}
+        if self.decode_started_at is not None:
+            elapsed = time.monotonic() - self.decode_started_at
+            metrics["elapsed_seconds"] = round(elapsed, 2)
+            if self.audio_duration:
+                metrics["rtf"] = round(elapsed / self.audio_duration, 3)
+        self.set(DECODE_PROGRESS_END, "rendering", eta_seconds=0, **metrics)
+
+def _emit_event(event_queue, event: str, **data):
+    """向流式事件队列发送一条事件（未启用流式输出时忽略）"""
+    if event_queue is not None:
+        event_queue.put({"event": event, **data})
+
+_ITERATION_DONE = object()
+
+def iterate_with_idle_callback(items, idle_seconds: float, on_idle):
+    """在背景執行緒中消費 items 並逐個產出；連續 idle_seconds 沒有新元素時在當前執行緒調用 on_idle()。
+
+    生成器的異常在當前執行緒重新拋出；提前停止迭代時背景執行緒最多再取一個元素後退出。
+    """
+    buffer = queue.Queue(maxsize=1)
+    stopped = threading.Event()
 
-        self.model.eval()
-        model_pred_out = []
-        with torch.no_grad():
-            for batch in dataloader:
-                if self.device == "cuda":
-                    batch = batch.to("cuda")
-                batch_out = self._predict_step(batch)
-                for out in batch_out:
-                    model_pred_out.append(out)
-
-        merged = merge_stride(model_pred_out, step)
-        decoded = decode_pred(merged)
-        return "".join(decoded)
-
-    def _predict_step(self, batch):
-        batch_out = []
-        batch_input_ids = batch
-        encodings = {"input_ids": batch_input_ids}
-        output = self.model(**encodings)
-        predicted_token_class_id_batch = output["logits"].argmax(-1)
-        for predicted_token_class_ids, input_ids in zip(
-            predicted_token_class_id_batch, batch_input_ids
-        ):
-            out = []
-            tokens = self.tokenizer.convert_ids_to_tokens(input_ids)
-            input_ids_list = input_ids.tolist()
+    def put(entry):
+        while not stopped.is_set():
             try:
-                pad_start = input_ids_list.index(self.tokenizer.pad_token_id)
-            except Exception:
-                pad_start = len(input_ids_list)
-            tokens = tokens[:pad_start]
-            predicted_tokens_classes = [
-                self.model.config.id2label[t.item()] for t in predicted_token_class_ids
-            ]
-            predicted_tokens_classes = predicted_tokens_classes[:pad_start]
-            for token, ner in zip(tokens, predicted_tokens_classes):
-                out.append((token, ner))
-            batch_out.append(out)
-        return batch_out
+                buffer.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put((item, None)):
+                    return
+            put((_ITERATION_DONE, None))
+        except BaseException as e:
+            put((_ITERATION_DONE, e))
+
+    threading.Thread(target=produce, name="segment-reader", daemon=True).start()
+    try:
+        while True:
+            try:
+                item, error = buffer.get(timeout=idle_seconds)
+            except queue.Empty:
+                on_idle()
+                continue
+            if item is _ITERATION_DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stopped.set()
+
+def _denoise_samples(samples, strength: str):
+    """按 DENOISE_ENGINE 對 16 kHz 採樣降噪；返回 (採樣數組或 None, 說明)"""
+    if DENOISE_ENGINE == "spectral":
+        return spectral_gate(samples, strength=strength), f"spectral gating ({strength})"
+    return denoise_samples(samples, strength=strength)
+
+def _denoise_cached(decoded, content_hash: str, strength: str):
+    """對解碼緩存中的採樣降噪，結果按內容哈希、引擎與強度緩存；返回 (採樣數組或 None, 說明)"""
+    def produce():
+        samples, message = _denoise_samples(decoded.samples, strength)
+        if samples is None:
+            raise RuntimeError(message)
+        return samples
+
+    try:
+        key = f"{content_hash}.denoised-{DENOISE_ENGINE}-{strength}"
+        return get_or_create_audio(key, produce).samples, f"{DENOISE_ENGINE} ({strength}), decoded audio cache"
+    except RuntimeError as e:
+        return None, str(e)
 
 def transcribe_worker(
     audio_path: str,
@@ -331,8 +425,34 @@ def transcribe_worker(
     progress_dict: dict,
     task_id: str,
     apply_denoise: bool = False,
+    model=None,
+    event_queue=None,
+    parallel: bool = False,
+    batch_size: int = 0,
+    word_timestamps: bool = False,
+    model_name: str = "large-v3",
+    compute_type: str = None,
+    output_formats=DEFAULT_FORMATS,
+    punctuation_client=None,
+    content_hash: str = None,
+    denoise_strength: str = "medium",
+    opencc_profile: str = None,
 ):
-    """在独立进程中执行转录的工作函数"""
+    """在独立进程中执行转录的工作函数
+
+    传入 ``model`` 时直接复用已加载的 WhisperModel（常驻 worker 池），否则在本进程中按
+    ``model_name`` / ``compute_type`` 加载。
+    传入 ``event_queue`` 时，每个 segment 解码后立即发送 ``segment`` 事件，
+    所在段落完成标点和繁体转换后再发送 ``punctuated`` 事件。
+    ``parallel`` 为 True 时，长音频在静音处切分并由多个进程并行转录（见 parallel_transcribe）。
+    ``batch_size`` 大于 0 时使用 BatchedInferencePipeline 每次前向解码多个 VAD 片段；
+    调用方需要词级时间戳（``word_timestamps``）时回退到顺序模式；词级时间戳随 json 格式输出。
+    ``output_formats`` 选择输出格式（srt / txt 总是生成，可另加 vtt / json，见 subtitle_renderer）。
+    传入 ``punctuation_client`` 时中文标点交给共享标点服务（见 punctuation_service），不在本进程加载 zhpr 模型。
+    传入 ``content_hash``（上传内容的 SHA-256）时音频只解码一次并按哈希缓存（见 audio_cache）。
+    ``denoise_strength`` 为降噪强度（light / medium / strong），降噪引擎由 DENOISE_ENGINE 选择。
+    ``opencc_profile`` 为中文结果的繁体转换配置，未传入时使用 OPENCC_PROFILE。
+    """
     denoise_temp_path = None
 
     try:
@@ -344,51 +464,83 @@ def transcribe_worker(
         # 记录 zhpr 状态
         worker_logger.info(f"Worker {task_id} started - zhpr available: {_ZHPR_AVAILABLE}")
         
-        processed_audio_path = audio_path
+        # 音頻文件路徑，或 16 kHz 採樣數組（解碼緩存的內存映射或內存降噪結果，faster-whisper 兩者皆可接受）
+        processed_audio = audio_path
+        progress = _ProgressReporter(progress_dict, task_id)
 
-        if apply_denoise:
+        decoded = None
+        if content_hash and DECODED_AUDIO_CACHE:
             try:
-                current_progress = progress_dict.get(task_id, 0)
-            except Exception:
-                current_progress = 0
+                decoded = decode_cached_audio(audio_path, content_hash)
+                processed_audio = decoded.samples
+            except Exception as e:
+                worker_logger.warning(f"Failed to decode {audio_path} into the audio cache, using the file directly: {e}")
 
-            progress_dict[task_id] = max(current_progress, 5)
-            success, denoised_path, message = denoise_audio(audio_path)
-            if success and denoised_path:
-                processed_audio_path = denoised_path
-                denoise_temp_path = denoised_path
+        noise_reduction_applied = False
+        if apply_denoise:
+            progress.set(DENOISE_PROGRESS_END // 2, "denoising")
+            if decoded is not None:
+                denoised_audio, message = _denoise_cached(decoded, content_hash, denoise_strength)
+            elif DENOISE_ENGINE == "spectral":
+                from faster_whisper.audio import decode_audio
+                denoised_audio, message = _denoise_samples(decode_audio(audio_path, sampling_rate=16000), denoise_strength)
+            elif DENOISE_IN_MEMORY:
+                denoised_audio, message = denoise_audio_to_array(audio_path, strength=denoise_strength)
+            else:
+                success, denoised_audio, message = denoise_audio(audio_path, strength=denoise_strength)
+                denoise_temp_path = denoised_audio if success else None
+            if denoised_audio is not None:
+                processed_audio = denoised_audio
+                noise_reduction_applied = True
                 worker_logger.info(f"Noise reduction applied for task {task_id}: {message}")
-                progress_dict[task_id] = max(progress_dict.get(task_id, 0), 10)
+                progress.set(DENOISE_PROGRESS_END, "denoising")
             else:
                 worker_logger.warning(f"Noise reduction requested but failed for task {task_id}: {message}")
 
-        # 在子进程中重新初始化模型
         device = "cuda" if torch.cuda.is_available() else "cpu"
-        compute_type = "float16" if device == "cuda" else "int8"
-        worker_model = WhisperModel("large-v3", device=device, compute_type=compute_type)
+        # 常驻 worker 已预加载模型时直接复用，否则在子进程中初始化
+        worker_model = model if model is not None else load_whisper_model(model_name, compute_type)
         
         # 转录音频
+        # 词级时间戳需要额外的交叉注意力对齐，仅在调用方请求时开启
         transcribe_options = {
-            "word_timestamps": True,
+            "word_timestamps": word_timestamps,
             "vad_filter": True,
             "vad_parameters": dict(min_silence_duration_ms=500)
         }
         
-        if language:
-            segments, info = worker_model.transcribe(processed_audio_path, language=language, **transcribe_options)
+        transcribe_started_at = time.monotonic()
+        parallel_result = None
+        if parallel:
+            parallel_result = transcribe_parallel(
+                worker_model, processed_audio, language, transcribe_options,
+                model_name=model_name, compute_type=compute_type
+            )
+            if parallel_result is None:
+                worker_logger.info(f"Audio too short or without usable silence, transcribing task {task_id} sequentially")
+
+        inference_mode = "parallel" if parallel_result is not None else "sequential"
+        transcriber = worker_model
+        if parallel_result is None and batch_size > 0:
+            if word_timestamps:
+                worker_logger.info(f"Word timestamps requested, using sequential inference for task {task_id}")
+            else:
+                # 批处理模式按 VAD 片段成批解码，返回的 segment 结构与顺序模式相同
+                transcriber = BatchedInferencePipeline(model=worker_model)
+                transcribe_options = dict(transcribe_options, word_timestamps=False, batch_size=batch_size)
+                inference_mode = "batched"
+                worker_logger.info(f"Using batched inference (batch size {batch_size}) for task {task_id}")
+
+        if parallel_result is not None:
+            segments, info = parallel_result
+            detected_language = language or info.language
+        elif language:
+            segments, info = transcriber.transcribe(processed_audio, language=language, **transcribe_options)
             detected_language = language
         else:
-            segments, info = worker_model.transcribe(processed_audio_path, **transcribe_options)
+            segments, info = transcriber.transcribe(processed_audio, **transcribe_options)
             detected_language = info.language
         
-        # 生成 SRT 格式
-        srt_output = ""
-        # 生成纯文本格式
-        txt_output = ""
-        
-        segments_list = list(segments)
-        total_segments = len(segments_list)
-        
         # Prepare zh punctuation restorer if needed
         zh_restorer = None
         def _is_zh(lang: str) -> bool:
@@ -397,7 +549,12 @@ def transcribe_worker(
             except Exception:
                 return False
 
-        if (_ZHPR_AVAILABLE and ((language and _is_zh(language)) or (not language and _is_zh(detected_language)))):
+        is_zh = (language and _is_zh(language)) or (not language and _is_zh(detected_language))
+        if is_zh and punctuation_client is not None:
+            # 共享標點服務跨任務合併微批次，worker 不必各自載入模型
+            zh_restorer = punctuation_client
+            worker_logger.info(f"Using shared zhpr punctuation service for Chinese text")
+        elif (_ZHPR_AVAILABLE and is_zh):
             try:
                 zh_restorer = _ZhPunctuationRestorer(device=device)
                 worker_logger.info(f"Using zhpr ML-based punctuation restoration for Chinese text")
@@ -406,82 +563,125 @@ def transcribe_worker(
                 zh_restorer = None
         else:
             zh_restorer = None
-            if ((language and _is_zh(language)) or (not language and _is_zh(detected_language))):
+            if is_zh:
                 worker_logger.info(f"Using rule-based punctuation restoration for Chinese text")
 
-        # 將 segments 分組為段落並處理
-        paragraphs = group_segments_into_paragraphs(segments_list, max_gap_seconds=2.0, max_paragraph_segments=10, max_paragraph_chars=500)
-        
-        # 統計段落信息
-        max_paragraph_size = max(len(p) for p in paragraphs) if paragraphs else 0
-        avg_paragraph_size = sum(len(p) for p in paragraphs) / len(paragraphs) if paragraphs else 0
-        
-        worker_logger.info(f"Grouped {len(segments_list)} segments into {len(paragraphs)} paragraphs")
-        worker_logger.info(f"Paragraph stats - Max: {max_paragraph_size} segments, Avg: {avg_paragraph_size:.1f} segments")
-        
-        processed_segments = []
-        for paragraph_idx, paragraph_segments in enumerate(paragraphs):
-            # 處理段落標點符號
-            paragraph_processed_texts = process_paragraph_punctuation(
-                paragraph_segments, zh_restorer, detected_language, worker_logger
+        duration = getattr(info, "duration", None)
+        _emit_event(event_queue, "info", language=detected_language, duration=duration)
+        progress.start_decoding(duration, started_at=transcribe_started_at)
+
+        # 所有 segment 存入列式存儲（時間為 NumPy 陣列，文本在字符串池中），不保留 faster-whisper 的 Segment 對象
+        store = SegmentStore(word_timestamps=word_timestamps)
+        paragraph_sizes = []
+
+        # 待處理的段落（store 中的索引區間）
+        pending_paragraphs = []
+
+        def flush_paragraphs():
+            # 處理段落標點符號（zhpr 對緩衝中的所有段落一次批量推理）
+            if not pending_paragraphs:
+                return
+            segment_texts_list = [store.texts(paragraph.start, paragraph.stop) for paragraph in pending_paragraphs]
+            paragraphs_processed_texts = process_paragraphs_punctuation(
+                segment_texts_list, zh_restorer, detected_language, worker_logger
             )
-            
-            # 將處理結果與原始segments組合
-            for segment, processed_text in zip(paragraph_segments, paragraph_processed_texts):
-                processed_segments.append({
-                    'segment': segment,
-                    'processed_text': processed_text
-                })
-            
-            # 更新進度
-            progress_dict[task_id] = int(((paragraph_idx + 1) / len(paragraphs)) * 80)  # 保留20%用於後處理
-
-        # 生成 SRT 輸出 - 使用原始 segment 文本，不添加標點符號
-        for i, item in enumerate(processed_segments, start=1):
-            segment = item['segment']
-            segment_text = segment.text.strip()  # 使用原始文本
-            
-            start_ts = format_timestamp(segment.start)
-            end_ts = format_timestamp(segment.end)
-            
-            # 如果是中文，轉換為繁體中文
-            if detected_language == 'zh':
-                segment_text = convert_to_traditional_chinese(segment_text)
-            
-            srt_output += f"{i}\n{start_ts} --> {end_ts}\n{segment_text}\n\n"
-            
-        # 生成 TXT 輸出
-        no_space_languages = ['zh', 'ja', 'ko', 'th', 'chinese', 'japanese', 'korean', 'thai']
-        for i, item in enumerate(processed_segments):
-            segment_text = item['processed_text']
-            
-            # 如果是中文，轉換為繁體中文
+            subtitle_texts = [text for segment_texts in segment_texts_list for text in segment_texts]
+            processed_texts = [text for paragraph_texts in paragraphs_processed_texts for text in paragraph_texts]
+            paragraph_sizes.extend(len(paragraph) for paragraph in pending_paragraphs)
+
+            # 如果是中文，整批一次轉換為繁體中文
             if detected_language == 'zh':
-                segment_text = convert_to_traditional_chinese(segment_text)
-            
-            if detected_language in no_space_languages:
-                # 中文等语言直接连接，不加空格
-                txt_output += segment_text
-            else:
-                # 其他语言需要空格分隔
-                if txt_output:  # 如果不是第一个片段，前面加空格
-                    txt_output += f" {segment_text}"
-                else:
-                    txt_output = segment_text
-        
-        # 整理纯文本格式（去除多余空格）
-        txt_output = txt_output.strip()
+                converted = convert_many_to_traditional_chinese(
+                    subtitle_texts + processed_texts, opencc_profile or DEFAULT_PROFILE
+                )
+                subtitle_texts, processed_texts = converted[:len(subtitle_texts)], converted[len(subtitle_texts):]
+
+            # SRT 使用原始文本，TXT 使用標點處理後的文本
+            first_index = pending_paragraphs[0].start
+            store.set_outputs(first_index, subtitle_texts, processed_texts)
+            for index, (subtitle_text, processed_text) in enumerate(zip(subtitle_texts, processed_texts), start=first_index + 1):
+                _emit_event(event_queue, "punctuated", index=index, text=processed_text, subtitle=subtitle_text)
+            pending_paragraphs.clear()
+
+        pending_since = [None]  # 緩衝中最早段落的加入時間
+
+        def finish_paragraph(paragraph):
+            pending_paragraphs.append(paragraph)
+            if pending_since[0] is None:
+                pending_since[0] = time.monotonic()
+            # 沒有 zhpr 模型時逐段落處理即可；有模型時累積數個段落再批量推理，但最早的段落最多等待 ZHPR_FLUSH_SECONDS
+            if (
+                zh_restorer is None
+                or len(pending_paragraphs) >= ZHPR_PARAGRAPH_BATCH
+                or time.monotonic() - pending_since[0] >= ZHPR_FLUSH_SECONDS
+            ):
+                flush_pending()
+
+        def flush_pending():
+            pending_since[0] = None
+            flush_paragraphs()
+
+        if zh_restorer is not None and event_queue is not None:
+            # 流式輸出時在背景執行緒中拉取 segment：解碼停頓 ZHPR_FLUSH_SECONDS 就先處理已緩衝的段落
+            segments = iterate_with_idle_callback(segments, ZHPR_FLUSH_SECONDS, flush_pending)
+
+        def finish_paragraphs(open_start, final=False):
+            # 對 store 中尚未歸入段落的尾部（從 open_start 起）計算段落邊界；除最後一個段落外都已結束，
+            # 返回仍未結束段落的起始索引。final 時最後一個段落也一併結束
+            ranges = paragraph_ranges(
+                store.starts[open_start:], store.ends[open_start:], store.lengths[open_start:],
+                max_gap_seconds=2.0, max_paragraph_segments=10, max_paragraph_chars=500,
+            )
+            open_paragraph = ranges.pop() if ranges and not final else None
+            for paragraph in ranges:
+                finish_paragraph(range(open_start + paragraph.start, open_start + paragraph.stop))
+            return open_start + open_paragraph.start if open_paragraph else len(store)
+
+        # 逐個消費 faster-whisper 的惰性 segment 生成器，段落一結束就處理標點
+        open_start = 0
+        for index, segment in enumerate(segments, start=1):
+            segment_text = segment.text.strip()
+            _emit_event(
+                event_queue, "segment",
+                index=index, start=segment.start, end=segment.end, text=segment_text
+            )
+            store.append(
+                segment.start, segment.end, segment_text,
+                getattr(segment, "words", None) if word_timestamps else None
+            )
+            open_start = finish_paragraphs(open_start)
+
+            # 更新進度（按已解碼的音頻時長 segment.end / info.duration 計算）
+            progress.decoded(segment.end)
+
+        finish_paragraphs(open_start, final=True)
+        flush_pending()
+        progress.finish_decoding()
+
+        # 統計段落信息
+        max_paragraph_size = max(paragraph_sizes) if paragraph_sizes else 0
+        avg_paragraph_size = sum(paragraph_sizes) / len(paragraph_sizes) if paragraph_sizes else 0
         
+        worker_logger.info(f"Grouped {len(store)} segments into {len(paragraph_sizes)} paragraphs")
+        worker_logger.info(f"Paragraph stats - Max: {max_paragraph_size} segments, Avg: {avg_paragraph_size:.1f} segments")
+
+        # 一次生成所有請求的輸出格式：SRT/WebVTT 使用原始文本（已轉換為繁體），TXT/JSON 使用標點處理後的文本
+        if word_timestamps and "json" not in output_formats:
+            output_formats = (*output_formats, "json")
+        rendered = render_subtitles(store.cues(), detected_language, output_formats)
+
         # 设置最终进度
-        progress_dict[task_id] = 100
+        progress.set(100, "completed")
         
         # 返回结果
         result = {
-            "srt": srt_output, 
-            "txt": txt_output,
+            **rendered,
             "detected_language": detected_language,
             "status": "completed",
-            "noise_reduction_applied": apply_denoise and denoise_temp_path is not None
+            "noise_reduction_applied": noise_reduction_applied,
+            "parallel_chunks": parallel_result[1].chunks if parallel_result is not None else 1,
+            "inference_mode": inference_mode,
+            "compute_type": compute_type or default_compute_type()
         }
         result_queue.put(result)
         
@@ -490,6 +690,9 @@ def transcribe_worker(
         error_result = {"error": "Transcription failed.", "status": "error"}
         result_queue.put(error_result) 
     finally:
+        if parallel:
+            # 並行轉錄的子進程只為本任務服務；未消費完 segment 就出錯時也在此停止
+            shutdown_executor()
         if denoise_temp_path and os.path.exists(denoise_temp_path):
             try:
                 os.remove(denoise_temp_path)
@@ -0,0 +1,86 @@
+"""
+测试有界 FIFO 准入队列
+"""
+import time
+import pytest
+
+from src.utils.admission_queue import AdmissionQueue, QueueFullError
+
+
+class TestAdmissionQueue:
+    """准入队列测试"""
+
+    def test_starts_immediately_when_slot_free(self):
+        """有空闲槽位时立即启动任务"""
+        started = []
+        admission = AdmissionQueue(max_running=1, max_queued=1)
+
+        position = admission.submit("a", lambda: started.append("a"))
+
+        assert position == 0
+        assert started == ["a"]
+
+    def test_queues_in_fifo_order(self):
+        """槽位已满时按 FIFO 顺序排队并在释放时依次启动"""
+        started = []
+        admission = AdmissionQueue(max_running=1, max_queued=5)
+
+        admission.submit("a", lambda: started.append("a"))
+        assert admission.submit("b", lambda: started.append("b")) == 1
+        assert admission.submit("c", lambda: started.append("c")) == 2
+        assert admission.position("c") == 2
+
+        admission.release("a")
+        assert started == ["a", "b"]
+        assert admission.position("c") == 1
+
+        admission.release("b")
+        assert started == ["a", "b", "c"]
+        assert admission.position("c") is None
+
+    def test_rejects_when_queue_full(self):
+        """只有排队队列也满时才拒绝"""
+        admission = AdmissionQueue(max_running=1, max_queued=1)
+        admission.submit("a", lambda: None)
+        admission.submit("b", lambda: None)
+
+        assert admission.is_full()
+        with pytest.raises(QueueFullError):
+            admission.submit("c", lambda: None)
+
+    def test_cancel_queued_job(self):
+        """取消排队中的任务后不会被启动"""
+        started = []
+        admission = AdmissionQueue(max_running=1, max_queued=2)
+        admission.submit("a", lambda: started.append("a"))
+        admission.submit("b", lambda: started.append("b"))
+
+        assert admission.cancel("b") is True
+        assert admission.cancel("a") is False  # 运行中的任务不在队列里
+
+        admission.release("a")
+        assert started == ["a"]
+
+    def test_estimated_start_uses_average_duration(self):
+        """预计开始时间按平均任务耗时和队列位置估算"""
+        admission = AdmissionQueue(max_running=2, max_queued=5, default_job_seconds=100)
+        for job_id in ("a", "b", "c", "d", "e"):
+            admission.submit(job_id, lambda: None)
+
+        now = time.time()
+        # c、d 等待第一轮任务结束，e 需要再等一轮
+        assert admission.estimated_start("c") == pytest.approx(now + 100, abs=5)
+        assert admission.estimated_start("d") == pytest.approx(now + 100, abs=5)
+        assert admission.estimated_start("e") == pytest.approx(now + 200, abs=5)
+        assert admission.estimated_start("a") is None
+
+    def test_failed_start_releases_slot(self):
+        """启动失败时释放槽位并抛出异常"""
+        admission = AdmissionQueue(max_running=1, max_queued=1)
+
+        def boom():
+            raise RuntimeError("spawn failed")
+
+        with pytest.raises(RuntimeError):
+            admission.submit("a", boom)
+        assert admission.stats()["running"] == 0
@@ -219,4 +219,573 @@ class TestTranscribeEndpoints:
         tasks = {task["task_id"]: task for task in data["active_tasks"]}
         assert tasks[task_id1]["status"] == "running"
         assert tasks[task_id1]["progress"] == 30
-        assert tasks[task_id2]["progress"] == 70 
\ No newline at end of file
+        assert tasks[task_id2]["progress"] == 70 
+
+
+class TestTranscriptionCacheAndDedup:
+    """转录结果缓存与单飞去重测试"""
+
+    @pytest.fixture
+    def isolated_router(self, tmp_path):
+        """替换进程池、队列和缓存，避免启动真实 worker"""
+        from src.routers import transcribe
+        from src.utils.result_cache import TranscriptionCache
+
+        mock_pool = Mock()
+        mock_pool.progress_dict = {}
+        mock_queue = Mock()
+        mock_queue.is_full.return_value = False
+        mock_queue.submit.return_value = 1  # 进入队列但不启动
+        mock_queue.position.return_value = 1
+        mock_queue.estimated_start.return_value = None
+        cache = TranscriptionCache(cache_dir=str(tmp_path))
+
+        with patch.object(transcribe, 'transcribe_pool', mock_pool), \
+             patch.dict(transcribe.tier_queues, {name: mock_queue for name in transcribe.tier_queues}), \
+             patch.object(transcribe, 'transcription_cache', cache):
+            yield transcribe, mock_queue, cache
+
+        for task_id in list(transcribe.active_tasks):
+            transcribe._discard_task(task_id)
+        transcribe.inflight_transcriptions.clear()
+
+    def test_cache_hit_returns_completed(self, isolated_router, client, sample_audio_file):
+        """命中缓存时直接返回结果，不提交任务"""
+        import hashlib
+        transcribe, mock_queue, cache = isolated_router
+        sha256 = hashlib.sha256(b"fake audio content for testing").hexdigest()
+        cache.put(
+            transcribe._transcription_cache_key(sha256, "zh", False),
+            {"srt": "", "txt": "缓存", "detected_language": "zh", "status": "completed"}
+        )
+
+        response = client.post("/transcribe/", files=sample_audio_file, data={"language": "zh"})
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["status"] == "completed"
+        assert data["cached"] is True
+        mock_queue.submit.assert_not_called()
+
+        result = client.get(f"/transcribe/{data['task_id']}/result").json()
+        assert result["txt"] == "缓存"
+        assert result["cache_hit"] is True
+
+    def test_cache_lookup_runs_off_the_event_loop(self, isolated_router, client, sample_audio_file):
+        """缓存查找（磁盘读取与 JSON 解析）在线程池中执行，不在事件循环线程中"""
+        import asyncio
+        _, _, cache = isolated_router
+        on_loop = []
+
+        def get(key):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return None
+
+        with patch.object(cache, "get", side_effect=get):
+            response = client.post("/transcribe/", files=sample_audio_file, data={"language": "zh"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert on_loop == [False]
+
+    def test_duplicate_upload_attaches_to_inflight_task(self, isolated_router, client):
+        """相同内容的请求合并到进行中的任务"""
+        from io import BytesIO
+        transcribe, mock_queue, _ = isolated_router
+
+        def upload():
+            files = {"file": ("lecture.mp3", BytesIO(b"same lecture"), "audio/mpeg")}
+            return client.post("/transcribe/", files=files, data={"language": "zh"}).json()
+
+        first = upload()
+        second = upload()
+
+        assert first["status"] == "queued"
+        assert second["status"] == "running"
+        assert second["attached_to"] == first["task_id"]
+        assert mock_queue.submit.call_count == 1
+
+        status_data = client.get(f"/transcribe/{second['task_id']}/status").json()
+        assert status_data["attached_to"] == first["task_id"]
+        assert status_data["model"] == "large-v3"
+
+        # 主任务完成后跟随任务共享结果
+        transcribe._resolve_followers([second["task_id"]], {"txt": "done", "status": "completed"})
+        result = client.get(f"/transcribe/{second['task_id']}/result").json()
+        assert result["txt"] == "done"
+        assert result["deduplicated"] is True
+
+    def test_denoise_strength_is_passed_to_worker(self, isolated_router, client, sample_audio_file):
+        """降噪强度随任务传给 worker，并区分缓存键"""
+        transcribe, _, _ = isolated_router
+
+        data = client.post(
+            "/transcribe/", files=sample_audio_file, data={"denoise": "true", "strength": "strong"}
+        ).json()
+
+        task_info = transcribe.active_tasks[data["task_id"]]
+        assert task_info["job"]["denoise_strength"] == "strong"
+        assert task_info["cache_key"] == transcribe._transcription_cache_key(
+            task_info["sha256"], None, True, denoise_strength="strong"
+        )
+        assert task_info["cache_key"] != transcribe._transcription_cache_key(task_info["sha256"], None, True)
+
+    def test_conversion_profile_is_passed_to_worker(self, isolated_router, client, sample_audio_file):
+        """繁体转换配置随任务传给 worker 并区分缓存键，不支持的配置返回 400"""
+        transcribe, _, _ = isolated_router
+
+        data = client.post("/transcribe/", files=sample_audio_file, data={"profile": "s2twp"}).json()
+
+        task_info = transcribe.active_tasks[data["task_id"]]
+        assert task_info["job"]["opencc_profile"] == "s2twp"
+        assert task_info["cache_key"] == transcribe._transcription_cache_key(task_info["sha256"], None, False, profile="s2twp")
+        assert task_info["cache_key"] != transcribe._transcription_cache_key(task_info["sha256"], None, False)
+
+        response = client.post("/transcribe/", files=sample_audio_file, data={"profile": "s2jp"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_result_after_cancel_is_discarded(self, isolated_router, client, sample_audio_file):
+        """取消后 worker 才返回的结果不覆盖取消状态，也不写入缓存"""
+        transcribe, _, cache = isolated_router
+        task_id = client.post("/transcribe/", files=sample_audio_file).json()["task_id"]
+        task_info = transcribe.active_tasks[task_id]
+        task = task_info["task"]
+
+        def run(task_id, job, on_dispatch, on_event, is_cancelled):
+            task.cancel()
+            assert is_cancelled()
+            return {"status": "completed", "txt": "late"}
+
+        transcribe.transcribe_pool.run.side_effect = run
+        transcribe._monitor_transcription(task_id)
+
+        assert task.status == "cancelled"
+        assert task_id not in transcribe.task_results
+        assert cache.get(task_info["cache_key"]) is None
+        assert transcribe.task_streams.pop(task_id, [])[-1:] in ([], [{"event": "done", "status": "cancelled"}])
+
+    def test_cache_stats_endpoint(self, isolated_router, client):
+        """缓存统计端点返回命中计数"""
+        response = client.get("/transcribe/cache/stats")
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert "hits" in data["cache"]
+        assert "misses" in data["cache"]
+        assert "deduplicated" in data
+
+
+class TestTranscriptionStream:
+    """转录 SSE 流式输出端点测试"""
+
+    def test_stream_not_found(self, client, sample_task_id):
+        """不存在的任务返回 404"""
+        response = client.get(f"/transcribe/{sample_task_id}/stream")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_stream_replays_events_until_done(self, client, sample_task_id):
+        """已记录的事件按 SSE 格式回放，收到 done 后结束"""
+        from src.routers import transcribe
+
+        events = [
+            {"event": "segment", "index": 1, "start": 0.0, "end": 1.5, "text": "你好"},
+            {"event": "punctuated", "index": 1, "text": "你好。", "subtitle": "你好"},
+            {"event": "done", "status": "completed"},
+        ]
+        with patch.dict(transcribe.task_streams, {sample_task_id: events}):
+            response = client.get(f"/transcribe/{sample_task_id}/stream")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = response.text
+        assert 'event: segment\ndata: {"index": 1, "start": 0.0, "end": 1.5, "text": "你好"}\n\n' in body
+        assert "event: punctuated" in body
+        assert body.endswith('event: done\ndata: {"status": "completed"}\n\n')
+
+    def test_stream_follows_live_events(self, client, sample_task_id):
+        """任务进行中时持续推送后续到达的事件"""
+        import threading
+        from src.routers import transcribe
+
+        events = [{"event": "segment", "index": 1, "start": 0.0, "end": 1.0, "text": "a"}]
+
+        def produce():
+            events.append({"event": "segment", "index": 2, "start": 1.0, "end": 2.0, "text": "b"})
+            events.append({"event": "done", "status": "completed"})
+
+        with patch.dict(transcribe.task_streams, {sample_task_id: events}), \
+             patch.object(transcribe, 'STREAM_POLL_INTERVAL', 0.01):
+            threading.Timer(0.05, produce).start()
+            response = client.get(f"/transcribe/{sample_task_id}/stream")
+
+        assert response.text.count("event: segment") == 2
+        assert response.text.endswith('event: done\ndata: {"status": "completed"}\n\n')
+
+
+class TestTranscriptionStatusMetrics:
+    """转录状态中的实时指标测试"""
+
+    def test_status_includes_rtf_and_eta(self, client, sample_task_id):
+        """运行中任务的状态返回阶段、实时率与预计完成时间"""
+        from src.routers import transcribe
+
+        task = transcribe.TranscriptionTask(sample_task_id)
+        progress_dict = {
+            sample_task_id: 45,
+            f"{sample_task_id}:metrics": {
+                "stage": "decoding", "audio_duration": 20.0, "decoded_seconds": 10.0,
+                "elapsed_seconds": 2.0, "rtf": 0.2, "eta_seconds": 2.0
+            }
+        }
+        task_info = {"task": task, "progress_dict": progress_dict, "filename": "audio.mp3"}
+
+        with patch.dict(transcribe.active_tasks, {sample_task_id: task_info}):
+            data = client.get(f"/transcribe/{sample_task_id}/status").json()
+
+        assert data["progress"] == 45
+        assert data["stage"] == "decoding"
+        assert data["rtf"] == 0.2
+        assert data["eta_seconds"] == 2.0
+        assert "estimated_completion_time" in data
+
+
+class TestTranscriptionBatchSize:
+    """批处理推理参数测试"""
+
+    def test_invalid_batch_size_rejected(self, client, sample_audio_file):
+        """超出范围的 batch_size 返回 400"""
+        response = client.post("/transcribe/", files=sample_audio_file, data={"batch_size": "1000"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "batch_size" in response.json()["detail"]
+
+
+class TestDenoiseStrength:
+    """降噪强度参数测试"""
+
+    def test_unknown_strength_rejected(self, client, sample_audio_file):
+        """未知的降噪强度返回 400"""
+        response = client.post("/transcribe/", files=sample_audio_file, data={"denoise": "true", "strength": "max"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "strength" in response.json()["detail"]
+
+
+class TestTranscriptionModelTiers:
+    """模型档位选择测试"""
+
+    def test_unknown_model_rejected(self, client, sample_audio_file):
+        """不在注册表中的模型返回 400 并列出允许的模型"""
+        response = client.post("/transcribe/", files=sample_audio_file, data={"model": "gpt-4"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "Allowed models" in response.json()["detail"]
+
+    def test_unknown_compute_type_rejected(self, client, sample_audio_file):
+        """不允许的计算类型返回 400"""
+        response = client.post(
+            "/transcribe/", files=sample_audio_file, data={"model": "tiny", "compute_type": "int3"}
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "compute_type" in response.json()["detail"]
+
+    def test_list_models(self, client):
+        """模型列表包含默认档位和每个档位的并发上限"""
+        data = client.get("/transcribe/models").json()
+
+        assert data["default"] == "large-v3"
+        tiers = {tier["name"]: tier for tier in data["models"]}
+        assert "tiny" in tiers
+        assert tiers["tiny"]["max_concurrent"] >= 1
+
+
+class TestTranscriptionFormats:
+    """输出格式选择测试"""
+
+    def test_unknown_format_rejected(self, client, sample_audio_file):
+        """不支持的输出格式返回 400"""
+        response = client.post("/transcribe/", files=sample_audio_file, data={"formats": "vtt,docx"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "docx" in response.json()["detail"]
+
+    def test_formats_are_part_of_cache_key(self):
+        """不同输出格式的请求不共享缓存结果"""
+        from src.routers.transcribe import _transcription_cache_key
+
+        assert _transcription_cache_key("abc", "zh", False, formats=("srt", "txt")) != \
+            _transcription_cache_key("abc", "zh", False, formats=("srt", "txt", "vtt"))
+
+
+class TestConvertTraditional:
+    """繁体转换端点测试"""
+
+    def test_convert_single_document(self, client):
+        """txt / srt 分别转换，未提供的字段保持为空"""
+        response = client.post("/transcribe/convert-traditional", json={"txt": "学习计算机"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"txt": "學習計算機", "srt": None}
+
+    def test_convert_with_profile(self, client):
+        """按请求选择转换配置，不支持的配置返回 400"""
+        response = client.post("/transcribe/convert-traditional", json={"txt": "鼠标", "profile": "s2twp"})
+        assert response.json()["txt"] == "滑鼠"
+
+        response = client.post("/transcribe/convert-traditional", json={"txt": "鼠标", "profile": "s2jp"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_convert_batch_profile_override(self, client):
+        """批量转换中文档自身的 profile 优先于请求级 profile"""
+        response = client.post(
+            "/transcribe/convert-traditional/batch",
+            json={"profile": "s2twp", "documents": [{"txt": "鼠标"}, {"txt": "鼠标", "profile": "s2t"}]},
+        )
+
+        assert [document["txt"] for document in response.json()["documents"]] == ["滑鼠", "鼠標"]
+
+    def test_convert_requires_text(self, client):
+        """没有 txt 和 srt 时返回 400"""
+        response = client.post("/transcribe/convert-traditional", json={})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_large_document_is_converted_in_line_chunks(self, client, monkeypatch):
+        """超过块大小的文本按行切块后并行转换，结果与整体转换一致"""
+        from concurrent.futures import ThreadPoolExecutor
+        from src.utils import text_conversion
+
+        executor = ThreadPoolExecutor(max_workers=2)
+        submitted = []
+        original_submit = executor.submit
+
+        def submit(fn, *args):
+            submitted.append(args[0])
+            return original_submit(fn, *args)
+
+        monkeypatch.setattr(executor, "submit", submit)
+        monkeypatch.setattr(text_conversion, "CONVERT_CHUNK_CHARS", 40)
+        monkeypatch.setattr(text_conversion, "_get_process_pool", lambda: executor)
+
+        srt = "".join(f"{i}\n00:00:0{i % 10},000 --> 00:00:0{i % 10},500\n我在学习计算机\n\n" for i in range(1, 20))
+        response = client.post("/transcribe/convert-traditional", json={"srt": srt})
+        executor.shutdown()
+
+        assert response.json()["srt"] == text_conversion.convert_to_traditional_chinese(srt)
+        assert len(submitted) > 1
+        assert "".join(submitted) == srt
+
+    def test_convert_batch(self, client):
+        """批量转换按请求顺序返回每份文档"""
+        response = client.post(
+            "/transcribe/convert-traditional/batch",
+            json={"documents": [{"txt": "学习"}, {"srt": "1\n00:00:00,000 --> 00:00:01,000\n计算机\n\n"}]},
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"documents": [
+            {"txt": "學習", "srt": None},
+            {"txt": None, "srt": "1\n00:00:00,000 --> 00:00:01,000\n計算機\n\n"},
+        ]}
+
+    def test_convert_batch_limit(self, client, monkeypatch):
+        """文档数量超过上限返回 400"""
+        from src.routers import transcribe as transcribe_router
+
+        monkeypatch.setattr(transcribe_router, "MAX_CONVERT_BATCH_DOCUMENTS", 1)
+        response = client.post(
+            "/transcribe/convert-traditional/batch", json={"documents": [{"txt": "a"}, {"txt": "b"}]}
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_convert_ndjson_stream(self, client):
+        """NDJSON 逐行转换，保留其他字段，无法解析的行返回 error"""
+        import json
+
+        body = '{"id": 1, "txt": "学习"}\nnot json\n\n{"id": 2, "srt": "计算机"}'.encode("utf-8")
+
+        response = client.post(
+            "/transcribe/convert-traditional/stream",
+            content=body,
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert lines[0] == {"id": 1, "txt": "學習"}
+        assert "line 2" in lines[1]["error"]
+        assert lines[2] == {"id": 2, "srt": "計算機"}
+
+
+    def test_convert_ndjson_stream_rejects_overlong_lines(self, client, monkeypatch):
+        """超过单行上限的行（无论是否跨多个数据块）返回 error，之后的行照常转换"""
+        import json
+        from src.routers import transcribe as transcribe_router
+
+        monkeypatch.setattr(transcribe_router, "MAX_NDJSON_LINE_BYTES", 40)
+        long_line = json.dumps({"txt": "学" * 100}).encode("utf-8")
+        first = '{"id": 1, "txt": "学习"}\n'.encode("utf-8")
+        third = '{"id": 2, "txt": "计算机"}\n'.encode("utf-8")
+        chunks = [first, long_line[:30], long_line[30:60], long_line[60:] + b"\n", third[:10], third[10:] + long_line]
+
+        response = client.post(
+            "/transcribe/convert-traditional/stream",
+            content=iter(chunks),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert lines[0] == {"id": 1, "txt": "學習"}
+        assert lines[1] == {"error": "Line 2 exceeds 40 bytes"}
+        assert lines[2] == {"id": 2, "txt": "計算機"}
+        assert lines[3] == {"error": "Line 4 exceeds 40 bytes"}
+        assert len(lines) == 4
+
+    def test_ndjson_stream_runs_background_task(self):
+        """流式响应发送完毕后执行后台任务"""
+        import asyncio
+        from starlette.background import BackgroundTask
+        from src.routers.transcribe import _RequestDrivenStreamingResponse
+
+        async def body():
+            yield "line\n"
+
+        ran, sent = [], []
+
+        async def send(message):
+            sent.append(message)
+
+        response = _RequestDrivenStreamingResponse(body(), background=BackgroundTask(lambda: ran.append(True)))
+        asyncio.run(response({"type": "http"}, None, send))
+
+        assert sent[-1]["type"] == "http.response.body" and ran == [True]
+
+
+class TestPunctuate:
+    """/punctuate 端点测试"""
+
+    def test_falls_back_to_rules_without_service(self, client):
+        """标点服务未运行时使用规则标点"""
+        response = client.post("/punctuate/", json={"texts": ["你好吗", "这是测试"]})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"texts": ["你好吗？", "这是测试。"], "engine": "rules"}
+
+    def test_uses_shared_service(self, client, monkeypatch):
+        """标点服务运行时请求交给服务的微批次"""
+        from src.routers import punctuate as punctuate_router
+
+        async def punctuate_many(texts):
+            return [text + "。" for text in texts]
+
+        service = Mock(running=True, punctuate_many=punctuate_many)
+        monkeypatch.setattr(punctuate_router, "punctuation_service", service)
+        response = client.post("/punctuate/", json={"texts": ["今天天气很好"]})
+
+        assert response.json() == {"texts": ["今天天气很好。"], "engine": "zhpr"}
+
+    def test_rejects_too_many_texts(self, client, monkeypatch):
+        """文本数量超过上限返回 400"""
+        from src.routers import punctuate as punctuate_router
+
+        monkeypatch.setattr(punctuate_router, "MAX_PUNCTUATE_TEXTS", 1)
+        response = client.post("/punctuate/", json={"texts": ["a", "b"]})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_importing_routers_does_not_create_service(self):
+        """导入路由不会创建标点服务"""
+        from src.routers import punctuate as punctuate_router
+        from src.routers.transcribe import transcribe_pool
+
+        assert punctuate_router.punctuation_service is None
+        assert transcribe_pool.punctuation_service is None
+
+    @pytest.mark.parametrize("enabled, zhpr_available, created", [
+        (True, True, True),
+        (False, True, False),
+        (True, False, False),
+    ])
+    def test_lifespan_creates_and_injects_service(self, monkeypatch, enabled, zhpr_available, created):
+        """lifespan 只在启用且安装了 zhpr 时创建服务，注入进程池与 /punctuate，关闭时停止服务"""
+        from fastapi.testclient import TestClient
+        from src import whisper_api
+        from src.routers import punctuate as punctuate_router
+        from src.routers.transcribe import transcribe_pool
+
+        service = Mock(running=True)
+        service_class = Mock(return_value=service)
+        injected = {}
+
+        def start():
+            injected["pool"] = transcribe_pool.punctuation_service
+            injected["router"] = punctuate_router.punctuation_service
+
+        monkeypatch.setattr(whisper_api, "PUNCTUATION_SERVICE_ENABLED", enabled)
+        monkeypatch.setattr(whisper_api, "_ZHPR_AVAILABLE", zhpr_available)
+        monkeypatch.setattr(whisper_api, "PunctuationService", service_class)
+        monkeypatch.setattr(transcribe_pool, "start", start)
+        monkeypatch.setattr(transcribe_pool, "shutdown", Mock())
+
+        with TestClient(whisper_api.app):
+            pass
+
+        assert service_class.called is created
+        assert service.start.called is created
+        assert service.shutdown.called is created
+        assert injected == ({"pool": service, "router": service} if created else {"pool": None, "router": None})
+        assert transcribe_pool.punctuation_service is None
+        assert punctuate_router.punctuation_service is None
+
+
+class TestWorkerAdmission:
+    """档位放行的任务数超过 worker 数时，在全局 worker 队列中按 FIFO 排队"""
+
+    @pytest.fixture
+    def gated_router(self, tmp_path):
+        from src.routers import transcribe
+        from src.utils.admission_queue import AdmissionQueue
+        from src.utils.result_cache import TranscriptionCache
+
+        tiers = {name: AdmissionQueue(2, 5, name=name) for name in transcribe.tier_queues}
+        with patch.object(transcribe, 'transcribe_pool', Mock(progress_dict={})), \
+             patch.dict(transcribe.tier_queues, tiers), \
+             patch.object(transcribe, 'worker_queue', AdmissionQueue(1, 10, name="workers")), \
+             patch.object(transcribe, 'transcription_cache', TranscriptionCache(cache_dir=str(tmp_path))), \
+             patch.object(transcribe, '_start_transcription') as start:
+            yield transcribe, start
+
+        for task_id in list(transcribe.active_tasks):
+            transcribe._discard_task(task_id)
+        transcribe.inflight_transcriptions.clear()
+
+    def _upload(self, client, content, model):
+        from io import BytesIO
+        files = {"file": ("a.mp3", BytesIO(content), "audio/mpeg")}
+        return client.post("/transcribe/", files=files, data={"model": model}).json()
+
+    def test_jobs_beyond_pool_size_wait_for_a_worker(self, gated_router, client):
+        """不同档位各有空位，但只有一个 worker：第二个任务排队并报告位置，取消后归还档位槽位"""
+        transcribe, start = gated_router
+
+        first = self._upload(client, b"one", "tiny")
+        second = self._upload(client, b"two", "small")
+
+        assert first["status"] == "started"
+        assert second["status"] == "queued"
+        assert second["queue_position"] == 1
+        assert start.call_count == 1
+        status_data = client.get(f"/transcribe/{second['task_id']}/status").json()
+        assert status_data["queue_position"] == 1
+
+        client.post(f"/transcribe/{second['task_id']}/cancel")
+        assert transcribe.worker_queue.stats()["queued"] == 0
+        assert transcribe.tier_queues["small"].stats()["running"] == 0
+        assert start.call_count == 1
@@ -0,0 +1,98 @@
+"""
+测试解码音频缓存（内存映射的 .npy）
+"""
+import os
+import time
+from unittest.mock import Mock
+
+import numpy as np
+
+from src.utils.audio_cache import (
+    cache_path,
+    decode_cached_audio,
+    enforce_size_limit,
+    get_or_create_audio,
+    load_cached_audio,
+    remove_expired_audio,
+)
+
+
+class TestDecodedAudioCache:
+    """解码一次，之后的读取都来自内存映射"""
+
+    def test_miss_decodes_once_then_maps_file(self, tmp_path):
+        """首次调用生成并保存数组，之后命中缓存不再解码，返回只读内存映射"""
+        samples = np.linspace(-1, 1, 32000, dtype=np.float32)
+        produce = Mock(return_value=samples)
+
+        first = get_or_create_audio("abc", produce, cache_dir=str(tmp_path))
+        second = get_or_create_audio("abc", produce, cache_dir=str(tmp_path))
+
+        produce.assert_called_once()
+        assert isinstance(second.samples, np.memmap)
+        assert not second.samples.flags.writeable
+        assert np.array_equal(first.samples, samples) and np.array_equal(second.samples, samples)
+        assert second.sample_count == 32000
+        assert second.duration == 2.0
+        assert sorted(os.listdir(tmp_path)) == ["abc.npy"]
+
+    def test_decode_uses_faster_whisper_decoder(self, tmp_path, monkeypatch):
+        """按内容哈希缓存 faster-whisper 解码的 16 kHz 采样"""
+        import faster_whisper.audio
+
+        decode = Mock(return_value=np.zeros(1600, dtype=np.float32))
+        monkeypatch.setattr(faster_whisper.audio, "decode_audio", decode)
+
+        decoded = decode_cached_audio("/tmp/upload-1.mp3", "sha", cache_dir=str(tmp_path))
+        again = decode_cached_audio("/tmp/upload-2.mp3", "sha", cache_dir=str(tmp_path))
+
+        decode.assert_called_once_with("/tmp/upload-1.mp3", sampling_rate=16000)
+        assert decoded.path == again.path == str(cache_path("sha", str(tmp_path)))
+
+    def test_unreadable_entry_is_discarded(self, tmp_path):
+        """损坏的缓存文件被删除并视为未命中"""
+        cache_path("bad", str(tmp_path)).write_bytes(b"not a npy file")
+
+        assert load_cached_audio("bad", cache_dir=str(tmp_path)) is None
+        assert not cache_path("bad", str(tmp_path)).exists()
+
+    def test_remove_expired_keeps_recently_used(self, tmp_path):
+        """超过 TTL 未使用的条目被删除，读取会刷新修改时间"""
+        for key in ("old", "used"):
+            get_or_create_audio(key, lambda: np.zeros(10, dtype=np.float32), cache_dir=str(tmp_path))
+            stale = time.time() - 7200
+            os.utime(cache_path(key, str(tmp_path)), (stale, stale))
+        load_cached_audio("used", cache_dir=str(tmp_path))
+
+        assert remove_expired_audio(ttl_seconds=3600, cache_dir=str(tmp_path)) == 1
+        assert sorted(os.listdir(tmp_path)) == ["used.npy"]
+        assert remove_expired_audio(ttl_seconds=3600, cache_dir=str(tmp_path / "missing")) == 0
+
+    def test_write_evicts_least_recently_used_beyond_budget(self, tmp_path, monkeypatch):
+        """写入后总大小超过上限时先删除最久未使用的条目，刚写入的条目保留"""
+        from src.utils import audio_cache
+
+        entry_bytes = None
+        for age, key in ((300, "a"), (200, "b"), (100, "c")):
+            get_or_create_audio(key, lambda: np.zeros(1000, dtype=np.float32), cache_dir=str(tmp_path))
+            stamp = time.time() - age
+            os.utime(cache_path(key, str(tmp_path)), (stamp, stamp))
+            entry_bytes = cache_path(key, str(tmp_path)).stat().st_size
+        load_cached_audio("a", cache_dir=str(tmp_path))
+        monkeypatch.setattr(audio_cache, "DECODED_AUDIO_MAX_BYTES", 3 * entry_bytes)
+
+        get_or_create_audio("d", lambda: np.zeros(1000, dtype=np.float32), cache_dir=str(tmp_path))
+
+        assert sorted(os.listdir(tmp_path)) == ["a.npy", "c.npy", "d.npy"]
+
+    def test_size_limit_keeps_new_entry_and_skips_partial_files(self, tmp_path):
+        """单个条目超过上限时仍保留；写入中的临时文件不参与淘汰，上限为 0 时不限制"""
+        for key in ("old", "new"):
+            get_or_create_audio(key, lambda: np.zeros(1000, dtype=np.float32), cache_dir=str(tmp_path))
+        stale = time.time() - 60
+        os.utime(cache_path("old", str(tmp_path)), (stale, stale))
+        (tmp_path / "other.123.partial.npy").write_bytes(b"x" * 10000)
+
+        assert enforce_size_limit(max_bytes=0, cache_dir=str(tmp_path)) == 0
+        assert enforce_size_limit(max_bytes=10, cache_dir=str(tmp_path), keep=cache_path("new", str(tmp_path))) == 1
+        assert sorted(os.listdir(tmp_path)) == ["new.npy", "other.123.partial.npy"]
@@ -7,24 +7,25 @@ import tempfile
 import os
 from unittest.mock import patch, Mock, MagicMock
 from fastapi import status
-from io import BytesIO
+from io import BytesIO, StringIO
 
 
 class TestConvertEndpoints:
     """转换相关端点测试"""
     
-    @patch('src.routers.convert.convert_semaphore')
+    @patch('src.routers.convert.convert_queue')
     @patch('src.routers.convert.Process')
     @patch('src.routers.convert.Manager')
     @patch('src.routers.convert.Queue')
     @patch('src.routers.convert.get_supported_formats')
     def test_start_video_conversion_success(
-        self, mock_get_formats, mock_queue, mock_manager, mock_process, mock_semaphore,
+        self, mock_get_formats, mock_queue, mock_manager, mock_process, mock_convert_queue,
         client, sample_video_file
     ):
         """测试启动视频转换任务成功"""
         # 设置mock
-        mock_semaphore.acquire.return_value = True
+        mock_convert_queue.is_full.return_value = False
+        mock_convert_queue.submit.return_value = 0
         mock_get_formats.return_value = ['mp3', 'wav', 'ogg', 'aac']
         mock_manager_instance = Mock()
         mock_manager.return_value = mock_manager_instance
@@ -45,12 +46,12 @@ class TestConvertEndpoints:
         assert data["status"] == "started"
         assert data["message"] == "视频转音频任务已启动"
     
-    @patch('src.routers.convert.convert_semaphore')
-    def test_start_conversion_concurrent_limit(
-        self, mock_semaphore, client, sample_video_file
+    @patch('src.routers.convert.convert_queue')
+    def test_start_conversion_queue_full(
+        self, mock_convert_queue, client, sample_video_file
     ):
-        """测试并发限制"""
-        mock_semaphore.acquire.return_value = False
+        """测试排队队列已满时返回429"""
+        mock_convert_queue.is_full.return_value = True
         
         response = client.post(
             "/convert/", 
@@ -59,7 +60,54 @@ class TestConvertEndpoints:
         )
         
         assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
-        assert "Too many concurrent conversion requests" in response.json()["detail"]
+        assert "Conversion queue is full" in response.json()["detail"]
+    
+    def test_upload_chunk_queue_full_after_assembly(self, client, tmp_path):
+        """最后一片合并后队列已满：返回429并清理分片目录与上传记录"""
+        from src.routers import convert
+        from src.utils.admission_queue import QueueFullError
+
+        chunk_tasks_before = dict(convert.chunk_upload_tasks)
+        active_tasks_before = dict(convert.active_convert_tasks)
+        with patch.object(convert, 'chunk_upload_base_dir', tmp_path), \
+             patch.object(convert, 'convert_queue') as mock_queue:
+            mock_queue.is_full.return_value = False
+            mock_queue.submit.side_effect = QueueFullError("full")
+            response = client.post(
+                "/convert/upload_chunk",
+                files={"chunk": ("0.part", BytesIO(b"video"), "application/octet-stream")},
+                data={"chunk_index": "0", "total_chunks": "1"},
+            )
+
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert list(tmp_path.iterdir()) == []
+        assert convert.chunk_upload_tasks == chunk_tasks_before
+        assert convert.active_convert_tasks == active_tasks_before
+
+    @patch('src.routers.convert.convert_queue')
+    def test_start_conversion_queued(
+        self, mock_convert_queue, client, sample_video_file
+    ):
+        """测试运行槽位已满时任务进入队列"""
+        mock_convert_queue.is_full.return_value = False
+        mock_convert_queue.submit.return_value = 3
+        
+        response = client.post(
+            "/convert/",
+            files=sample_video_file,
+            data={"format": "mp3", "quality": "medium"}
+        )
+        
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["status"] == "queued"
+        assert data["queue_position"] == 3
+        
+        # 清理排队任务留下的暂存文件
+        from src.routers.convert import active_convert_tasks
+        task_info = active_convert_tasks.pop(data["task_id"])
+        assert task_info["task"].status == "queued"
+        os.remove(task_info["temp_file"])
     
     @patch('src.routers.convert.get_supported_formats')
     def test_start_conversion_unsupported_format(
@@ -543,28 +591,38 @@ class TestFFmpegUtils:
         mock_get_info.return_value = {"format": {"duration": "10.0"}}
         mock_getsize.return_value = 1024
         
-        # 模拟进程 - 简化处理，直接让poll()返回0跳过while循环
+        # 模拟进程 - stdout 为 -progress 的 key=value 报告，stderr 只有少量日志
         mock_process = Mock()
-        mock_process.poll.return_value = 0  # 直接返回0，跳过while循环
         mock_process.returncode = 0
-        mock_process.communicate.return_value = ("", "")
-        # 即使跳过while循环，也需要mock stderr.readline以防万一
-        mock_stderr = Mock()
-        mock_stderr.readline.return_value = ""
-        mock_process.stderr = mock_stderr
+        mock_process.wait.return_value = 0
+        mock_process.stdout = StringIO(
+            "out_time_us=5000000\ntotal_size=4096\nspeed=25.0x\nprogress=continue\n"
+            "out_time_us=10000000\ntotal_size=8192\nspeed=26.5x\nprogress=end\n"
+        )
+        mock_process.stderr = StringIO("Input #0, mov,mp4,m4a,3gp,3g2,mj2\n")
         mock_popen.return_value = mock_process
+        progress_callback = Mock()
+        stats_callback = Mock()
         
         # 执行转换
         success, message = convert_video_to_audio(
             input_path="/tmp/input.mp4",
             output_path="/tmp/output.mp3",
             format="mp3",
-            quality="medium"
+            quality="medium",
+            progress_callback=progress_callback,
+            stats_callback=stats_callback
         )
         
         # 验证结果
         assert success is True
         assert "Successfully converted to MP3" in message
+        cmd = mock_popen.call_args.args[0]
+        assert cmd[:4] == ['ffmpeg', '-nostats', '-progress', 'pipe:1']
+        assert [call.args[0] for call in progress_callback.call_args_list] == [50, 100]
+        assert stats_callback.call_args.args[0] == {
+            "progress": 100, "out_time_seconds": 10.0, "encode_speed": 26.5, "output_bytes": 8192
+        }
     
     @patch('src.utils.ffmpeg_utils.check_ffmpeg_installed')
     def test_convert_video_to_audio_no_ffmpeg(self, mock_check_ffmpeg):
@@ -627,4 +685,172 @@ class TestFFmpegUtils:
         # 验证结果
         assert success is False
         assert "Conversion error" in message
-        assert "Invalid codec" in message 
\ No newline at end of file
+        assert "Invalid codec" in message 
+
+class TestFFmpegProbe:
+    """ffmpeg 可用性检查与单次 ffprobe 探测测试"""
+
+    PROBE = {"format": {"duration": "10.0"}, "streams": [{"codec_type": "audio"}]}
+
+    @pytest.fixture(autouse=True)
+    def fresh_caches(self, monkeypatch):
+        """每个测试重新检查 ffmpeg 是否可用"""
+        from src.utils import ffmpeg_utils
+
+        monkeypatch.setattr(ffmpeg_utils, "_ffmpeg_available", None)
+        return ffmpeg_utils
+
+    def test_ffmpeg_check_runs_once_per_process(self, fresh_caches):
+        """ffmpeg -version 每个进程只运行一次"""
+        with patch('src.utils.ffmpeg_utils.subprocess.run', return_value=Mock(returncode=0)) as mock_run:
+            assert all(fresh_caches.check_ffmpeg_installed() for _ in range(3))
+
+        assert [call.args[0] for call in mock_run.call_args_list] == [['ffmpeg', '-version']]
+
+    def test_missing_ffprobe_is_not_spawned(self, fresh_caches, tmp_path):
+        """PATH 中没有 ffprobe 时不启动子进程；验证结果说明缺少 ffprobe"""
+        media = tmp_path / "video.mp4"
+        media.write_bytes(b"frames")
+
+        with patch('src.utils.ffmpeg_utils.shutil.which', return_value=None), \
+             patch('src.utils.ffmpeg_utils.subprocess.run') as mock_run:
+            assert fresh_caches.get_video_info(str(media)) is None
+            assert fresh_caches.validate_video_file(str(media)) == (False, "FFprobe not installed or not found in PATH")
+
+        mock_run.assert_not_called()
+
+    def test_convert_worker_probes_once(self, fresh_caches, tmp_path, sample_task_id):
+        """转换任务只运行一次 ffprobe，探测结果传给验证与转换"""
+        import json
+        from queue import Queue
+        from src.workers.convert_worker import convert_worker
+
+        media = tmp_path / "video.mp4"
+        media.write_bytes(b"frames")
+
+        def fake_convert(input_path, output_path, format, quality, progress_callback, video_info, stats_callback):
+            assert video_info == self.PROBE
+            with open(output_path, "wb") as output:
+                output.write(b"audio")
+            return True, "ok"
+
+        with patch('src.utils.ffmpeg_utils.shutil.which', return_value="/usr/bin/ffprobe"), \
+             patch('src.utils.ffmpeg_utils.subprocess.run', return_value=Mock(returncode=0, stdout=json.dumps(self.PROBE))) as mock_run, \
+             patch('src.workers.convert_worker.convert_video_to_audio', side_effect=fake_convert):
+            result_queue = Queue()
+            convert_worker(str(media), "mp3", "medium", result_queue, {}, sample_task_id)
+
+        result = result_queue.get()
+        os.remove(result["output_path"])
+        assert result["status"] == "completed"
+        assert [call.args[0][0] for call in mock_run.call_args_list] == ["ffprobe"]
+        assert mock_run.call_args.args[0][-1] == str(media)
+
+
+class TestFFmpegProgressChannel:
+    """ffmpeg -progress 报告解析、stderr 环形缓冲与编码统计测试"""
+
+    def test_iter_progress_blocks(self):
+        """key=value 行按 progress= 分组，空行和不完整的最后一组被忽略"""
+        from src.utils.ffmpeg_utils import iter_progress_blocks
+
+        lines = [
+            "frame=0\n", "out_time_us=1000000\n", "progress=continue\n", "\n",
+            "out_time_us=2000000\n", "progress=end\n", "out_time_us=3000000\n",
+        ]
+        blocks = list(iter_progress_blocks(lines))
+        assert blocks == [
+            {"frame": "0", "out_time_us": "1000000", "progress": "continue"},
+            {"out_time_us": "2000000", "progress": "end"},
+        ]
+
+    def test_progress_stats(self):
+        """计算进度、已编码时长、编码速度和输出字节数；N/A 与缺失总时长时为 None"""
+        from src.utils.ffmpeg_utils import progress_stats
+
+        stats = progress_stats(
+            {"out_time_us": "30000000", "speed": "12.5x", "total_size": "524288", "progress": "continue"}, 120.0
+        )
+        assert stats == {"progress": 25, "out_time_seconds": 30.0, "encode_speed": 12.5, "output_bytes": 524288}
+
+        stats = progress_stats({"out_time_us": "N/A", "speed": "N/A", "total_size": "N/A", "progress": "continue"})
+        assert stats == {"progress": None, "out_time_seconds": None, "encode_speed": None, "output_bytes": None}
+
+        # 旧版 ffmpeg 只有 out_time_ms（单位同样是微秒）；progress=end 即 100%
+        stats = progress_stats({"out_time_ms": "-5000", "progress": "end"}, 10.0)
+        assert (stats["progress"], stats["out_time_seconds"]) == (100, 0.0)
+
+    @patch('src.utils.ffmpeg_utils.check_ffmpeg_installed', return_value=True)
+    @patch('src.utils.ffmpeg_utils.os.path.exists', return_value=True)
+    @patch('src.utils.ffmpeg_utils.get_video_info', return_value={"format": {"duration": "10.0"}})
+    @patch('src.utils.ffmpeg_utils.subprocess.Popen')
+    def test_stderr_kept_in_bounded_tail(self, mock_popen, mock_get_info, mock_exists, mock_check_ffmpeg, monkeypatch):
+        """失败时错误信息只包含 stderr 的最后几行"""
+        from src.utils import ffmpeg_utils
+
+        monkeypatch.setattr(ffmpeg_utils, "FFMPEG_STDERR_TAIL_LINES", 3)
+        mock_process = Mock()
+        mock_process.returncode = 1
+        mock_process.stdout = StringIO("progress=end\n")
+        mock_process.stderr = StringIO("".join(f"warning {i}\n" for i in range(10000)) + "Invalid data\n")
+        mock_popen.return_value = mock_process
+
+        success, message = ffmpeg_utils.convert_video_to_audio("/tmp/input.mp4", "/tmp/output.mp3")
+
+        assert success is False
+        assert message == "FFmpeg conversion failed: warning 9998\nwarning 9999\nInvalid data\n"
+
+    def test_convert_worker_publishes_encode_stats(self, tmp_path, sample_task_id):
+        """转换进行中编码统计写入 progress_dict，完成后随结果返回"""
+        from queue import Queue
+        from src.workers.convert_worker import convert_worker, stats_key
+
+        media = tmp_path / "video.mp4"
+        media.write_bytes(b"frames")
+        progress_dict = {}
+        published = []
+
+        def fake_convert(input_path, output_path, format, quality, progress_callback, video_info, stats_callback):
+            for seconds, speed in ((5.0, None), (10.0, 31.0)):
+                stats_callback({"progress": 50, "out_time_seconds": seconds, "encode_speed": speed, "output_bytes": 2048})
+                published.append(progress_dict[stats_key(sample_task_id)])
+            with open(output_path, "wb") as output:
+                output.write(b"audio")
+            return True, "ok"
+
+        with patch('src.workers.convert_worker.get_video_info', return_value={"format": {"duration": "10.0"}}), \
+             patch('src.workers.convert_worker.validate_video_file', return_value=(True, "ok")), \
+             patch('src.workers.convert_worker.convert_video_to_audio', side_effect=fake_convert):
+            result_queue = Queue()
+            convert_worker(str(media), "mp3", "medium", result_queue, progress_dict, sample_task_id)
+
+        result = result_queue.get()
+        os.remove(result["output_path"])
+        assert published[0] == {"out_time_seconds": 5.0, "encode_speed": None, "output_bytes": 2048}
+        assert result["encode_stats"] == {"out_time_seconds": 10.0, "encode_speed": 31.0, "output_bytes": 2048}
+
+    def test_status_includes_encode_stats(self, client, sample_task_id):
+        """运行中与已完成任务的状态都包含编码统计"""
+        from src.workers.convert_worker import stats_key
+
+        task = Mock(status="running")
+        running = {
+            "task": task, "filename": "video.mp4", "format": "mp3", "quality": "medium",
+            "progress_dict": {
+                sample_task_id: 40,
+                stats_key(sample_task_id): {"out_time_seconds": 4.0, "encode_speed": 20.0, "output_bytes": 1024},
+            },
+        }
+        with patch.dict('src.routers.convert.active_convert_tasks', {sample_task_id: running}):
+            data = client.get(f"/convert/{sample_task_id}/status").json()
+        assert (data["progress"], data["out_time_seconds"], data["encode_speed"], data["output_bytes"]) == (
+            40, 4.0, 20.0, 1024
+        )
+
+        completed = {
+            "status": "completed", "format": "mp3", "quality": "medium", "file_size": 2048,
+            "encode_stats": {"out_time_seconds": 10.0, "encode_speed": 25.0, "output_bytes": 2048},
+        }
+        with patch.dict('src.routers.convert.convert_results', {sample_task_id: completed}):
+            data = client.get(f"/convert/{sample_task_id}/status").json()
+        assert (data["out_time_seconds"], data["encode_speed"], data["output_bytes"]) == (10.0, 25.0, 2048)
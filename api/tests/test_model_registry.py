@@ -0,0 +1,74 @@
+"""
+测试模型档位注册表
+"""
+import json
+import pytest
+
+from src.utils.model_registry import ModelRegistry, ModelSelectionError, load_model_registry
+
+
+CONFIG = {
+    "default": "small",
+    "tiers": {
+        "small": {"model": "small", "max_concurrent": 4, "compute_types": ["int8", "float32"]},
+        "large": {"model": "large-v3", "max_concurrent": 1, "default_compute_type": "int8_float16"},
+    },
+}
+
+
+class TestModelRegistry:
+    """注册表解析与校验测试"""
+
+    def test_resolve_default_and_explicit_tiers(self):
+        """未指定模型时使用默认档位，指定时返回对应档位"""
+        registry = ModelRegistry.from_config(CONFIG)
+
+        tier, compute_type = registry.resolve()
+        assert tier.name == "small"
+        assert compute_type is None
+
+        tier, compute_type = registry.resolve("large")
+        assert tier.model == "large-v3"
+        assert tier.max_concurrent == 1
+        assert compute_type == "int8_float16"
+
+    def test_rejects_unknown_model_and_compute_type(self):
+        """不在注册表中的模型或计算类型被拒绝"""
+        registry = ModelRegistry.from_config(CONFIG)
+
+        with pytest.raises(ModelSelectionError, match="Allowed models: small, large"):
+            registry.resolve("huge")
+        with pytest.raises(ModelSelectionError, match="compute_type"):
+            registry.resolve("small", "float16")
+        assert registry.resolve("small", "float32")[1] == "float32"
+
+    def test_invalid_config_rejected(self):
+        """配置中的默认档位或计算类型无效时报错"""
+        with pytest.raises(ValueError):
+            ModelRegistry.from_config({"default": "missing", "tiers": CONFIG["tiers"]})
+        with pytest.raises(ValueError):
+            ModelRegistry.from_config({"tiers": {"x": {"compute_types": ["int3"]}}})
+
+    def test_load_from_env_and_file(self, monkeypatch, tmp_path):
+        """可通过环境变量内联 JSON 或配置文件加载"""
+        monkeypatch.setenv("WHISPER_MODEL_REGISTRY", json.dumps(CONFIG))
+        assert set(load_model_registry().tiers) == {"small", "large"}
+
+        path = tmp_path / "models.json"
+        path.write_text(json.dumps({"tiers": {"tiny": {"max_concurrent": 2}}}), encoding="utf-8")
+        monkeypatch.delenv("WHISPER_MODEL_REGISTRY")
+        monkeypatch.setenv("WHISPER_MODEL_REGISTRY_FILE", str(path))
+        registry = load_model_registry()
+        assert registry.default == "tiny"
+        assert registry.default_tier.model == "tiny"
+
+    def test_builtin_tiers(self, monkeypatch):
+        """未配置时提供内置档位，默认 large-v3"""
+        monkeypatch.delenv("WHISPER_MODEL_REGISTRY", raising=False)
+        monkeypatch.delenv("WHISPER_MODEL_REGISTRY_FILE", raising=False)
+        monkeypatch.delenv("WHISPER_DEFAULT_MODEL", raising=False)
+
+        registry = load_model_registry()
+
+        assert registry.default == "large-v3"
+        assert {"tiny", "small", "medium", "large-v3", "distil-large-v3"} <= set(registry.tiers)
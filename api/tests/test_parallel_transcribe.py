@@ -0,0 +1,154 @@
+"""
+测试长音频静音切分并行转录
+"""
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from unittest.mock import patch
+
+from src.workers import parallel_transcribe as pt
+
+SR = pt.SAMPLE_RATE
+
+
+class TestChooseSplitPoints:
+    """切分点选择测试"""
+
+    def test_cuts_in_silence_closest_to_equal_boundaries(self):
+        """切分点落在最接近等分位置的静音区间中点"""
+        speech = [
+            {"start": 0, "end": 9 * SR},
+            {"start": 11 * SR, "end": 28 * SR},
+            {"start": 32 * SR, "end": 60 * SR},
+        ]
+
+        points = pt.choose_split_points(speech, 60 * SR, 2)
+
+        # 理想切分点为 30s，最近的静音为 28s-32s
+        assert points == [30 * SR]
+
+    def test_drops_boundaries_without_silence(self):
+        """没有足够的静音区间时返回更少的切分点"""
+        speech = [{"start": 0, "end": 20 * SR}, {"start": 21 * SR, "end": 60 * SR}]
+
+        assert pt.choose_split_points(speech, 60 * SR, 4) == [int(20.5 * SR)]
+        assert pt.choose_split_points(speech[:1], 60 * SR, 4) == []
+
+    def test_points_are_strictly_increasing(self):
+        """多个切分点严格递增，不会产生空片段"""
+        speech = [{"start": i * 10 * SR, "end": (i * 10 + 9) * SR} for i in range(12)]
+
+        points = pt.choose_split_points(speech, 120 * SR, 4)
+
+        assert len(points) == 3
+        assert points == sorted(set(points))
+
+
+class TestTranscribeParallel:
+    """并行转录与结果拼接测试"""
+
+    @pytest.fixture
+    def fake_chunk_model(self, monkeypatch):
+        """用线程池代替进程池，用假模型返回每个片段内的相对时间戳"""
+        class FakeChunkModel:
+            def transcribe(self, audio, language=None, **kwargs):
+                length = len(audio) / SR
+                words = None
+                if kwargs.get("word_timestamps"):
+                    words = [SimpleNamespace(word=f"{language}-a", start=0.5, end=1.0, probability=0.9)]
+                segments = [
+                    SimpleNamespace(start=0.5, end=length / 2, text=f"{language}-a", words=words),
+                    SimpleNamespace(start=length / 2, end=length - 0.5, text=f"{language}-b", words=None),
+                ]
+                return iter(segments), SimpleNamespace(language=language)
+
+        monkeypatch.setattr(pt, "_chunk_model", FakeChunkModel())
+        executor = ThreadPoolExecutor(max_workers=2)
+        self.submitted = []
+
+        class RecordingExecutor:
+            def submit(inner, fn, *args):
+                self.submitted.append(args)
+                return executor.submit(fn, *args)
+
+        monkeypatch.setattr(pt, "_start_executor", lambda num_workers, model_name, compute_type=None: RecordingExecutor())
+        self.shutdowns = 0
+
+        def shutdown():
+            self.shutdowns += 1
+
+        monkeypatch.setattr(pt, "shutdown_executor", shutdown)
+        yield
+        executor.shutdown()
+
+    def test_stitches_segments_with_offsets(self, fake_chunk_model):
+        """各片段的时间戳按切分偏移量修正后按顺序拼接"""
+        audio = np.zeros(60 * SR, dtype=np.float32)
+        main_model = SimpleNamespace(detect_language=lambda audio: ("zh", 0.99, []))
+
+        with patch("faster_whisper.audio.decode_audio", return_value=audio), \
+             patch.object(pt, "split_audio_at_silence", return_value=[(0, 20 * SR), (20 * SR, 60 * SR)]):
+            segments, info = pt.transcribe_parallel(
+                main_model, "/tmp/long.wav", None, {"vad_filter": True}, num_workers=2, min_duration=30
+            )
+            stitched = list(segments)
+
+        assert info.language == "zh"
+        assert info.duration == 60
+        assert info.chunks == 2
+        assert [(s.start, s.end, s.text) for s in stitched] == [
+            (0.5, 10.0, "zh-a"),
+            (10.0, 19.5, "zh-b"),
+            (20.5, 40.0, "zh-a"),
+            (40.0, 59.5, "zh-b"),
+        ]
+
+    def test_word_timestamps_are_shifted_by_chunk_offset(self, fake_chunk_model):
+        """词级时间戳同样按切分偏移量修正"""
+        audio = np.zeros(60 * SR, dtype=np.float32)
+
+        with patch("faster_whisper.audio.decode_audio", return_value=audio), \
+             patch.object(pt, "split_audio_at_silence", return_value=[(0, 20 * SR), (20 * SR, 60 * SR)]):
+            segments, _ = pt.transcribe_parallel(
+                None, "/tmp/long.wav", "en", {"word_timestamps": True}, num_workers=2, min_duration=30
+            )
+            stitched = list(segments)
+
+        assert [tuple(w) for w in stitched[2].words] == [("en-a", 20.5, 21.0, 0.9)]
+        assert stitched[1].words is None
+
+    def test_short_audio_falls_back(self, fake_chunk_model):
+        """短于阈值的音频返回 None，由调用方按顺序转录"""
+        audio = np.zeros(10 * SR, dtype=np.float32)
+
+        with patch("faster_whisper.audio.decode_audio", return_value=audio):
+            assert pt.transcribe_parallel(None, "/tmp/short.wav", "zh", {}, num_workers=2, min_duration=30) is None
+
+    def test_chunks_read_from_npy_file_and_processes_stop_after_job(self, fake_chunk_model, tmp_path):
+        """子进程收到 .npy 路径与采样区间而非数组；缓存条目直接复用，任务结束后停止子进程"""
+        cached = tmp_path / "sha.npy"
+        np.save(cached, np.zeros(60 * SR, dtype=np.float32))
+        audio = np.load(cached, mmap_mode="r")
+
+        with patch.object(pt, "split_audio_at_silence", return_value=[(0, 20 * SR), (20 * SR, 60 * SR)]):
+            segments, _ = pt.transcribe_parallel(None, audio, "zh", {}, num_workers=2, min_duration=30)
+            assert self.shutdowns == 0
+            assert len(list(segments)) == 4
+
+        assert [args[:3] for args in self.submitted] == [(str(cached), 0, 20 * SR), (str(cached), 20 * SR, 60 * SR)]
+        assert self.shutdowns == 1
+        assert cached.exists()
+
+    def test_in_memory_audio_is_written_once_and_removed(self, fake_chunk_model):
+        """内存中的数组写入一个临时 .npy 供所有子进程映射，任务结束后删除"""
+        import os
+
+        with patch("faster_whisper.audio.decode_audio", return_value=np.zeros(60 * SR, dtype=np.float32)), \
+             patch.object(pt, "split_audio_at_silence", return_value=[(0, 20 * SR), (20 * SR, 60 * SR)]):
+            segments, _ = pt.transcribe_parallel(None, "/tmp/long.wav", "zh", {}, num_workers=2, min_duration=30)
+            audio_file = self.submitted[0][0]
+            assert os.path.exists(audio_file) and {args[0] for args in self.submitted} == {audio_file}
+            list(segments)
+
+        assert not os.path.exists(audio_file)
@@ -0,0 +1,148 @@
+"""
+規則標點引擎測試：與舊版 add_chinese_punctuation / clean_punctuation_combinations（逐條 re.sub，原樣複製於下）的輸出比對
+"""
+import random
+
+import pytest
+
+from src.utils.punctuation_rules import (
+    CONJUNCTIONS,
+    CONTINUING_PHRASES,
+    QUESTION_WORDS,
+    TRANSITIONS,
+    add_chinese_punctuation,
+    clean_punctuation_combinations,
+)
+
+
+# 舊版實作（transcribe_worker.add_chinese_punctuation / clean_punctuation_combinations），僅用於比對
+
+def _legacy_add_chinese_punctuation(text: str, language: str) -> str:
+    """为中文文本添加基本标点符号 - 简化版本"""
+    if not text or language not in ['zh', 'chinese']:
+        return text
+    
+    import re
+    
+    # 移除多余空格
+    text = re.sub(r'\s+', '', text.strip())
+    
+    # 如果文本已经有足够的标点符号，直接返回
+    punctuation_count = len(re.findall(r'[。！？，、；：]', text))
+    text_length = len(text)
+    if punctuation_count > 0 and (punctuation_count / text_length) > 0.02:
+        return _legacy_clean_punctuation_combinations(text)
+    
+    # 简单的规则：只在明确的语言标记处添加标点
+    # 疑问词后加问号
+    text = re.sub(r'(什么|为什么|怎么|哪里|哪儿|谁|何时|如何|是否|吗|呢)(?![。！？，、；：])', r'\1？', text)
+    
+    # 语气词后加逗号（但不在句子末尾，且只在句子开头）
+    text = re.sub(r'^(那|这)(?=.{5,})(?![。！？，、；：])', r'\1，', text)
+    
+    # 连接词前加逗号（在句子中间）
+    text = re.sub(r'(.{3,})(所以|因为|如果|就是|也就是说)(?=.{3,})(?![。！？，、；：])', r'\1，\2', text)
+    
+    # 转折词前加逗号
+    text = re.sub(r'(.{3,})(但是|不过|然而|可是|而且|另外|同时|接着|然后)(?![。！？，、；：])', r'\1，\2', text)
+    
+    # 在句子结尾添加句号（如果没有其他标点）
+    if not re.search(r'[。！？]$', text):
+        text += '。'
+    
+    # 清理不合理的标点符号组合
+    text = _legacy_clean_punctuation_combinations(text)
+    
+    return text
+
+
+def _legacy_clean_punctuation_combinations(text: str) -> str:
+    """清理不合理的标点符号组合"""
+    import re
+    
+    # 清理连续的标点符号组合
+    text = re.sub(r'，。', '。', text)  # 逗号后跟句号 -> 句号
+    text = re.sub(r'。，', '。', text)  # 句号后跟逗号 -> 句号
+    text = re.sub(r'，，+', '，', text)  # 多个逗号 -> 单个逗号
+    text = re.sub(r'。。+', '。', text)  # 多个句号 -> 单个句号
+    
+    # 清理短语后不合理的标点符号
+    text = re.sub(r'(会|也会|可能会|应该|就是|这样|那个)。(?=.)', r'\1，', text)  # 短语后的句号改为逗号
+    
+    # 移除句子开头的逗号
+    text = re.sub(r'^，', '', text)
+    
+    # 移除句子结尾多余的逗号
+    text = re.sub(r'，$', '。', text)
+    
+    # 清理连接词后的重复逗号
+    text = re.sub(r'(然后|但是|而且|所以)，，', r'\1，', text)
+    
+    return text
+
+
+# 固定語料：涵蓋各條規則及其互相影響的情形
+GOLDEN_CORPUS = [
+    "你好吧这是测试",
+    "这是什么东西",
+    "为什么你不来呢",
+    "因为什么原因他没有来所以我们就先走了",
+    "那我们今天就先讨论到这里",
+    "这个问题我们应该怎么处理呢",
+    "我觉得也就是说这个方案可以但是成本太高了",
+    "如何时间安排得好一点就是否能提前完成",
+    "然而且不过我们还是要继续",
+    "他说会。然后我们就走了",
+    "可能会。。，，你知道吗",
+    "，，我们先开始吧。",
+    "今天天气很好，。我们出去玩吧。，",
+    "然后，，但是，，而且",
+    "好的谁",
+    "  这 是  一个\t带空格的\n句子  ",
+    "同时何时接着另外如果",
+    "我们那个。这样。应该。就是。",
+    "",
+    " ",
+    "吗",
+    "那吗",
+    "这谁谁谁谁",
+]
+
+
+@pytest.mark.parametrize("text", GOLDEN_CORPUS)
+def test_matches_legacy_on_golden_corpus(text):
+    """固定語料上與舊版逐條 re.sub 結果一致"""
+    assert add_chinese_punctuation(text, "zh") == _legacy_add_chinese_punctuation(text, "zh")
+    assert clean_punctuation_combinations(text) == _legacy_clean_punctuation_combinations(text)
+
+
+_VOCABULARY = (
+    list(QUESTION_WORDS) + list(CONJUNCTIONS) + list(TRANSITIONS) + list(CONTINUING_PHRASES)
+    + ["那", "这", "我们", "今天", "问题", "可以", "，", "。", "，，", "。。", "！", "？", "、", " ", "\n"]
+)
+
+
+def _random_text(rng):
+    words = [rng.choice(_VOCABULARY) for _ in range(rng.randint(0, 30))]
+    return "".join(words)
+
+
+def test_matches_legacy_on_random_texts():
+    """隨機組合關鍵詞、標點與空白（固定種子），結果與舊版一致"""
+    rng = random.Random(20240917)
+    for _ in range(5000):
+        text = _random_text(rng)
+        assert add_chinese_punctuation(text, "zh") == _legacy_add_chinese_punctuation(text, "zh"), text
+        assert clean_punctuation_combinations(text) == _legacy_clean_punctuation_combinations(text), text
+
+
+def test_long_sparse_paragraph_matches_legacy():
+    """500 字以上、標點稀少的段落（舊版回溯最嚴重的情形）結果一致"""
+    rng = random.Random(7)
+    text = "".join(rng.choice(["我们", "今天", "讨论", "项目", "所以", "但是", "什么", "进展"]) for _ in range(260))
+    assert add_chinese_punctuation(text, "zh") == _legacy_add_chinese_punctuation(text, "zh")
+
+
+def test_non_chinese_text_unchanged():
+    assert add_chinese_punctuation("hello world", "en") == "hello world"
+    assert add_chinese_punctuation("你好", None) == "你好"
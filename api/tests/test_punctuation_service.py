@@ -0,0 +1,185 @@
+"""
+共享標點服務測試：微批次收集、逐請求拆分結果、客戶端與服務進程
+"""
+import asyncio
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+import pytest
+
+from src.workers.punctuation_service import (
+    PunctuationClient,
+    PunctuationService,
+    collect_batch,
+    run_batch,
+    serve,
+)
+
+
+class _RecordingRestorer:
+    """在每個文本後加句號，並記錄每批的文本數"""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def punctuate_many(self, texts):
+        self.batch_sizes.append(len(texts))
+        return [text + "。" for text in texts]
+
+
+class _FailingRestorer:
+    def punctuate_many(self, texts):
+        raise RuntimeError("boom")
+
+
+def _make_restorer():
+    # 服務進程中調用（spawn 後需可導入）
+    return _RecordingRestorer()
+
+
+def _crash_on_start():
+    # 模擬服務進程啟動後立即崩潰
+    os._exit(1)
+
+
+def _wait_until(condition, timeout=30):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.05)
+
+
+def test_requests_from_several_clients_share_one_batch():
+    """多個客戶端的請求合併為一批推理，各自收到自己的結果"""
+    requests, responses = queue.Queue(), [queue.Queue() for _ in range(3)]
+    requests.put((0, "a", ["你好", "今天"]))
+    requests.put((2, "b", ["天氣"]))
+    requests.put((1, "c", ["很好"]))
+    requests.put(None)
+    restorer = _RecordingRestorer()
+
+    stats = serve(restorer, requests, responses, max_batch=16, max_wait_ms=50)
+
+    assert restorer.batch_sizes == [4]
+    assert stats == {"batches": 1, "requests": 3, "texts": 4}
+    assert responses[0].get_nowait() == ("a", ["你好。", "今天。"], None)
+    assert responses[1].get_nowait() == ("c", ["很好。"], None)
+    assert responses[2].get_nowait() == ("b", ["天氣。"], None)
+
+
+def test_batch_closes_at_max_batch_size_and_after_max_wait():
+    """文本數達到上限即開始推理；只有一個請求時最多等待 max_wait_ms"""
+    requests = queue.Queue()
+    for index in range(3):
+        requests.put((0, str(index), ["x", "y"]))
+
+    batch, stopping = collect_batch(requests, max_batch=4, max_wait_ms=1000)
+    assert [request_id for _, request_id, _ in batch] == ["0", "1"]
+    assert not stopping
+
+    batch, stopping = collect_batch(requests, max_batch=4, max_wait_ms=20)
+    assert [request_id for _, request_id, _ in batch] == ["2"]
+
+
+def test_batch_failure_is_reported_to_every_request():
+    """推理失敗時同一批的每個請求都收到錯誤"""
+    responses = [queue.Queue(), queue.Queue()]
+    run_batch(_FailingRestorer(), [(0, "a", ["x"]), (1, "b", ["y"])], responses)
+
+    assert responses[0].get_nowait() == ("a", None, "boom")
+    assert responses[1].get_nowait() == ("b", None, "boom")
+
+
+def test_client_skips_stale_responses_and_raises_errors():
+    """客戶端跳過不屬於自己的響應（如重啟前的 worker 遺留的），服務錯誤轉為異常"""
+    requests, responses = queue.Queue(), queue.Queue()
+    client = PunctuationClient(requests, responses, client_id=0, timeout=5)
+
+    def service():
+        _, request_id, texts = requests.get()
+        responses.put(("stale-1", ["舊"], None))
+        responses.put((request_id, [text + "？" for text in texts], None))
+        _, request_id, _ = requests.get()
+        responses.put((request_id, None, "model unavailable"))
+
+    thread = threading.Thread(target=service)
+    thread.start()
+    assert client.punctuate_many(["為什麼"]) == ["為什麼？"]
+    with pytest.raises(RuntimeError, match="model unavailable"):
+        client.punctuate("你好")
+    thread.join()
+
+
+def test_service_process_serves_workers_and_api():
+    """服務進程同時應答 worker 客戶端與 API 的異步請求"""
+    service = PunctuationService(num_clients=1, max_wait_ms=5, restorer_factory=_make_restorer, timeout=60)
+    service.start()
+    try:
+        assert service.client(0).punctuate_many(["你好", "再見"]) == ["你好。", "再見。"]
+        assert asyncio.run(service.punctuate_many(["今天"])) == ["今天。"]
+    finally:
+        service.shutdown()
+    assert not service.running
+
+
+def test_client_fails_fast_when_service_restarts():
+    """等待應答期間服務代數改變（服務進程已退出）時立即放棄，不等到超時"""
+    generation = multiprocessing.Value("i", 0)
+    client = PunctuationClient(queue.Queue(), queue.Queue(), client_id=0, timeout=60, generation=generation, poll_interval=0.05)
+    threading.Timer(0.2, lambda: setattr(generation, "value", 1)).start()
+
+    started = time.monotonic()
+    with pytest.raises(RuntimeError, match="restarted"):
+        client.punctuate_many(["你好"])
+    assert time.monotonic() - started < 5
+
+    # 之後的請求直接失敗，不再送往舊隊列
+    with pytest.raises(RuntimeError, match="restarted"):
+        client.punctuate("再見")
+    assert client.request_queue.qsize() == 1
+
+
+def test_dead_service_process_is_restarted():
+    """服務進程被殺死後由看門狗重啟；舊客戶端失效，新客戶端與 API 請求照常應答"""
+    service = PunctuationService(
+        num_clients=1, max_wait_ms=5, restorer_factory=_make_restorer, timeout=60, watchdog_interval=0.1
+    )
+    service.start()
+    try:
+        old_client = service.client(0)
+        assert old_client.punctuate_many(["你好"]) == ["你好。"]
+        old_pid = service.process.pid
+
+        service.process.kill()
+        _wait_until(lambda: service.generation == 1 and service.running)
+
+        assert service.process.pid != old_pid
+        assert service.restarts == 1
+        with pytest.raises(RuntimeError, match="restarted"):
+            old_client.punctuate("你好")
+        assert service.client(0).punctuate_many(["今天"]) == ["今天。"]
+        assert asyncio.run(service.punctuate_many(["天氣"])) == ["天氣。"]
+    finally:
+        service.shutdown()
+    assert not service.running
+
+
+def test_service_not_restarted_after_repeated_crashes():
+    """服務進程啟動後接連崩潰超過 max_restarts 次時不再重啟，客戶端改用規則標點"""
+    service = PunctuationService(
+        num_clients=1, restorer_factory=_crash_on_start, timeout=60, watchdog_interval=0.1, max_restarts=1
+    )
+    service.start()
+    try:
+        client = service.client(0)
+        _wait_until(lambda: service.generation == 2 and not service._watchdog.is_alive())
+
+        assert service.restarts == 1
+        assert not service.running
+        with pytest.raises(RuntimeError, match="restarted"):
+            client.punctuate("你好")
+    finally:
+        service.shutdown()
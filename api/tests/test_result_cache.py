@@ -0,0 +1,69 @@
+"""
+测试转录结果缓存
+"""
+import os
+import time
+import pytest
+
+from src.utils.result_cache import TranscriptionCache, make_cache_key
+
+
+class TestMakeCacheKey:
+    """缓存键测试"""
+
+    def test_key_is_stable_and_option_sensitive(self):
+        """相同输入得到相同键，选项不同则键不同"""
+        key = make_cache_key("abc", language="zh", denoise=False)
+        assert key == make_cache_key("abc", denoise=False, language="zh")
+        assert key != make_cache_key("abc", language="en", denoise=False)
+        assert key != make_cache_key("abd", language="zh", denoise=False)
+
+
+class TestTranscriptionCache:
+    """转录缓存测试"""
+
+    def test_get_put_and_counters(self, tmp_path):
+        """写入后命中，未写入的键记为未命中"""
+        cache = TranscriptionCache(cache_dir=str(tmp_path), max_bytes=10_000, ttl_seconds=60)
+
+        assert cache.get("k1") is None
+        cache.put("k1", {"txt": "你好", "status": "completed"})
+        assert cache.get("k1") == {"txt": "你好", "status": "completed"}
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["entries"] == 1
+
+    def test_lru_eviction_by_size(self, tmp_path):
+        """超过容量时淘汰最久未使用的条目"""
+        payload = {"txt": "x" * 100}
+        cache = TranscriptionCache(cache_dir=str(tmp_path), max_bytes=300, ttl_seconds=60)
+
+        cache.put("a", payload)
+        cache.put("b", payload)
+        time.sleep(0.01)
+        cache.get("a")  # a 变为最近使用
+        cache.put("c", payload)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == payload
+        assert cache.get("c") == payload
+        assert cache.stats()["evictions"] == 1
+
+    def test_ttl_expiry(self, tmp_path):
+        """超过 TTL 的条目视为未命中并被删除"""
+        cache = TranscriptionCache(cache_dir=str(tmp_path), max_bytes=10_000, ttl_seconds=60)
+        cache.put("old", {"txt": "stale"})
+        old_time = time.time() - 120
+        os.utime(tmp_path / "old.json", (old_time, old_time))
+
+        assert cache.get("old") is None
+        assert not (tmp_path / "old.json").exists()
+
+    def test_index_survives_restart(self, tmp_path):
+        """新实例能读取已有的缓存条目"""
+        TranscriptionCache(cache_dir=str(tmp_path)).put("k", {"txt": "persisted"})
+
+        cache = TranscriptionCache(cache_dir=str(tmp_path))
+        assert cache.get("k") == {"txt": "persisted"}
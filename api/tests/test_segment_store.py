@@ -0,0 +1,61 @@
+"""
+列式 segment 存儲測試
+"""
+import random
+
+import pytest
+
+from src.utils.segment_store import SegmentStore, StringPool
+from src.utils.subtitle_renderer import SubtitleCue, WordTiming, compact_words, render_subtitles
+
+
+def test_string_pool_round_trips_across_blocks():
+    """跨越多個字符串塊（含未拼接的尾塊）按索引取回原字符串"""
+    rng = random.Random(3)
+    texts = ["".join(rng.choice("你好世界ab ") for _ in range(rng.randint(0, 12))) for _ in range(50)]
+    pool = StringPool(block_size=8)
+    for text in texts:
+        pool.append(text)
+
+    assert [pool[index] for index in range(len(texts))] == texts
+    assert pool.slice(5, 20) == texts[5:20]
+    assert pool[-1] == texts[-1]
+    with pytest.raises(IndexError):
+        pool[len(texts)]
+
+
+def test_cues_render_like_a_cue_list():
+    """從存儲生成的 cue 與逐段構建的 SubtitleCue 列表渲染結果一致（含詞級時間戳）"""
+    rng = random.Random(5)
+    store = SegmentStore(word_timestamps=True)
+    cues = []
+    for index in range(300):
+        start = index * 2.0005
+        words = [
+            WordTiming(f" 詞{n}", start + n * 0.1234, start + n * 0.1234 + 0.1, rng.random())
+            for n in range(rng.randint(0, 4))
+        ]
+        text = f"第{index}句"
+        store.append(start, start + 1.9994, text, words)
+        cues.append(SubtitleCue(start, start + 1.9994, text, text + "。", compact_words(words)))
+    store.set_outputs(0, [cue.subtitle for cue in cues], [cue.text for cue in cues])
+
+    formats = ("srt", "txt", "vtt", "json")
+    assert render_subtitles(store.cues(), "zh", formats) == render_subtitles(cues, "zh", formats)
+    assert list(store.starts[:2]) == [0.0, 2.0005]
+    assert store.lengths[10] == len("第10句")
+
+
+def test_outputs_must_be_recorded_in_order():
+    """輸出文本必須按 segment 順序連續寫入；未請求詞級時間戳時 words 為 None"""
+    store = SegmentStore()
+    for index in range(3):
+        store.append(index, index + 1, f"s{index}")
+
+    with pytest.raises(ValueError):
+        store.set_outputs(1, ["s1"], ["s1"])
+    store.set_outputs(0, ["s0", "s1"], ["t0", "t1"])
+
+    assert store.finalized == 2
+    assert [cue.text for cue in store.cues()] == ["t0", "t1"]
+    assert store.words(0) is None
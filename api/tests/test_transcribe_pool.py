@@ -0,0 +1,237 @@
+"""
+测试常驻转录进程池
+"""
+import queue
+import pytest
+from unittest.mock import patch, Mock
+
+from src.workers.transcribe_pool import TranscribePool
+
+
+def _make_process(alive=True):
+    process = Mock()
+    process.is_alive.return_value = alive
+    process.pid = 1234
+    process.exitcode = None if alive else -15
+    return process
+
+
+@pytest.fixture
+def patched_pool_primitives():
+    """替换 Process / Queue / Manager，避免真正启动子进程"""
+    with patch('src.workers.transcribe_pool.Process') as mock_process_cls, \
+         patch('src.workers.transcribe_pool.Queue') as mock_queue_cls, \
+         patch('src.workers.transcribe_pool.Manager') as mock_manager_cls:
+        mock_manager_cls.return_value.dict.return_value = {}
+        mock_process_cls.side_effect = lambda *args, **kwargs: _make_process()
+        yield mock_process_cls, mock_queue_cls
+
+
+class TestTranscribePool:
+    """常驻进程池测试"""
+
+    def test_start_spawns_workers_once(self, patched_pool_primitives):
+        """启动时按池大小创建进程，重复调用不会重复创建"""
+        mock_process_cls, _ = patched_pool_primitives
+        pool = TranscribePool(size=2)
+
+        pool.start()
+        pool.start()
+
+        assert mock_process_cls.call_count == 2
+
+    def test_run_returns_worker_result(self, patched_pool_primitives):
+        """任务结果从 worker 的结果队列返回，并回调分派的进程"""
+        _, mock_queue_cls = patched_pool_primitives
+        mock_queue_cls.return_value.get.return_value = {"status": "completed", "txt": "hi"}
+        pool = TranscribePool(size=1)
+        dispatched = []
+
+        result = pool.run("task-1", {"audio_path": "/tmp/a.mp3"}, on_dispatch=dispatched.append)
+
+        assert result == {"status": "completed", "txt": "hi"}
+        assert len(dispatched) == 1
+        job = mock_queue_cls.return_value.put.call_args[0][0]
+        assert job["task_id"] == "task-1"
+        assert job["audio_path"] == "/tmp/a.mp3"
+
+    def test_worker_recycled_after_max_jobs(self, patched_pool_primitives):
+        """达到任务上限后替换 worker 进程"""
+        mock_process_cls, mock_queue_cls = patched_pool_primitives
+        mock_queue_cls.return_value.get.return_value = {"status": "completed"}
+        pool = TranscribePool(size=1, max_jobs_per_worker=2)
+
+        pool.run("task-1", {"audio_path": "/tmp/a.mp3"})
+        assert mock_process_cls.call_count == 1
+
+        pool.run("task-2", {"audio_path": "/tmp/b.mp3"})
+        assert mock_process_cls.call_count == 2
+
+    def test_killed_worker_is_replaced(self, patched_pool_primitives):
+        """worker 被取消（杀死）后返回 None 并自动补充新进程"""
+        mock_process_cls, mock_queue_cls = patched_pool_primitives
+        mock_queue_cls.return_value.get.side_effect = queue.Empty
+        pool = TranscribePool(size=1)
+
+        def kill(process):
+            process.is_alive.return_value = False
+
+        result = pool.run("task-1", {"audio_path": "/tmp/a.mp3"}, on_dispatch=kill, poll_interval=0.01)
+
+        assert result is None
+        assert mock_process_cls.call_count == 2
+
+    def test_idle_dead_worker_replaced_before_dispatch(self, patched_pool_primitives):
+        """空闲时退出的 worker 在分派任务前被替换，任务交给新进程"""
+        mock_process_cls, mock_queue_cls = patched_pool_primitives
+        mock_queue_cls.return_value.get.return_value = {"status": "completed"}
+        pool = TranscribePool(size=1)
+        pool.start()
+        dead = pool._slots[0].process
+        dead.is_alive.return_value = False
+        dispatched = []
+
+        result = pool.run("task-1", {"audio_path": "/tmp/a.mp3"}, on_dispatch=dispatched.append)
+
+        assert result == {"status": "completed"}
+        assert mock_process_cls.call_count == 2
+        assert dispatched[0] is not dead
+
+    def test_cancelled_job_is_not_sent(self, patched_pool_primitives):
+        """取得 worker 时任务已被取消：不发送任务，返回 None 并释放 worker"""
+        _, mock_queue_cls = patched_pool_primitives
+        pool = TranscribePool(size=1)
+
+        result = pool.run("task-1", {"audio_path": "/tmp/a.mp3"}, is_cancelled=lambda: True)
+
+        assert result is None
+        mock_queue_cls.return_value.put.assert_not_called()
+        assert pool._slots[0].task_id is None
+
+    def test_run_forwards_stream_events(self, patched_pool_primitives):
+        """worker 发送的流式事件交给 on_event，最终结果照常返回"""
+        _, mock_queue_cls = patched_pool_primitives
+        mock_queue_cls.return_value.get.side_effect = [
+            {"event": "segment", "index": 1, "text": "hi"},
+            queue.Empty(),
+            {"event": "punctuated", "index": 1, "text": "hi."},
+            {"status": "completed", "txt": "hi."},
+        ]
+        pool = TranscribePool(size=1)
+        events = []
+
+        result = pool.run("task-1", {"audio_path": "/tmp/a.mp3"}, on_event=events.append, poll_interval=0.01)
+
+        assert result == {"status": "completed", "txt": "hi."}
+        assert [event["event"] for event in events] == ["segment", "punctuated"]
+
+    def test_workers_get_punctuation_client_when_service_runs(self, patched_pool_primitives):
+        """共享标点服务运行时，每个 worker 进程收到对应槽位的客户端"""
+        mock_process_cls, _ = patched_pool_primitives
+        service = Mock(running=True)
+        service.client.side_effect = lambda slot_id: f"client-{slot_id}"
+        pool = TranscribePool(size=2, punctuation_service=service)
+
+        pool.start()
+
+        assert [call.kwargs["kwargs"] for call in mock_process_cls.call_args_list] == [
+            {"punctuation_client": "client-0"}, {"punctuation_client": "client-1"}
+        ]
+
+    def test_parallel_jobs_beyond_cap_run_sequentially(self, patched_pool_primitives):
+        """并行模式任务数达到上限后，其余任务改为顺序转录；任务结束后名额释放"""
+        _, mock_queue_cls = patched_pool_primitives
+        mock_queue_cls.return_value.get.return_value = {"status": "completed"}
+        pool = TranscribePool(size=2, max_parallel_jobs=1)
+        sent = []
+
+        def send(job):
+            sent.append(job)
+            if job["task_id"] == "task-1":
+                # task-1 占用并行名额期间，另一个 worker 上的并行任务按顺序转录
+                pool.run("task-2", {"audio_path": "/tmp/b.mp3", "parallel": True})
+
+        mock_queue_cls.return_value.put.side_effect = send
+        pool.run("task-1", {"audio_path": "/tmp/a.mp3", "parallel": True})
+        pool.run("task-3", {"audio_path": "/tmp/c.mp3", "parallel": True})
+
+        assert [(job["task_id"], job["parallel"]) for job in sent] == [
+            ("task-1", True), ("task-2", False), ("task-3", True)
+        ]
+        assert pool._parallel_jobs == 0
+
+    def test_idle_worker_respawned_after_punctuation_service_restart(self, patched_pool_primitives):
+        """标点服务重启后，持有旧客户端的空闲 worker 在分派任务前被替换"""
+        mock_process_cls, mock_queue_cls = patched_pool_primitives
+        mock_queue_cls.return_value.get.return_value = {"status": "completed"}
+        service = Mock(running=True, generation=0)
+        pool = TranscribePool(size=1, punctuation_service=service)
+        pool.start()
+        old = pool._slots[0].process
+        dispatched = []
+
+        pool.run("task-1", {"audio_path": "/tmp/a.mp3"}, on_dispatch=dispatched.append)
+        assert dispatched == [old]
+
+        service.generation = 1
+        pool.run("task-2", {"audio_path": "/tmp/b.mp3"}, on_dispatch=dispatched.append)
+
+        assert mock_process_cls.call_count == 2
+        assert dispatched[1] is not old
+        assert pool._slots[0].punctuation_generation == 1
+
+    def test_workers_replaced_without_holding_lock(self, patched_pool_primitives):
+        """替换 worker 时等待旧进程和启动新进程都不持有锁，替换中的槽位不会分派给其他任务"""
+        mock_process_cls, mock_queue_cls = patched_pool_primitives
+        mock_queue_cls.return_value.get.return_value = {"status": "completed"}
+        service = Mock(running=True, generation=0)
+        pool = TranscribePool(size=1, max_jobs_per_worker=1, punctuation_service=service)
+        pool.start()
+        lock_held = []
+
+        def make_process(*args, **kwargs):
+            lock_held.append(pool._lock.locked())
+            process = _make_process()
+            process.join.side_effect = lambda timeout=None: lock_held.append(pool._lock.locked())
+            # 替换期间槽位仍被占用
+            process.start.side_effect = lambda: lock_held.append(pool._slots[0].task_id is None)
+            return process
+
+        mock_process_cls.side_effect = make_process
+        pool._slots[0].process.join.side_effect = lambda timeout=None: lock_held.append(pool._lock.locked())
+        pool._slots[0].process.is_alive.return_value = False
+        pool.run("task-1", {"audio_path": "/tmp/a.mp3"})  # 空闲时退出的 worker；结束后达到任务上限
+        service.generation = 1
+        pool.run("task-2", {"audio_path": "/tmp/b.mp3"})  # 标点服务重启；结束后达到任务上限
+
+        assert mock_process_cls.call_count == 5
+        assert lock_held and not any(lock_held)
+        assert pool._slots[0].task_id is None
+
+
+def test_pool_worker_caches_models_per_tier(monkeypatch):
+    """worker 进程按 (模型, 计算类型) 缓存模型，超过上限时淘汰最久未使用的"""
+    from src.workers import transcribe_pool, transcribe_worker
+
+    loaded = []
+    served = []
+    monkeypatch.setattr(transcribe_pool, "MAX_MODELS_PER_WORKER", 1)
+    monkeypatch.setattr(
+        transcribe_worker, "load_whisper_model",
+        lambda name, compute_type=None: loaded.append((name, compute_type)) or f"model:{name}"
+    )
+    monkeypatch.setattr(
+        transcribe_worker, "transcribe_worker",
+        lambda *args, **kwargs: served.append((kwargs["model"], kwargs["model_name"]))
+    )
+
+    job_queue = queue.Queue()
+    for model_name in ("large-v3", "tiny", "tiny"):
+        job_queue.put({"task_id": "t", "audio_path": "/tmp/a.mp3", "model": model_name, "compute_type": None})
+    job_queue.put(None)
+
+    transcribe_pool.pool_worker_main(0, job_queue, queue.Queue(), {}, max_jobs=0)
+
+    # 预加载默认模型 large-v3，第一个任务复用；tiny 替换它后第二个 tiny 任务复用
+    assert loaded == [("large-v3", None), ("tiny", None)]
+    assert served == [("model:large-v3", "large-v3"), ("model:tiny", "tiny"), ("model:tiny", "tiny")]
@@ -1,4 +1,8 @@
+import copy
+import os
+import time
 import types
+from unittest.mock import Mock
 from multiprocessing import Queue
 
 import pytest
@@ -132,6 +136,9 @@ def test_transcribe_worker_zh_with_zhpr_mock(monkeypatch):
             # Return already punctuated Traditional Chinese to avoid relying on OpenCC
             return "你好，這是測試嗎？"
 
+        def punctuate_many(self, texts, window_size: int = 256, step: int = 200):
+            return [self.punctuate(text) for text in texts]
+
     monkeypatch.setattr(tw, "_ZhPunctuationRestorer", FakeZhPr, raising=True)
 
     class FakeSegment:
@@ -208,3 +215,622 @@ def test_transcribe_worker_zh_question_mark_fallback(monkeypatch):
     # Should end with a full-width question mark; allow either Traditional or Simplified
     assert result["txt"].endswith("？")
     assert ("嗎" in result["txt"]) or ("吗" in result["txt"])
+
+
+def test_transcribe_worker_emits_stream_events(monkeypatch):
+    """With an event queue, segments are emitted as decoded and punctuated text per paragraph."""
+    from src.workers import transcribe_worker as tw
+
+    monkeypatch.setattr(tw, "_ZHPR_AVAILABLE", False, raising=False)
+    monkeypatch.setattr(tw.torch.cuda, "is_available", lambda: False, raising=False)
+
+    class FakeSegment:
+        def __init__(self, start, end, text):
+            self.start = start
+            self.end = end
+            self.text = text
+
+    class FakeInfo:
+        language = "en"
+        duration = 10.0
+
+    def lazy_segments():
+        # 3s gap after the first segment closes the first paragraph
+        yield FakeSegment(0.0, 1.0, "hello")
+        yield FakeSegment(4.0, 5.0, "world")
+
+    class FakeModel:
+        def transcribe(self, audio_path, language=None, **kwargs):
+            return lazy_segments(), FakeInfo()
+
+    result_queue = Queue()
+    event_queue = Queue()
+    progress = {}
+
+    tw.transcribe_worker(
+        "/tmp/fake.wav", "en", result_queue, progress, "task-stream",
+        model=FakeModel(), event_queue=event_queue
+    )
+
+    events = []
+    while not event_queue.empty():
+        events.append(event_queue.get(timeout=1))
+
+    assert [e["event"] for e in events] == ["info", "segment", "segment", "punctuated", "punctuated"]
+    assert events[1] == {"event": "segment", "index": 1, "start": 0.0, "end": 1.0, "text": "hello"}
+    # The first paragraph is punctuated as soon as the second one starts
+    assert events[3] == {"event": "punctuated", "index": 1, "text": "hello", "subtitle": "hello"}
+    assert result_queue.get(timeout=1)["txt"] == "hello world"
+    assert progress["task-stream"] == 100
+
+
+def test_group_segments_into_paragraphs_splits_on_gap_and_size():
+    """Paragraphs split on time gaps and on the per-paragraph segment limit."""
+    from types import SimpleNamespace
+    from src.workers.transcribe_worker import group_segments_into_paragraphs
+
+    segments = [SimpleNamespace(start=i, end=i + 0.9, text="a") for i in range(5)]
+    segments.append(SimpleNamespace(start=20.0, end=21.0, text="b"))
+
+    paragraphs = group_segments_into_paragraphs(segments, max_gap_seconds=2.0, max_paragraph_segments=3)
+
+    assert [len(p) for p in paragraphs] == [3, 2, 1]
+    assert group_segments_into_paragraphs([]) == []
+
+
+def test_transcribe_worker_reports_decode_progress_and_metrics(monkeypatch):
+    """Progress follows decoded audio time and the worker publishes RTF/ETA metrics."""
+    from src.workers import transcribe_worker as tw
+
+    monkeypatch.setattr(tw, "_ZHPR_AVAILABLE", False, raising=False)
+    monkeypatch.setattr(tw.torch.cuda, "is_available", lambda: False, raising=False)
+
+    class FakeSegment:
+        def __init__(self, start, end, text):
+            self.start = start
+            self.end = end
+            self.text = text
+
+    class FakeInfo:
+        language = "en"
+        duration = 20.0
+
+    task_id = "task-progress"
+    progress = {}
+    seen = []
+
+    def lazy_segments():
+        for start in (0.0, 5.0, 10.0, 15.0):
+            yield FakeSegment(start, start + 5.0, "word")
+            seen.append((progress[task_id], dict(progress[f"{task_id}:metrics"])))
+
+    class FakeModel:
+        def transcribe(self, audio_path, language=None, **kwargs):
+            return lazy_segments(), FakeInfo()
+
+    result_queue = Queue()
+    tw.transcribe_worker("/tmp/fake.wav", "en", result_queue, progress, task_id, model=FakeModel())
+
+    # Recorded when the worker asks for the next segment, i.e. after each one was processed
+    assert [p for p, _ in seen] == [22, 45, 67, 90]
+    metrics = seen[1][1]
+    assert metrics["stage"] == "decoding"
+    assert metrics["decoded_seconds"] == 10.0
+    assert metrics["audio_duration"] == 20.0
+    assert metrics["rtf"] is not None and metrics["eta_seconds"] is not None
+
+    assert result_queue.get(timeout=1)["status"] == "completed"
+    assert progress[task_id] == 100
+    assert progress[f"{task_id}:metrics"]["stage"] == "completed"
+
+
+def _batched_test_model(monkeypatch, tw):
+    class FakeSegment:
+        def __init__(self, start, end, text):
+            self.start = start
+            self.end = end
+            self.text = text
+
+    class FakeInfo:
+        language = "en"
+        duration = 2.0
+
+    calls = []
+
+    class FakeModel:
+        def transcribe(self, audio_path, language=None, **kwargs):
+            calls.append(("sequential", kwargs))
+            return iter([FakeSegment(0.0, 1.0, "hello")]), FakeInfo()
+
+    class FakeBatchedPipeline:
+        def __init__(self, model):
+            self.model = model
+
+        def transcribe(self, audio_path, language=None, **kwargs):
+            calls.append(("batched", kwargs))
+            return iter([FakeSegment(0.0, 1.0, "hello")]), FakeInfo()
+
+    monkeypatch.setattr(tw, "_ZHPR_AVAILABLE", False, raising=False)
+    monkeypatch.setattr(tw.torch.cuda, "is_available", lambda: False, raising=False)
+    monkeypatch.setattr(tw, "BatchedInferencePipeline", FakeBatchedPipeline, raising=True)
+    return FakeModel(), calls
+
+
+def test_transcribe_worker_batched_mode(monkeypatch):
+    """A positive batch size routes decoding through the batched pipeline."""
+    from src.workers import transcribe_worker as tw
+
+    model, calls = _batched_test_model(monkeypatch, tw)
+    result_queue = Queue()
+
+    tw.transcribe_worker("/tmp/fake.wav", "en", result_queue, {}, "task-batched", model=model, batch_size=16)
+
+    result = result_queue.get(timeout=1)
+    assert result["txt"] == "hello"
+    assert result["inference_mode"] == "batched"
+    mode, kwargs = calls[0]
+    assert mode == "batched"
+    assert kwargs["batch_size"] == 16
+    assert kwargs["word_timestamps"] is False
+
+
+def test_transcribe_worker_batched_falls_back_for_word_timestamps(monkeypatch):
+    """Requesting word timestamps keeps the sequential path."""
+    from src.workers import transcribe_worker as tw
+
+    model, calls = _batched_test_model(monkeypatch, tw)
+    result_queue = Queue()
+
+    tw.transcribe_worker(
+        "/tmp/fake.wav", "en", result_queue, {}, "task-words", model=model, batch_size=16, word_timestamps=True
+    )
+
+    assert result_queue.get(timeout=1)["inference_mode"] == "sequential"
+    assert calls[0][0] == "sequential"
+
+
+
+def test_transcribe_worker_word_timestamps_off_by_default(monkeypatch):
+    """The sequential path no longer computes word timestamps unless asked."""
+    from src.workers import transcribe_worker as tw
+
+    model, calls = _batched_test_model(monkeypatch, tw)
+    result_queue = Queue()
+
+    tw.transcribe_worker("/tmp/fake.wav", "en", result_queue, {}, "task-no-words", model=model)
+
+    result = result_queue.get(timeout=1)
+    assert calls[0][1]["word_timestamps"] is False
+    assert "json" not in result
+
+
+def test_transcribe_worker_returns_words_in_json(monkeypatch):
+    """Requested word timestamps come back as compact arrays in the JSON output."""
+    from src.workers import transcribe_worker as tw
+
+    word = types.SimpleNamespace(word=" hello", start=0.12345, end=0.9, probability=0.98765)
+    segment = types.SimpleNamespace(start=0.0, end=1.0, text="hello", words=[word])
+    calls = []
+
+    class FakeModel:
+        def transcribe(self, audio_path, language=None, **kwargs):
+            calls.append(kwargs)
+            return iter([segment]), types.SimpleNamespace(language="en", duration=1.0)
+
+    monkeypatch.setattr(tw, "_ZHPR_AVAILABLE", False, raising=False)
+    result_queue = Queue()
+
+    tw.transcribe_worker("/tmp/fake.wav", "en", result_queue, {}, "task-words-json", model=FakeModel(), word_timestamps=True)
+
+    result = result_queue.get(timeout=1)
+    assert calls[0]["word_timestamps"] is True
+    assert result["json"][0]["words"] == [[" hello", 0.123, 0.9, 0.988]]
+
+
+def _reference_merge_stride(output, step):
+    # zhpr.predict.merge_stride：後面窗口的預測覆蓋重疊位置
+    merged = {}
+    for window_index, window in enumerate(output):
+        for offset, pair in enumerate(window):
+            merged[step * window_index + offset] = pair
+    return [merged[position] for position in sorted(merged)]
+
+
+def _reference_decode_pred(token_ner_pairs):
+    out = []
+    for token, ner in token_ner_pairs:
+        out.append(token)
+        if ner != "O":
+            out.append(ner[-1])
+    return out
+
+
+class _CharTokenizer:
+    pad_token_id = 0
+
+    def __init__(self, chars):
+        self.vocab = {"[PAD]": 0, "[UNK]": 1}
+        for char in chars:
+            self.vocab.setdefault(char, len(self.vocab))
+        self.inverse = {index: token for token, index in self.vocab.items()}
+
+    def convert_tokens_to_ids(self, tokens):
+        return [self.vocab.get(token, 1) for token in tokens]
+
+    def convert_ids_to_tokens(self, ids):
+        return [self.inverse[int(index)] for index in ids]
+
+
+@pytest.fixture
+def tiny_restorer_factory(monkeypatch):
+    """Build _ZhPunctuationRestorer instances backed by one small random BERT and a per-character tokenizer."""
+    transformers = pytest.importorskip("transformers")
+    from src.workers import transcribe_worker as tw
+
+    monkeypatch.setattr(tw, "merge_stride", _reference_merge_stride, raising=False)
+    monkeypatch.setattr(tw, "decode_pred", _reference_decode_pred, raising=False)
+
+    labels = ["O", "S-，", "S-、", "S-。", "S-？", "S-！", "S-；"]
+    tw.torch.manual_seed(0)
+    config = transformers.BertConfig(
+        vocab_size=64, hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+        intermediate_size=48, max_position_embeddings=64, num_labels=len(labels),
+        id2label=dict(enumerate(labels)), label2id={label: i for i, label in enumerate(labels)},
+    )
+    model = transformers.BertForTokenClassification(config)
+    tokenizer = _CharTokenizer("今天天氣很好我們去公園散步吧你覺得怎麼樣明後")
+
+    def make(backend="fp32"):
+        return tw._ZhPunctuationRestorer(device="cpu", backend=backend, model=copy.deepcopy(model), tokenizer=tokenizer)
+
+    return make
+
+
+def _random_texts(seed, count):
+    import random
+
+    rng = random.Random(seed)
+    alphabet = "今天天氣很好我們去公園散步吧你覺得怎麼樣明後X"  # X 不在詞表中，對應 [UNK]
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 90))) for _ in range(count)]
+
+
+def _legacy_punctuate(restorer, text, window_size, step):
+    """舊版逐段落推理：窗口補齊到 window_size、不帶 attention mask、每批 4 個窗口"""
+    from src.workers import transcribe_worker as tw
+
+    if not text:
+        return text
+    windows = [list(text)[start:start + window_size] for start in range(0, len(text), step)]
+    rows = []
+    for window in windows:
+        ids = restorer.tokenizer.convert_tokens_to_ids(window)
+        rows.append(ids + [restorer.tokenizer.pad_token_id] * (window_size - len(ids)))
+    outputs = []
+    with tw.torch.no_grad():
+        for batch_start in range(0, len(rows), 4):
+            batch = tw.torch.tensor(rows[batch_start:batch_start + 4])
+            predicted = restorer.model(input_ids=batch)["logits"].argmax(-1)
+            for ids, labels in zip(batch.tolist(), predicted.tolist()):
+                pad_start = ids.index(0) if 0 in ids else len(ids)
+                tokens = restorer.tokenizer.convert_ids_to_tokens(ids[:pad_start])
+                outputs.append([(t, restorer.model.config.id2label[l]) for t, l in zip(tokens, labels[:pad_start])])
+    return "".join(_reference_decode_pred(_reference_merge_stride(outputs, step)))
+
+
+def test_zh_restorer_punctuate_many_matches_per_paragraph(tiny_restorer_factory, monkeypatch):
+    """ZHPR_PAD_TO_WINDOW=0 時批量推理（動態補齊 + attention mask）與同一模式的逐段落推理結果一致"""
+    from src.workers import transcribe_worker as tw
+
+    monkeypatch.setattr(tw, "ZHPR_PAD_TO_WINDOW", False)
+    tiny_restorer = tiny_restorer_factory()
+    texts = _random_texts(seed=7, count=12)
+    batched = tiny_restorer.punctuate_many(texts, window_size=32, step=24, batch_size=5)
+    assert batched == [tiny_restorer.punctuate(text, window_size=32, step=24) for text in texts]
+
+
+def test_zh_restorer_pad_to_window_matches_legacy(tiny_restorer_factory, monkeypatch):
+    """ZHPR_PAD_TO_WINDOW=1 時與舊版 DocumentDataset/DataLoader 實作逐字一致"""
+    from src.workers import transcribe_worker as tw
+
+    tiny_restorer = tiny_restorer_factory()
+    monkeypatch.setattr(tw, "ZHPR_PAD_TO_WINDOW", True)
+    texts = _random_texts(seed=11, count=10)
+    batched = tiny_restorer.punctuate_many(texts, window_size=32, step=24, batch_size=7)
+    assert batched == [_legacy_punctuate(tiny_restorer, text, 32, 24) for text in texts]
+
+
+def test_zh_restorer_torchscript_backend_matches_fp32(tiny_restorer_factory):
+    """TorchScript 後端與 fp32 輸出一致"""
+    texts = _random_texts(seed=3, count=8)
+    expected = tiny_restorer_factory("fp32").punctuate_many(texts, window_size=32, step=24, batch_size=3)
+    assert tiny_restorer_factory("torchscript").punctuate_many(texts, window_size=32, step=24, batch_size=3) == expected
+
+
+def test_zh_restorer_int8_backend_within_tolerance(tiny_restorer_factory):
+    """int8 動態量化後端的標點預測與 fp32 的一致率不低於 95%"""
+    import difflib
+
+    texts = _random_texts(seed=5, count=8)
+    expected = "".join(tiny_restorer_factory("fp32").punctuate_many(texts, window_size=32, step=24))
+    quantized = "".join(tiny_restorer_factory("int8").punctuate_many(texts, window_size=32, step=24))
+    assert difflib.SequenceMatcher(None, expected, quantized, autojunk=False).ratio() >= 0.95
+
+
+def test_build_punctuation_forward_rejects_unknown_backend():
+    from src.workers import transcribe_worker as tw
+
+    with pytest.raises(ValueError, match="Unsupported zhpr backend"):
+        tw.build_punctuation_forward(object(), backend="onnx")
+
+
+def _accumulated_paragraph_sizes(segments, max_gap_seconds, max_paragraph_segments, max_paragraph_chars):
+    """逐個 segment 累積的參考分組（原 group_segments_into_paragraphs 的循環），返回各段落的 segment 數"""
+    sizes = []
+    current_size, current_chars, last_end = 0, 0, 0.0
+    for segment in segments:
+        char_count = len(segment.text.strip())
+        if current_size and (
+            segment.start - last_end > max_gap_seconds
+            or current_size >= max_paragraph_segments
+            or current_chars + char_count > max_paragraph_chars
+        ):
+            sizes.append(current_size)
+            current_size, current_chars = 0, 0
+        current_size += 1
+        current_chars += char_count
+        last_end = segment.end
+    if current_size:
+        sizes.append(current_size)
+    return sizes
+
+
+def test_paragraph_ranges_match_reference_on_random_transcripts():
+    """隨機時間間隔、文本長度與限制（固定種子）下，向量化分組與逐個累積的段落邊界一致"""
+    import random
+    from types import SimpleNamespace
+    from src.workers.transcribe_worker import group_segments_into_paragraphs, paragraph_ranges
+
+    rng = random.Random(1234)
+    for _ in range(500):
+        segments, clock = [], 0.0
+        for _ in range(rng.randint(0, 80)):
+            start = clock + rng.choice([-0.5, 0.0, 0.3, 1.999, 2.0, 2.001, 5.0]) * rng.random() * 2
+            end = start + rng.uniform(0.0, 4.0)
+            text = " " * rng.randint(0, 2) + "字" * rng.choice([0, 1, 5, 40, 120, 600]) + " " * rng.randint(0, 2)
+            segments.append(SimpleNamespace(start=start, end=end, text=text))
+            clock = end
+        limits = (rng.choice([0.5, 2.0, 10.0]), rng.choice([0, 1, 3, 10]), rng.choice([0, 50, 500]))
+
+        expected = _accumulated_paragraph_sizes(segments, *limits)
+        ranges = paragraph_ranges(
+            [s.start for s in segments], [s.end for s in segments], [len(s.text.strip()) for s in segments], *limits
+        )
+
+        assert [len(r) for r in ranges] == expected
+        assert [r.start for r in ranges] == [sum(expected[:i]) for i in range(len(expected))]
+        assert [len(p) for p in group_segments_into_paragraphs(segments, *limits)] == expected
+
+
+def test_transcribe_worker_uses_shared_punctuation_client(monkeypatch):
+    """傳入共享標點服務的客戶端時不在 worker 中載入 zhpr 模型，段落交給客戶端批量處理"""
+    from types import SimpleNamespace
+    from src.workers import transcribe_worker as tw
+
+    monkeypatch.setattr(tw, "_ZHPR_AVAILABLE", False, raising=False)
+    monkeypatch.setattr(tw, "_ZhPunctuationRestorer", Mock(side_effect=AssertionError("should not load")), raising=False)
+
+    class FakeModel:
+        def transcribe(self, audio_path, language=None, **kwargs):
+            segments = [SimpleNamespace(start=0.0, end=1.0, text="你好"), SimpleNamespace(start=5.0, end=6.0, text="再见")]
+            return iter(segments), SimpleNamespace(language="zh", duration=6.0)
+
+    client = Mock()
+    client.punctuate_many.side_effect = lambda texts: [text + "。" for text in texts]
+    result_queue = Queue()
+
+    tw.transcribe_worker("/tmp/fake.wav", "zh", result_queue, {}, "task-shared", model=FakeModel(), punctuation_client=client)
+
+    assert result_queue.get(timeout=1)["txt"] == "你好。再見。"
+    # 兩個段落累積後一次送出
+    client.punctuate_many.assert_called_once_with(["你好", "再见"])
+
+
+def test_transcribe_worker_groups_streamed_segments_like_paragraph_ranges(monkeypatch):
+    """轉錄時逐個加入 segment 並對未結束的尾部計算段落，結果與對全部 segment 一次分組相同"""
+    import random
+    from types import SimpleNamespace
+    from src.workers import transcribe_worker as tw
+
+    rng = random.Random(19)
+    segments, clock = [], 0.0
+    for _ in range(120):
+        start = clock + rng.choice([0.0, 0.5, 3.0])
+        clock = start + rng.uniform(0.5, 3.0)
+        segments.append(SimpleNamespace(start=start, end=clock, text="字" * rng.choice([1, 20, 90, 200])))
+
+    class FakeModel:
+        def transcribe(self, audio_path, language=None, **kwargs):
+            return iter(segments), SimpleNamespace(language="zh", duration=clock)
+
+    client = Mock()
+    client.punctuate_many.side_effect = lambda texts: list(texts)
+    monkeypatch.setattr(tw, "ZHPR_PARAGRAPH_BATCH", 1)
+
+    tw.transcribe_worker("/tmp/fake.wav", "zh", Queue(), {}, "task-grouping", model=FakeModel(), punctuation_client=client)
+
+    paragraphs = [call.args[0][0] for call in client.punctuate_many.call_args_list]
+    expected = tw.group_segments_into_paragraphs(segments)
+    assert paragraphs == ["".join(segment.text for segment in paragraph) for paragraph in expected]
+
+
+def test_transcribe_worker_passes_denoised_samples_to_whisper(monkeypatch):
+    """降噪後的 16 kHz 採樣直接交給 Whisper，不寫臨時 WAV"""
+    import numpy as np
+    from types import SimpleNamespace
+    from src.workers import transcribe_worker as tw
+
+    samples = np.zeros(16000, dtype=np.float32)
+    monkeypatch.setattr(tw, "DENOISE_IN_MEMORY", True)
+    monkeypatch.setattr(tw, "denoise_audio_to_array", Mock(return_value=(samples, "ok")))
+    monkeypatch.setattr(tw, "denoise_audio", Mock(side_effect=AssertionError("should not write a temp file")))
+    received = []
+
+    class FakeModel:
+        def transcribe(self, audio, language=None, **kwargs):
+            received.append(audio)
+            return iter([SimpleNamespace(start=0.0, end=1.0, text="hello")]), SimpleNamespace(language="en", duration=1.0)
+
+    result_queue = Queue()
+    tw.transcribe_worker("/tmp/fake.wav", "en", result_queue, {}, "task-denoise", apply_denoise=True, model=FakeModel())
+
+    result = result_queue.get(timeout=1)
+    assert result["noise_reduction_applied"] is True
+    assert received[0] is samples
+
+
+def test_transcribe_worker_reads_decoded_audio_cache(monkeypatch, tmp_path):
+    """傳入內容哈希時只解碼一次：重試與降噪都讀取緩存中的內存映射"""
+    import numpy as np
+    import faster_whisper.audio
+    from types import SimpleNamespace
+    from src.utils import audio_cache
+    from src.workers import transcribe_worker as tw
+
+    monkeypatch.setattr(audio_cache, "DECODED_AUDIO_DIR", str(tmp_path))
+    decode = Mock(return_value=np.ones(16000, dtype=np.float32))
+    monkeypatch.setattr(faster_whisper.audio, "decode_audio", decode)
+    monkeypatch.setattr(tw, "DENOISE_ENGINE", "ffmpeg")
+    denoise = Mock(side_effect=lambda samples, strength: (samples * 0.5, "ok"))
+    monkeypatch.setattr(tw, "denoise_samples", denoise)
+    received = []
+
+    class FakeModel:
+        def transcribe(self, audio, language=None, **kwargs):
+            received.append(np.asarray(audio).copy())
+            return iter([SimpleNamespace(start=0.0, end=1.0, text="hello")]), SimpleNamespace(language="en", duration=1.0)
+
+    for attempt, apply_denoise in enumerate((False, True, True)):
+        result_queue = Queue()
+        tw.transcribe_worker(
+            f"/tmp/upload-{attempt}.mp3", "en", result_queue, {}, f"task-{attempt}",
+            apply_denoise=apply_denoise, model=FakeModel(), content_hash="sha",
+        )
+        assert result_queue.get(timeout=1)["noise_reduction_applied"] is apply_denoise
+
+    decode.assert_called_once()
+    denoise.assert_called_once()
+    assert [audio[0] for audio in received] == [1.0, 0.5, 0.5]
+    assert sorted(os.listdir(tmp_path)) == ["sha.denoised-ffmpeg-medium.npy", "sha.npy"]
+
+
+def test_transcribe_worker_spectral_denoise_strength(monkeypatch, tmp_path):
+    """DENOISE_ENGINE=spectral 時在 worker 內對緩存採樣做頻譜門限降噪，強度由任務指定"""
+    import numpy as np
+    import faster_whisper.audio
+    from types import SimpleNamespace
+    from src.utils import audio_cache
+    from src.workers import transcribe_worker as tw
+
+    monkeypatch.setattr(audio_cache, "DECODED_AUDIO_DIR", str(tmp_path))
+    monkeypatch.setattr(tw, "DENOISE_ENGINE", "spectral")
+    monkeypatch.setattr(faster_whisper.audio, "decode_audio", Mock(return_value=np.ones(16000, dtype=np.float32)))
+    gate = Mock(return_value=np.zeros(16000, dtype=np.float32))
+    monkeypatch.setattr(tw, "spectral_gate", gate)
+    monkeypatch.setattr(tw, "denoise_samples", Mock(side_effect=AssertionError("should not run ffmpeg")))
+
+    class FakeModel:
+        def transcribe(self, audio, language=None, **kwargs):
+            return iter([SimpleNamespace(start=0.0, end=1.0, text="hello")]), SimpleNamespace(language="en", duration=1.0)
+
+    result_queue = Queue()
+    tw.transcribe_worker(
+        "/tmp/upload.mp3", "en", result_queue, {}, "task-spectral",
+        apply_denoise=True, model=FakeModel(), content_hash="sha", denoise_strength="strong",
+    )
+
+    assert result_queue.get(timeout=1)["noise_reduction_applied"] is True
+    assert gate.call_args.kwargs == {"strength": "strong"}
+    assert "sha.denoised-spectral-strong.npy" in os.listdir(tmp_path)
+
+
+def test_iterate_with_idle_callback_flushes_during_pauses():
+    """生成器停頓時調用 on_idle，元素順序不變，生成器的異常在消費端拋出"""
+    from src.workers.transcribe_worker import iterate_with_idle_callback
+
+    calls = []
+
+    def slow():
+        yield 1
+        time.sleep(0.2)
+        yield 2
+
+    seen = []
+    for item in iterate_with_idle_callback(slow(), 0.05, lambda: calls.append(list(seen))):
+        seen.append(item)
+    assert seen == [1, 2]
+    assert calls and calls[0] == [1]
+
+    def broken():
+        yield 1
+        raise ValueError("decode failed")
+
+    with pytest.raises(ValueError, match="decode failed"):
+        list(iterate_with_idle_callback(broken(), 1.0, lambda: None))
+
+
+def test_transcribe_worker_flushes_punctuation_when_decoding_pauses(monkeypatch):
+    """流式輸出時解碼停頓超過 ZHPR_FLUSH_SECONDS，已結束的段落不等湊滿批次就發出 punctuated 事件"""
+    from types import SimpleNamespace
+    from src.workers import transcribe_worker as tw
+
+    monkeypatch.setattr(tw, "ZHPR_FLUSH_SECONDS", 0.05)
+    monkeypatch.setattr(tw, "ZHPR_PARAGRAPH_BATCH", 8)
+
+    def lazy_segments():
+        yield SimpleNamespace(start=0.0, end=1.0, text="你好")
+        yield SimpleNamespace(start=5.0, end=6.0, text="再见")  # 間隔超過 2 秒，第一個段落結束
+        time.sleep(0.3)
+        yield SimpleNamespace(start=6.5, end=7.0, text="谢谢")
+
+    class FakeModel:
+        def transcribe(self, audio_path, language=None, **kwargs):
+            return lazy_segments(), SimpleNamespace(language="zh", duration=7.0)
+
+    client = Mock()
+    client.punctuate_many.side_effect = lambda texts: [text + "。" for text in texts]
+    result_queue, event_queue = Queue(), Queue()
+
+    tw.transcribe_worker(
+        "/tmp/fake.wav", "zh", result_queue, {}, "task-idle", model=FakeModel(),
+        event_queue=event_queue, punctuation_client=client
+    )
+
+    events = []
+    while not event_queue.empty():
+        events.append(event_queue.get(timeout=1))
+    order = [(e["event"], e.get("index")) for e in events if e["event"] in ("segment", "punctuated")]
+    assert order.index(("punctuated", 1)) < order.index(("segment", 3))
+    assert result_queue.get(timeout=1)["txt"] == "你好。再見謝謝。"
+
+
+def test_transcribe_worker_uses_requested_conversion_profile(monkeypatch):
+    """中文結果按請求的 OpenCC 配置轉換為繁體"""
+    from types import SimpleNamespace
+    from src.workers import transcribe_worker as tw
+
+    monkeypatch.setattr(tw, "_ZHPR_AVAILABLE", False, raising=False)
+
+    class FakeModel:
+        def transcribe(self, audio_path, language=None, **kwargs):
+            return iter([SimpleNamespace(start=0.0, end=1.0, text="鼠标")]), SimpleNamespace(language="zh", duration=1.0)
+
+    results = {}
+    for profile in (None, "s2twp"):
+        result_queue = Queue()
+        tw.transcribe_worker(
+            "/tmp/fake.wav", "zh", result_queue, {}, "task-profile", model=FakeModel(), opencc_profile=profile
+        )
+        results[profile] = result_queue.get(timeout=1)["srt"]
+
+    assert "鼠標" in results[None]
+    assert "滑鼠" in results["s2twp"]
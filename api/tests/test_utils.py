@@ -90,4 +90,246 @@ class TestChineseTextProcessing:
         """测试language为None的情况"""
         text = "测试文本"
         result = add_chinese_punctuation(text, None)
-        assert result == text 
\ No newline at end of file
+        assert result == text 
+
+class TestSpoolUpload:
+    """上传文件分块落盘测试"""
+
+    def _make_upload(self, content: bytes):
+        from io import BytesIO
+        from fastapi import UploadFile
+        return UploadFile(file=BytesIO(content), filename="audio.mp3")
+
+    def test_spool_upload_copies_and_hashes(self, tmp_path):
+        """分块复制内容并计算大小和哈希"""
+        import asyncio
+        import hashlib
+        from src.utils.upload_utils import spool_upload
+
+        content = b"0123456789" * 1000
+        dest_path = tmp_path / "spool.bin"
+        with open(dest_path, "wb") as dest:
+            info = asyncio.run(spool_upload(self._make_upload(content), dest, block_size=333))
+
+        assert dest_path.read_bytes() == content
+        assert info.size == len(content)
+        assert info.sha256 == hashlib.sha256(content).hexdigest()
+
+    def test_spool_upload_rejects_oversized(self, tmp_path):
+        """超过最大大小时抛出异常"""
+        import asyncio
+        from src.utils.upload_utils import spool_upload, UploadTooLargeError
+
+        with open(tmp_path / "spool.bin", "wb") as dest:
+            with pytest.raises(UploadTooLargeError):
+                asyncio.run(spool_upload(self._make_upload(b"x" * 100), dest, max_bytes=50, block_size=16))
+
+
+
+class TestDenoiseToArray:
+    """ffmpeg 降噪与重采样经管道直接读入内存"""
+
+    class _FakeFfmpeg:
+        def __init__(self, stdout: bytes, stderr: bytes = b"", returncode: int = 0):
+            from io import BytesIO
+            self.stdout, self.stderr, self.returncode = BytesIO(stdout), BytesIO(stderr), returncode
+
+        def wait(self):
+            return self.returncode
+
+    def test_reads_float32_samples_from_pipe(self, tmp_path, monkeypatch):
+        """一次 ffmpeg 调用完成降噪、单声道与 16 kHz 重采样，输出 float32 数组且不写临时文件"""
+        import numpy as np
+        from unittest.mock import Mock
+        from src.utils import audio_processing
+
+        samples = np.linspace(-1, 1, 48000, dtype=np.float32)
+        popen = Mock(return_value=self._FakeFfmpeg(samples.tobytes()))
+        monkeypatch.setattr(audio_processing, "check_ffmpeg_installed", lambda: True)
+        monkeypatch.setattr(audio_processing.subprocess, "Popen", popen)
+        audio_path = tmp_path / "input.mp3"
+        audio_path.write_bytes(b"fake")
+
+        audio, message = audio_processing.denoise_audio_to_array(str(audio_path), strength="strong")
+
+        assert np.array_equal(audio, samples)
+        assert audio.dtype == np.float32
+        cmd = popen.call_args[0][0]
+        assert cmd[cmd.index("-af") + 1] == "afftdn=nf=-25"
+        assert cmd[cmd.index("-ar") + 1] == "16000"
+        assert cmd[cmd.index("-ac") + 1] == "1"
+        assert cmd[-3:] == ["-f", "f32le", "pipe:1"]
+        assert "3.0s" in message
+
+    def test_ffmpeg_failure_returns_none(self, tmp_path, monkeypatch):
+        """ffmpeg 失败时返回 None 和错误信息"""
+        from unittest.mock import Mock
+        from src.utils import audio_processing
+
+        monkeypatch.setattr(audio_processing, "check_ffmpeg_installed", lambda: True)
+        monkeypatch.setattr(
+            audio_processing.subprocess, "Popen",
+            Mock(return_value=self._FakeFfmpeg(b"", b"Invalid data found", returncode=1)),
+        )
+        audio_path = tmp_path / "input.mp3"
+        audio_path.write_bytes(b"fake")
+
+        assert audio_processing.denoise_audio_to_array(str(audio_path)) == (None, "Invalid data found")
+
+    def test_invalid_env_engine_falls_back_to_ffmpeg(self, monkeypatch, caplog):
+        """DENOISE_ENGINE 无效时导入不失败，记录警告并使用 ffmpeg"""
+        import importlib.util
+        from src.utils import audio_processing
+
+        monkeypatch.setenv("DENOISE_ENGINE", "rnnoise")
+        spec = importlib.util.spec_from_file_location("src.utils.audio_processing_env_copy", audio_processing.__file__)
+        module = importlib.util.module_from_spec(spec)
+        with caplog.at_level("WARNING"):
+            spec.loader.exec_module(module)
+
+        assert module.DENOISE_ENGINE == "ffmpeg"
+        assert "DENOISE_ENGINE" in caplog.text
+
+class TestSubtitleRenderer:
+    """字幕渲染模块测试"""
+
+    def _cues(self):
+        from src.utils.subtitle_renderer import SubtitleCue
+        return [
+            SubtitleCue(0.0, 1.5, "你好", "你好，"),
+            SubtitleCue(1.5, 7323.998, "这是测试", "这是测试。"),
+        ]
+
+    def test_timestamps_use_rounded_milliseconds(self):
+        """时间戳按整数毫秒四舍五入，不受浮点截断影响"""
+        from src.utils.subtitle_renderer import format_srt_timestamp, format_vtt_timestamp, to_milliseconds
+
+        assert to_milliseconds(7323.998) == 7323998
+        assert format_srt_timestamp(to_milliseconds(7323.998)) == "02:02:03,998"
+        assert format_vtt_timestamp(to_milliseconds(3661.1234)) == "01:01:01.123"
+        assert format_srt_timestamp(to_milliseconds(0.0)) == "00:00:00,000"
+
+    def test_render_srt_and_txt(self):
+        """默认只生成 SRT 与 TXT；中文纯文本不加空格"""
+        from src.utils.subtitle_renderer import render_subtitles
+
+        rendered = render_subtitles(self._cues(), "zh")
+
+        assert set(rendered) == {"srt", "txt"}
+        assert rendered["srt"] == (
+            "1\n00:00:00,000 --> 00:00:01,500\n你好\n\n"
+            "2\n00:00:01,500 --> 02:02:03,998\n这是测试\n\n"
+        )
+        assert rendered["txt"] == "你好，这是测试。"
+
+    def test_render_vtt_and_json(self):
+        """按需生成 WebVTT 与 JSON 分段列表"""
+        from src.utils.subtitle_renderer import render_subtitles
+
+        rendered = render_subtitles(self._cues(), "zh", formats=("srt", "txt", "vtt", "json"))
+
+        assert rendered["vtt"].startswith("WEBVTT\n\n1\n00:00:00.000 --> 00:00:01.500\n你好\n\n")
+        assert rendered["json"][1] == {
+            "index": 2, "start": 1.5, "end": 7323.998, "text": "这是测试。", "subtitle": "这是测试",
+        }
+
+    def test_txt_joins_other_languages_with_spaces(self):
+        """其他语言以空格连接，开头的空文本被忽略"""
+        from src.utils.subtitle_renderer import SubtitleCue, render_subtitles
+
+        cues = [SubtitleCue(0, 1, "", ""), SubtitleCue(1, 2, "hello", "hello"), SubtitleCue(2, 3, "world", "world")]
+        assert render_subtitles(cues, "en")["txt"] == "hello world"
+
+    def test_parse_formats(self):
+        """srt/txt 总是包含，未知格式抛出 ValueError"""
+        from src.utils.subtitle_renderer import parse_formats
+
+        assert parse_formats(None) == ("srt", "txt")
+        assert parse_formats("json, VTT") == ("srt", "txt", "vtt", "json")
+        with pytest.raises(ValueError, match="docx"):
+            parse_formats("docx")
+
+    def test_convert_many_matches_single_conversion(self):
+        """批量繁体转换与逐条转换结果一致"""
+        from src.utils.text_conversion import convert_many_to_traditional_chinese
+
+        texts = ["学习", "", "计算机", "多行\n文本"]
+        assert convert_many_to_traditional_chinese(texts) == [convert_to_traditional_chinese(t) for t in texts]
+        assert convert_many_to_traditional_chinese(["学习", "计算机"]) == ["學習", "計算機"]
+
+
+class TestSplitAtLineBoundaries:
+    """按行切块测试"""
+
+    def test_chunks_rejoin_and_end_on_newlines(self):
+        """切块拼接后与原文一致，除最后一块外都以换行结尾且不超过块大小"""
+        import random
+        from src.utils.text_conversion import split_at_line_boundaries
+
+        rng = random.Random(42)
+        for _ in range(200):
+            text = "".join(rng.choice("学习计算机\n") for _ in range(rng.randint(0, 300)))
+            max_chars = rng.randint(1, 50)
+            chunks = split_at_line_boundaries(text, max_chars)
+
+            assert "".join(chunks) == text
+            for chunk in chunks[:-1]:
+                assert chunk.endswith("\n")
+                # 只有单行超过块大小时才会超出
+                assert len(chunk) <= max_chars or "\n" not in chunk[:-1]
+
+    def test_short_text_is_one_chunk(self):
+        from src.utils.text_conversion import split_at_line_boundaries
+
+        assert split_at_line_boundaries("学习\n计算机", 100) == ["学习\n计算机"]
+
+
+class TestConversionProfiles:
+    """OpenCC 转换配置与短句缓存测试"""
+
+    def test_profiles(self):
+        """不同配置使用各自的地区用字，未知配置抛出 ValueError"""
+        assert convert_to_traditional_chinese("里面的鼠标", "s2tw") == "裡面的鼠標"
+        assert convert_to_traditional_chinese("里面的鼠标", "s2twp") == "裡面的滑鼠"
+        assert convert_to_traditional_chinese("里面的鼠标", "s2hk") == "裏面的鼠標"
+        with pytest.raises(ValueError, match="s2jp"):
+            convert_to_traditional_chinese("学习", "s2jp")
+
+    def test_invalid_env_profile_falls_back_to_s2t(self, monkeypatch, caplog):
+        """OPENCC_PROFILE 无效时导入不失败，记录警告并使用 s2t"""
+        import importlib.util
+        from src.utils import text_conversion
+
+        monkeypatch.setenv("OPENCC_PROFILE", "s2jp")
+        spec = importlib.util.spec_from_file_location("text_conversion_env_copy", text_conversion.__file__)
+        module = importlib.util.module_from_spec(spec)
+        with caplog.at_level("WARNING"):
+            spec.loader.exec_module(module)
+
+        assert module.DEFAULT_PROFILE == "s2t"
+        assert module.validate_profile(None) == "s2t"
+        assert "OPENCC_PROFILE" in caplog.text
+
+    def test_line_conversion_matches_whole_text(self, monkeypatch):
+        """逐行（带缓存）转换与 OpenCC 整体转换结果一致，长行不进入缓存"""
+        import random
+        from src.utils import text_conversion
+
+        monkeypatch.setattr(text_conversion, "PHRASE_CACHE_MAX_CHARS", 8)
+        converter = text_conversion._get_converter("s2t")
+        rng = random.Random(7)
+        for _ in range(200):
+            text = "".join(rng.choice("头发里面只有一只干后台计算机ab1 ,\n") for _ in range(rng.randint(1, 60)))
+            assert convert_to_traditional_chinese(text) == converter.convert(text)
+
+    def test_repeated_lines_hit_phrase_cache(self):
+        """重复的字幕行只转换一次，纯 ASCII 行（序号、时间轴）不经过转换"""
+        from src.utils import text_conversion
+
+        text_conversion._convert_phrase.cache_clear()
+        srt = "".join(f"{i}\n00:00:0{i},000 --> 00:00:0{i},500\n好的谢谢\n\n" for i in range(1, 6))
+        converted = convert_to_traditional_chinese(srt, "s2t")
+
+        assert converted == srt.replace("好的谢谢", "好的謝謝")
+        info = text_conversion._convert_phrase.cache_info()
+        assert (info.misses, info.hits) == (1, 4)